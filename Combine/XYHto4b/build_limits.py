@@ -0,0 +1,334 @@
+#######################################################
+
+# This script rebuilds the Combine chain of every mass point incrementally:
+#   datacards -> combined card (template 5 = 2 + 3 + 4, as combineCards_scripts.sh)
+#             -> workspace (text2workspace.py, as run_text2workspace.sh) -> limit (combine, as run_limits.py)
+# Each target is rebuilt only when it is outdated: its output is missing, or the content hash of one of its inputs
+# (cards, the shape ROOT files used by the cards, the workspace) or its command changed since the last build.
+# The hashes are kept in build_state.json (in the workspace directory), file hashes are only recomputed when
+# the size or the modification time of a file changes.
+# Targets which do not depend on each other run in parallel (-j).
+# A rebuilt target whose output content did not change does not make the next targets outdated.
+
+# command to run this scripts:
+# python3 build_limits.py -cards datacards_v3 -workspaces workspace_v6 -j 16
+# optional: -limits [directory of the combine outputs, default = workspace directory] -stage [card/workspace/limit]
+#           -t [templates] -n (dry run: only show what would be rebuilt) -explain (show why)
+
+#######################################################
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from run_limits import combine_args, combine_command, output_file, file_hash
+
+
+state_name = "build_state.json"
+stages = ["card", "workspace", "limit"]
+
+# combined template: (template of the output card, [(channel label, template of the input card)])
+combined_cards = [(5, [("XYHto4b_5_5_4_4", 2), ("XYHto4b_5_5_5_4", 3), ("XYHto4b_5_5_5_5", 4)])]
+
+card_pattern = re.compile(r"4b_(\d+)_.*MX-(\d+)_MY-(\d+)")
+
+
+class FileHashes:
+
+    # content hashes, recomputed only when (size, mtime) of the file changed
+    def __init__(self, cached=None):
+        self.cached = cached or {}
+
+    def get(self, path):
+
+        stat = os.stat(path)
+        entry = self.cached.get(path)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+            self.cached[path] = entry
+
+        return entry[2]
+
+
+def shape_files(card):
+
+    # ROOT files of the "shapes" lines of a datacard (relative to the card directory)
+    files = []
+    if not os.path.exists(card):
+        return files
+
+    with open(card) as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) >= 4 and tokens[0] == "shapes":
+                path = tokens[3] if os.path.isabs(tokens[3]) else os.path.join(os.path.dirname(card), tokens[3])
+                files.append(os.path.abspath(path))
+
+    return sorted(set(files))
+
+def template_card(card, template):
+
+    directory, name = os.path.split(card)
+    return os.path.join(directory, re.sub(r"4b_\d+_", f"4b_{template}_", name, count=1))
+
+def make_graph(card_dir, workspace_dir, limit_dir, templates=None, stage="limit"):
+
+    # {target name: {"output", "inputs" (files), "deps" (targets), "command", "cwd", "stdout"}}
+    cards = {}
+    for card in glob.glob(os.path.join(os.path.abspath(card_dir), "*.txt")):
+        match = card_pattern.search(os.path.basename(card))
+        if match:
+            cards[tuple(int(value) for value in match.groups())] = card
+
+    targets = {}
+    shapes = {key: shape_files(card) for key, card in cards.items()}
+
+    for template, channels in combined_cards:
+        for (t, mx, my), card in list(cards.items()):
+            if t != channels[0][1] or not all((ct, mx, my) in cards for _, ct in channels):
+                continue
+
+            output = template_card(card, template)
+            inputs = [cards[(ct, mx, my)] for _, ct in channels]
+            targets[f"card_{template}_{mx}_{my}"] = {
+                "output": output,
+                "inputs": inputs + sorted(set(sum([shapes[(ct, mx, my)] for _, ct in channels], []))),
+                "deps": [],
+                "command": ["combineCards.py"] + [f"{label}={cards[(ct, mx, my)]}" for label, ct in channels],
+                "cwd": os.path.dirname(output),
+                "stdout": output,
+            }
+            cards[(template, mx, my)] = output
+            shapes[(template, mx, my)] = targets[f"card_{template}_{mx}_{my}"]["inputs"][len(inputs):]
+
+    if stage == "card":
+        return targets
+
+    for (t, mx, my), card in cards.items():
+        if templates and t not in templates:
+            continue
+
+        name = f"{t}_{mx}_{my}"
+        card_target = f"card_{name}" if f"card_{name}" in targets else None
+
+        workspace = os.path.join(os.path.abspath(workspace_dir), "workspace_" + os.path.basename(card).replace(".txt", ".root"))
+        targets[f"workspace_{name}"] = {
+            "output": workspace,
+            "inputs": [card] + shapes[(t, mx, my)],
+            "deps": [card_target] if card_target else [],
+            "command": ["text2workspace.py", card, "-o", workspace],
+            "cwd": os.path.dirname(card),
+            "stdout": None,
+        }
+
+        if stage == "limit":
+            job = {"name": name, "workspace": workspace}
+            targets[f"limit_{name}"] = {
+                "output": output_file(job, os.path.abspath(limit_dir)),
+                "inputs": [workspace],
+                "deps": [f"workspace_{name}"],
+                "command": combine_command(job, combine_args),
+                "cwd": os.path.abspath(limit_dir),
+                "stdout": None,
+            }
+
+    return targets
+
+def target_key(target, hashes):
+
+    # hash of the command and of the content of all inputs
+    digest = hashlib.sha1(" ".join(target["command"]).encode())
+    for path in target["inputs"]:
+        digest.update(f"{path}:{hashes.get(path) if os.path.exists(path) else 'missing'}".encode())
+
+    return digest.hexdigest()
+
+def outdated(name, target, state, hashes):
+
+    # returns the reason why the target has to be rebuilt, or None
+    if not os.path.exists(target["output"]):
+        return "output missing"
+
+    missing = [path for path in target["inputs"] if not os.path.exists(path)]
+    if missing:
+        return f"input missing: {missing[0]}"
+
+    entry = state["targets"].get(name)
+    if entry is None:
+        return "not built by this tool yet"
+    if entry["command"] != target["command"]:
+        return "command changed"
+    if entry["key"] != target_key(target, hashes):
+        changed = [path for path in target["inputs"] if entry["inputs"].get(path) != hashes.get(path)]
+        return f"input changed: {', '.join(os.path.basename(path) for path in changed) or 'inputs list'}"
+
+    return None
+
+def run_target(target):
+
+    os.makedirs(os.path.dirname(target["output"]), exist_ok=True)
+    log_path = target["output"] + ".log"
+
+    if target["stdout"]:
+        # combineCards.py writes the card to stdout, the card only replaces the old one if it succeeded
+        tmp_path = target["stdout"] + ".tmp"
+        try:
+            with open(tmp_path, "w") as out, open(log_path, "w") as log:
+                process = subprocess.run(target["command"], cwd=target["cwd"], stdout=out, stderr=log)
+            if process.returncode == 0:
+                os.replace(tmp_path, target["stdout"])
+        finally:
+            # no partial card is left next to the real ones
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    else:
+        with open(log_path, "w") as log:
+            process = subprocess.run(target["command"], cwd=target["cwd"], stdout=log, stderr=subprocess.STDOUT)
+
+    return process.returncode == 0 and os.path.exists(target["output"])
+
+def read_state(path):
+
+    if not os.path.exists(path):
+        return {"files": {}, "targets": {}}
+
+    with open(path) as state_file:
+        return json.load(state_file)
+
+def write_state(path, state):
+
+    with open(path + ".tmp", "w") as state_file:
+        json.dump(state, state_file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def dry_run(targets, state, hashes, explain=False):
+
+    # outdated targets and the ones depending on them, in dependency order
+    rebuild = {}
+    for name in topological_order(targets):
+        reason = outdated(name, targets[name], state, hashes)
+        rebuilt_deps = [dep for dep in targets[name]["deps"] if dep in rebuild]
+        if reason is None and rebuilt_deps:
+            reason = f"dependency rebuilt: {rebuilt_deps[0]}"
+        if reason is not None:
+            rebuild[name] = reason
+            print(f"rebuild {name}" + (f" ({reason})" if explain else ""))
+        elif explain:
+            print(f"up to date {name}")
+
+    print(f"Targets: {len(targets)}, to rebuild: {len(rebuild)}")
+
+def topological_order(targets):
+
+    order, visited = [], set()
+
+    def visit(name):
+        if name in visited:
+            return
+        visited.add(name)
+        for dep in targets[name]["deps"]:
+            visit(dep)
+        order.append(name)
+
+    for name in sorted(targets):
+        visit(name)
+
+    return order
+
+def build(targets, state, hashes, state_path, n_workers=None, explain=False):
+
+    pending = set(targets)
+    done, failed = set(), set()
+    n_built = 0
+
+    with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+        running = {}
+
+        while pending or running:
+
+            for name in sorted(pending):
+                deps = targets[name]["deps"]
+                if any(dep in failed for dep in deps):
+                    pending.remove(name)
+                    failed.add(name)
+                    print(f"skipped {name} (dependency failed)")
+                    continue
+                if not all(dep in done for dep in deps):
+                    continue
+
+                pending.remove(name)
+
+                # checked only now, so the outputs of the dependencies built in this run are hashed
+                reason = outdated(name, targets[name], state, hashes)
+                if reason is None:
+                    done.add(name)
+                    continue
+
+                if explain:
+                    print(f"building {name} ({reason})")
+                running[pool.submit(run_target, targets[name])] = name
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                target = targets[name]
+
+                try:
+                    success = future.result()
+                except Exception as e:
+                    # e.g. combineCards.py or text2workspace.py not in PATH, the other targets are still scheduled
+                    failed.add(name)
+                    print(f"failed {name}: {e}")
+                    continue
+
+                if success:
+                    done.add(name)
+                    n_built += 1
+                    state["targets"][name] = {"key": target_key(target, hashes), "command": target["command"],
+                                              "inputs": {path: hashes.get(path) for path in target["inputs"]}}
+                    state["files"] = hashes.cached
+                    write_state(state_path, state)
+                    print(f"built {name}")
+                else:
+                    failed.add(name)
+                    print(f"failed {name} (log: {target['output']}.log)")
+
+    print(f"Targets: {len(targets)}, built: {n_built}, up to date: {len(done) - n_built}, failed: {len(failed)}")
+    return failed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-cards", "--cards", required=True, help="datacard directory")
+    parser.add_argument("-workspaces", "--workspaces", required=True, help="workspace directory")
+    parser.add_argument("-limits", "--limits", default=None, help="directory of the combine outputs (default: workspace directory)")
+    parser.add_argument("-stage", "--stage", default="limit", choices=stages, help="last stage to build")
+    parser.add_argument("-t", "--templates", nargs="+", type=int, default=None, help="templates of the workspaces and limits (default: all)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="parallel targets")
+    parser.add_argument("-n", "--dry_run", action="store_true", help="only show what would be rebuilt")
+    parser.add_argument("-explain", "--explain", action="store_true", help="show why each target is rebuilt")
+
+    args = parser.parse_args()
+
+    state_path = os.path.join(args.workspaces, state_name)
+    state = read_state(state_path)
+    hashes = FileHashes(state["files"])
+
+    targets = make_graph(args.cards, args.workspaces, args.limits or args.workspaces, args.templates, args.stage)
+
+    if args.dry_run:
+        dry_run(targets, state, hashes, explain=args.explain)
+    else:
+        os.makedirs(args.workspaces, exist_ok=True)
+        failed = build(targets, state, hashes, state_path, args.jobs, explain=args.explain)
+        if failed:
+            print("rerun the same command to retry the failed targets")
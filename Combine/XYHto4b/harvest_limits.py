@@ -0,0 +1,153 @@
+#######################################################
+
+# This script reads the limit trees of all higgsCombine<scenario>_<MX>_<MY>.*.root files (in parallel, with uproot)
+# and writes one limits table, with one row per file:
+# Scenario, MX, MY, Minus2, Minus1, Expected, Plus1, Plus2, Observed, Limits, File, Size, Mtime
+# Minus2 ... Plus2 are the expected quantiles (-2 sigma ... +2 sigma, quantileExpected 0.025 ... 0.975),
+# Observed is quantileExpected = -1, and Limits is the value used in the plots, as before in plotLimits.py:
+# the median, or the observed limit if the tree has not 6 entries (5 expected + 1 observed).
+# The table is refreshed incrementally: only new or changed files (size, mtime) are read again,
+# and the rows of files which no longer exist are dropped. Rows of scenarios outside -t are kept in the table.
+# The output format is chosen by the extension: .csv or .parquet
+
+# command to run this scripts:
+# python3 harvest_limits.py -i workspace_v3 -o workspace_v3/limits.csv
+# optional: -t [scenarios, e.g. 1 2 3] -j [parallel processes] -force (read all files again)
+
+# from python (plotLimits.py):
+# df = harvest(input_dir, output_file, templates)
+
+#######################################################
+
+import argparse
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import uproot
+
+
+quantiles = {"Minus2": 0.025, "Minus1": 0.16, "Expected": 0.5, "Plus1": 0.84, "Plus2": 0.975, "Observed": -1.0}
+columns = ["Scenario", "MX", "MY"] + list(quantiles) + ["Limits", "File", "Size", "Mtime"]
+
+file_pattern = re.compile(r"higgsCombine(\d+)_(\d+)_(\d+)\.")
+
+
+def find_files(input_dir, templates=None):
+
+    files = []
+    for path in glob.glob(os.path.join(input_dir, "higgsCombine*.root")):
+        match = file_pattern.match(os.path.basename(path))
+        if match is None or (templates and int(match.group(1)) not in templates):
+            continue
+        files.append(os.path.abspath(path))
+
+    return sorted(files)
+
+def read_limits(path):
+
+    # one row of the table
+    scenario, mx, my = (int(value) for value in file_pattern.match(os.path.basename(path)).groups())
+
+    with uproot.open(path) as root_file:
+        tree = root_file["limit"]
+        arrays = tree.arrays(["limit", "quantileExpected"], library="np")
+
+    limit, quantile = arrays["limit"], arrays["quantileExpected"]
+
+    row = {"Scenario": scenario, "MX": mx, "MY": my}
+    for name, q in quantiles.items():
+        selected = np.isclose(quantile, q, atol=1e-3)
+        row[name] = float(limit[selected][0]) if selected.any() else np.nan
+
+    if len(limit) != 6: # 6 -> 5 expected + 1 observed
+        row["Limits"] = float(limit[-1]) # -1 = observed
+    else:
+        row["Limits"] = row["Expected"]
+
+    stat = os.stat(path)
+    row.update({"File": path, "Size": stat.st_size, "Mtime": stat.st_mtime_ns})
+
+    return row
+
+def read_table(output_file):
+
+    if not os.path.exists(output_file):
+        return pd.DataFrame(columns=columns)
+
+    if output_file.endswith(".parquet"):
+        return pd.read_parquet(output_file)
+    return pd.read_csv(output_file)
+
+def write_table(df, output_file):
+
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+    tmp_file = output_file + ".tmp"
+    if output_file.endswith(".parquet"):
+        df.to_parquet(tmp_file, index=False)
+    else:
+        df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, output_file)
+
+def harvest(input_dir, output_file, templates=None, jobs=None, force=False):
+
+    files = find_files(input_dir, templates)
+    df_old = read_table(output_file)
+
+    # rows of the selected files which changed (all of them with force) are read again, rows of files which
+    # no longer exist are dropped, the other rows are kept (also the scenarios outside templates, so runs with
+    # different -t can share one table)
+    stats = {path: (os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in files}
+    stale = np.array([path in stats and (force or stats[path] != (size, mtime))
+                      for path, size, mtime in zip(df_old["File"], df_old["Size"], df_old["Mtime"])], dtype=bool)
+    exists = np.array([os.path.exists(path) for path in df_old["File"]], dtype=bool)
+    df_kept = df_old[exists & ~stale]
+    to_read = sorted(set(files) - set(df_kept["File"]))
+
+    rows, failed = [], []
+    if to_read:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for path, future in zip(to_read, [pool.submit(read_limits, path) for path in to_read]):
+                try:
+                    rows.append(future.result())
+                except Exception as error:
+                    failed.append(path)
+                    print(f"failed: {path} ({error})")
+
+    n_removed = int((~exists).sum())
+    print(f"Files: {len(files)}, from table: {len(set(files) & set(df_kept['File']))}, read: {len(rows)}, failed: {len(failed)}, removed: {n_removed}")
+
+    parts = [part for part in [df_kept, pd.DataFrame(rows, columns=columns)] if len(part)]
+    df = pd.concat(parts, ignore_index=True) if parts else df_kept
+    df = df.astype({"Scenario": int, "MX": int, "MY": int, **{name: float for name in quantiles}, "Limits": float, "Size": np.int64, "Mtime": np.int64})
+    df = df.sort_values(["Scenario", "MY", "MX"]).reset_index(drop=True)
+
+    if to_read or n_removed or stale.any():
+        write_table(df, output_file)
+
+    # only the selected scenarios are returned
+    if templates:
+        df = df[df["Scenario"].isin(templates)].reset_index(drop=True)
+
+    return df
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input_dir", required=True, help="directory with the higgsCombine files")
+    parser.add_argument("-o", "--output", default=None, help="limits table, .csv or .parquet (default: <input_dir>/limits.csv)")
+    parser.add_argument("-t", "--templates", nargs="+", type=int, default=None, help="scenarios (default: all)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="parallel processes")
+    parser.add_argument("-force", "--force", action="store_true", help="read all files again")
+
+    args = parser.parse_args()
+
+    output_file = args.output or os.path.join(args.input_dir, "limits.csv")
+    df = harvest(args.input_dir, output_file, args.templates, args.jobs, args.force)
+
+    print(f"Output: {output_file}")
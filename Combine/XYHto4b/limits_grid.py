@@ -0,0 +1,267 @@
+#######################################################
+
+# This script puts the limits table of harvest_limits.py into a dense grid (scenario x MX x MY)
+# with a mask of the missing points, fills the missing points and draws 2D heatmaps and exclusion contours
+# of each scenario from the same grid.
+# Fill strategies (vectorized over the whole grid):
+#   x10       = 10 x the limit of the previous MX (same scenario and MY), 0 if there is none (as before in plotLimits.py)
+#   loglinear = linear interpolation of log(limit) in MX between the neighbouring points,
+#               extrapolated from the two closest points at the ends of the MX range
+#   2d        = linear interpolation of log(limit) in the (MX, MY) plane, nearest point outside the convex hull (scipy)
+# By default only the points which exist for another scenario are filled (failed fits),
+# not the (MX, MY) points which were never produced. A list of [scenario, MX, MY] can be given instead,
+# its points are only filled for the scenarios and MY which are in the limits table (a new MX is added).
+
+# command to run this scripts:
+# python3 limits_grid.py -i workspace_v3/limits.csv -o ExpLimits_v3
+# optional: -fill [x10/loglinear/2d] -levels [limits of the contours in pb] -value [column of the table, default = Limits]
+
+# from python (plotLimits.py):
+# grid = make_grid(df, points=unavailable); fill(grid, "x10", unavailable); df = to_frame(grid)
+
+#######################################################
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import mplhep as hep
+
+
+strategies = ["x10", "loglinear", "2d"]
+
+
+class LimitsGrid:
+
+    def __init__(self, scenarios, mx, my, values, missing):
+
+        self.scenarios = scenarios
+        self.mx = mx
+        self.my = my
+        self.values = values            # (scenario, MX, MY), NaN where missing
+        self.missing = missing          # True where there is no limit
+        self.filled = np.zeros_like(missing)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def point_mask(self, points):
+
+        # [[scenario, MX, MY], ...] -> mask of the grid, points outside the grid are ignored
+        mask = np.zeros(self.shape, dtype=bool)
+        if len(points) == 0:
+            return mask
+
+        points = np.asarray(points)
+        idx_s = np.searchsorted(self.scenarios, points[:, 0])
+        idx_x = np.searchsorted(self.mx, points[:, 1])
+        idx_y = np.searchsorted(self.my, points[:, 2])
+
+        inside = (idx_s < len(self.scenarios)) & (idx_x < len(self.mx)) & (idx_y < len(self.my))
+        idx_s, idx_x, idx_y, points = idx_s[inside], idx_x[inside], idx_y[inside], points[inside]
+        inside = (self.scenarios[idx_s] == points[:, 0]) & (self.mx[idx_x] == points[:, 1]) & (self.my[idx_y] == points[:, 2])
+
+        mask[idx_s[inside], idx_x[inside], idx_y[inside]] = True
+        return mask
+
+
+def make_grid(df, value="Limits", points=None):
+
+    # points = [[scenario, MX, MY], ...] which are also added to the axes, e.g. the points to fill,
+    # only for the scenarios and MY of df (as before in plotLimits.py), so they may add a MX but no scenario or MY
+    points = np.asarray(points if points is not None and len(points) else np.zeros((0, 3)), dtype=df["MX"].dtype)
+    points = points[np.isin(points[:, 0], df["Scenario"].to_numpy()) & np.isin(points[:, 2], df["MY"].to_numpy())]
+
+    scenarios = np.unique(np.concatenate([df["Scenario"].to_numpy(), points[:, 0]]))
+    mx = np.unique(np.concatenate([df["MX"].to_numpy(), points[:, 1]]))
+    my = np.unique(np.concatenate([df["MY"].to_numpy(), points[:, 2]]))
+
+    values = np.full((len(scenarios), len(mx), len(my)), np.nan)
+    values[np.searchsorted(scenarios, df["Scenario"]), np.searchsorted(mx, df["MX"]), np.searchsorted(my, df["MY"])] = df[value]
+
+    return LimitsGrid(scenarios, mx, my, values, np.isnan(values))
+
+def _previous(available, axis=1):
+
+    # index of the last available point before each point along the axis, -1 if there is none
+    shape = [1] * available.ndim
+    shape[axis] = available.shape[axis]
+    idx = np.where(available, np.arange(available.shape[axis]).reshape(shape), -1)
+
+    last = np.maximum.accumulate(idx, axis=axis)
+    return np.concatenate([np.full_like(np.take(last, [0], axis=axis), -1), np.delete(last, -1, axis=axis)], axis=axis)
+
+def _next(available, axis=1):
+
+    # index of the first available point after each point along the axis, -1 if there is none
+    flipped = np.flip(_previous(np.flip(available, axis=axis), axis=axis), axis=axis)
+    return np.where(flipped < 0, -1, available.shape[axis] - 1 - flipped)
+
+def _fill_x10(grid, mask):
+
+    prev = _previous(~grid.missing)
+    prev_values = np.take_along_axis(grid.values, np.clip(prev, 0, None), axis=1)
+
+    return np.where(mask, np.where(prev >= 0, 10 * prev_values, 0.0), grid.values)
+
+def _fill_loglinear(grid, mask):
+
+    available = ~grid.missing
+    log_values = np.log(np.where(available & (grid.values > 0), grid.values, np.nan))
+
+    prev, nxt = _previous(available), _next(available)
+    prev2 = np.where(prev >= 0, np.take_along_axis(prev, np.clip(prev, 0, None), axis=1), -1)
+    next2 = np.where(nxt >= 0, np.take_along_axis(nxt, np.clip(nxt, 0, None), axis=1), -1)
+
+    # two anchor points (a, b): both neighbours, or the two closest points on one side
+    a = np.where((prev >= 0) & (nxt >= 0), prev, np.where(prev2 >= 0, prev2, np.where(nxt >= 0, nxt, prev)))
+    b = np.where((prev >= 0) & (nxt >= 0), nxt, np.where(prev2 >= 0, prev, np.where(next2 >= 0, next2, a)))
+
+    found = a >= 0
+    a, b = np.clip(a, 0, None), np.clip(b, 0, None)
+
+    mx = np.broadcast_to(grid.mx[None, :, None].astype(float), grid.shape)
+    x_a, x_b = np.take_along_axis(mx, a, axis=1), np.take_along_axis(mx, b, axis=1)
+    y_a, y_b = np.take_along_axis(log_values, a, axis=1), np.take_along_axis(log_values, b, axis=1)
+
+    slope = np.divide(y_b - y_a, x_b - x_a, out=np.zeros(grid.shape), where=x_b != x_a)
+    filled = np.exp(y_a + slope * (mx - x_a))
+
+    return np.where(mask & found, filled, grid.values)
+
+def _fill_2d(grid, mask):
+
+    from scipy.interpolate import griddata
+
+    values = grid.values.copy()
+    mx, my = np.meshgrid(grid.mx, grid.my, indexing="ij")
+
+    for idx, _ in enumerate(grid.scenarios):
+        available = ~grid.missing[idx] & (grid.values[idx] > 0)
+        todo = mask[idx]
+        if not todo.any() or available.sum() < 3:
+            continue
+
+        points = np.column_stack([mx[available], my[available]])
+        targets = np.column_stack([mx[todo], my[todo]])
+        log_values = np.log(grid.values[idx][available])
+
+        filled = griddata(points, log_values, targets, method="linear")
+        outside = np.isnan(filled)
+        if outside.any():
+            filled[outside] = griddata(points, log_values, targets[outside], method="nearest")
+
+        values[idx][todo] = np.exp(filled)
+
+    return values
+
+fill_functions = {"x10": _fill_x10, "loglinear": _fill_loglinear, "2d": _fill_2d}
+
+def fill(grid, strategy="x10", points=None):
+
+    # fills the missing points in place, points = None: all the missing points which exist for another scenario
+    if strategy not in fill_functions:
+        raise ValueError(f"strategy must be one of {strategies}, got {strategy}")
+
+    if points is None:
+        mask = grid.missing & (~grid.missing).any(axis=0, keepdims=True)
+    else:
+        mask = grid.point_mask(points) & grid.missing
+
+    values = fill_functions[strategy](grid, mask)
+
+    filled = mask & ~np.isnan(values)
+    grid.values = np.where(filled, values, grid.values)
+    grid.missing = grid.missing & ~filled
+    grid.filled = grid.filled | filled
+
+    return grid
+
+def to_frame(grid):
+
+    # the available and filled points: Scenario, MX, MY, Limits, Filled
+    idx_s, idx_x, idx_y = np.nonzero(~grid.missing)
+
+    return pd.DataFrame({"Scenario": grid.scenarios[idx_s], "MX": grid.mx[idx_x], "MY": grid.my[idx_y],
+                         "Limits": grid.values[idx_s, idx_x, idx_y], "Filled": grid.filled[idx_s, idx_x, idx_y]})
+
+def plot_heatmap(grid, idx, output_dir, label=None):
+
+    values = np.ma.masked_array(grid.values[idx], grid.missing[idx])
+
+    hep.style.use("CMS")
+    fig, ax = plt.subplots(figsize=(12, 10))
+
+    # one cell per mass point, the grid is not uniform in MX and MY
+    image = ax.pcolormesh(np.arange(len(grid.mx) + 1) - 0.5, np.arange(len(grid.my) + 1) - 0.5, np.log10(values.T), cmap="viridis")
+    fig.colorbar(image, ax=ax, label=r"$\log_{10}$(expected limit at 95% CL [pb])")
+
+    for idx_x, idx_y in zip(*np.nonzero(~grid.missing[idx])):
+        ax.text(idx_x, idx_y, f"{grid.values[idx, idx_x, idx_y]:.2g}" + ("*" if grid.filled[idx, idx_x, idx_y] else ""),
+                ha="center", va="center", fontsize=10, color="white")
+
+    ax.set_xticks(np.arange(len(grid.mx)), [str(int(value)) for value in grid.mx], rotation=45)
+    ax.set_yticks(np.arange(len(grid.my)), [str(int(value)) for value in grid.my])
+    ax.set_xlabel(r"$M_X$ [GeV]")
+    ax.set_ylabel(r"$M_Y$ [GeV]")
+    ax.set_title(label or f"Scenario {grid.scenarios[idx]}", fontsize=18)
+    hep.cms.text("Preliminary", loc=0, ax=ax)
+
+    for extension in ["png", "pdf"]:
+        fig.savefig(f"{output_dir}/Limits_heatmap_{grid.scenarios[idx]}.{extension}")
+    plt.close(fig)
+
+def plot_contour(grid, idx, output_dir, levels=(1.0,), label=None):
+
+    # contours of the limit in the (MX, MY) plane: the region below a contour is excluded for that cross section
+    values = np.ma.masked_array(grid.values[idx], grid.missing[idx])
+    if values.count() < 4:
+        return
+
+    hep.style.use("CMS")
+    fig, ax = plt.subplots(figsize=(12, 10))
+
+    mx, my = np.meshgrid(grid.mx, grid.my, indexing="ij")
+    image = ax.contourf(mx, my, np.log10(values), levels=20, cmap="viridis")
+    fig.colorbar(image, ax=ax, label=r"$\log_{10}$(expected limit at 95% CL [pb])")
+
+    contours = ax.contour(mx, my, values, levels=sorted(levels), colors="red", linewidths=2)
+    ax.clabel(contours, fmt=lambda level: f"{level:g} pb", fontsize=14)
+    ax.scatter(mx[~grid.missing[idx]], my[~grid.missing[idx]], s=8, color="black")
+
+    ax.set_xscale("log")
+    ax.set_xlabel(r"$M_X$ [GeV]")
+    ax.set_ylabel(r"$M_Y$ [GeV]")
+    ax.set_title(label or f"Scenario {grid.scenarios[idx]}", fontsize=18)
+    hep.cms.text("Preliminary", loc=0, ax=ax)
+
+    for extension in ["png", "pdf"]:
+        fig.savefig(f"{output_dir}/Limits_contour_{grid.scenarios[idx]}.{extension}")
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", required=True, help="limits table of harvest_limits.py (.csv or .parquet)")
+    parser.add_argument("-o", "--output_dir", default=".", help="output directory of the plots and the filled table")
+    parser.add_argument("-fill", "--fill", default="x10", choices=strategies, help="fill strategy of the missing points")
+    parser.add_argument("-levels", "--levels", nargs="+", type=float, default=[1.0], help="limits of the contours [pb]")
+    parser.add_argument("-value", "--value", default="Limits", help="column of the limits table")
+
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.input) if args.input.endswith(".parquet") else pd.read_csv(args.input)
+
+    grid = fill(make_grid(df, args.value), args.fill)
+    print(f"Grid: {len(grid.scenarios)} scenarios x {len(grid.mx)} MX x {len(grid.my)} MY, filled: {int(grid.filled.sum())}, missing: {int(grid.missing.sum())}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    to_frame(grid).to_csv(os.path.join(args.output_dir, f"limits_grid_{args.fill}.csv"), index=False)
+
+    for idx in range(len(grid.scenarios)):
+        plot_heatmap(grid, idx, args.output_dir)
+        plot_contour(grid, idx, args.output_dir, args.levels)
@@ -3,91 +3,65 @@
 # This script extracts expected limits from Combine output ROOT files for various signal scenarios
 # and plots the expected limits vs MX for each MY. 
 # It saves both linear and log-scale plots. 
+# The limits are read once from the limits table of harvest_limits.py (refreshed with the new higgsCombine files),
+# and the same table is used for the linear and the log plots.
 
 # command to run this scripts:
 # python3 plotLimits.py
-# please check "input_dir", "output_dir", "templates", "unavailable" and "label_list" before running
+# please check "input_dir", "output_dir", "templates", "unavailable", "fill_strategy" and "label_list" before running
 
 # Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
 # 27 Mar 2025
 
 #######################################################
 
-import ROOT
 import os
-import glob
-import pandas as pd
 import matplotlib.pyplot as plt
 import mplhep as hep
+from harvest_limits import harvest
+import limits_grid
 
 
-def plotLimits(log=False):
+input_dir = "/afs/desy.de/user/c/chokepra/private/XtoYH4b/CMSSW_14_2_1/src/CombineHarvester/CombineTools/XYHto4b/workspace_v3"
+output_dir = "/afs/desy.de/user/c/chokepra/private/XtoYH4b/CMSSW_14_2_1/src/CombineHarvester/CombineTools/XYHto4b/ExpLimits_v3"
 
+templates = [1, 2, 3, 4, 5, 6]
+# templates = [6, 7, 8, 9] # for v6
 
-    input_dir = "/afs/desy.de/user/c/chokepra/private/XtoYH4b/CMSSW_14_2_1/src/CombineHarvester/CombineTools/XYHto4b/workspace_v3"
-    output_dir = "/afs/desy.de/user/c/chokepra/private/XtoYH4b/CMSSW_14_2_1/src/CombineHarvester/CombineTools/XYHto4b/ExpLimits_v3"
-    
-    templates = [1, 2, 3, 4, 5, 6]
-    # templates = [6, 7, 8, 9] # for v6
+# v1, v2, v3 (no unavailable)
+unavailable = []
 
-    # v1, v2, v3 (no unavailable)
-    unavailable = []
+# v4
+# unavailable = [[1, 4000, 60],  
+#                [2, 2500, 60],
+#                [2, 4000, 60],
+#                [2, 4000, 95],  
+#                [3, 4000, 60], 
+#                [4, 4000, 60], 
+#                [5, 4000, 60], 
+#                [6, 4000, 60]]
 
-    # v4
-    # unavailable = [[1, 4000, 60],  
-    #                [2, 2500, 60],
-    #                [2, 4000, 60],
-    #                [2, 4000, 95],  
-    #                [3, 4000, 60], 
-    #                [4, 4000, 60], 
-    #                [5, 4000, 60], 
-    #                [6, 4000, 60]]
+# v5
+# unavailable = [[1, 4000, 60],   
+#                [3, 4000, 60], 
+#                [4, 4000, 60], 
+#                [5, 4000, 60], 
+#                [6, 4000, 60]]
 
-    # v5
-    # unavailable = [[1, 4000, 60],   
-    #                [3, 4000, 60], 
-    #                [4, 4000, 60], 
-    #                [5, 4000, 60], 
-    #                [6, 4000, 60]]
+# v6
+# unavailable = [[8, 4000, 60], 
+#                [9, 4000, 60]]
 
-    # v6
-    # unavailable = [[8, 4000, 60], 
-    #                [9, 4000, 60]]
+# fill of the unavailable points (limits_grid.py): "x10" (10 x the previous MX), "loglinear" or "2d"
+fill_strategy = "x10"
 
-    unavailable_df = pd.DataFrame(unavailable, columns=["Scenario", "MX", "MY"])
+# limits table (harvest_limits.py)
+limits_file = os.path.join(input_dir, "limits.csv")
 
-    file_list = []
-    for template in templates:
-        files = glob.glob(os.path.join(input_dir, f"higgsCombine{template}*"))
-        file_list.extend([f for f in files])
 
-    data = []
-    # for root_file in args.input:
-    for root_file in file_list:
+def plotLimits(df, log=False):
 
-        file_name = os.path.basename(root_file)
-
-        scenario, MX, MY = file_name.split("higgsCombine")[1].split(".")[0].split("_")
-
-        scenario = int(scenario)
-        MX       = int(MX)
-        MY       = int(MY)
-
-        file = ROOT.TFile.Open(root_file)
-        tree = file.Get("limit")
-
-        limits = [confidence_level.limit for confidence_level in tree]
-
-        if len(limits) != 6: # 6 -> 5 expected + 1 observed
-            observed = limits[-1] # -1 = observed
-            expected = observed
-        else:
-            expected = limits[2] # 2 = median
-
-        data.append([scenario, MX, MY, expected])
-
-    columns = ["Scenario", "MX", "MY", "Limits"]
-    df = pd.DataFrame(data, columns=columns)
+    # df: available and filled points (limits_grid.to_frame), sorted by MX
 
     unique_scenes = df["Scenario"].unique()
     unique_MY = df["MY"].unique()
@@ -107,31 +81,6 @@ def plotLimits(log=False):
 
             for idx_label, scene in enumerate(unique_scenes):
                 df_filtered = df_my[df_my["Scenario"] == scene]
-                df_filtered = df_filtered.sort_values(by="MX")
-                unavailable_for_scene = unavailable_df[(unavailable_df["Scenario"] == scene) & (unavailable_df["MY"] == my)]
-
-                new_rows = []
-                for _, row in unavailable_for_scene.iterrows():
-                    mX, mY = row["MX"], row["MY"]
-
-                    if not ((df_filtered["MX"] == mX) & (df_filtered["MY"] == mY)).any():
-
-                        prev_row = df_filtered[df_filtered["MX"] < mX].iloc[-1:]
-
-                        if not prev_row.empty:
-                            new_limit = prev_row["Limits"].values[0] * 10 
-                        else:
-                            new_limit = 0
-
-                        new_rows.append({"Scenario": scene, "MX": mX, "MY": mY, "Limits": new_limit})
-
-                if new_rows:
-                    # print(new_rows)
-                    df_filtered = pd.concat([df_filtered, pd.DataFrame(new_rows)], ignore_index=True)
-
-                df_filtered = df_filtered.sort_values(by="MX")
-
-                # print(df_filtered)
 
                 if df_filtered["Limits"].max() > 30:
                     exceed_limits = True
@@ -161,5 +110,11 @@ def plotLimits(log=False):
 
 if __name__ == "__main__":
 
-    plotLimits(log=False)
-    plotLimits(log=True)
+    # one harvest and one filled grid for both plots
+    df = harvest(input_dir, limits_file, templates)
+
+    grid = limits_grid.make_grid(df, points=unavailable)
+    df = limits_grid.to_frame(limits_grid.fill(grid, fill_strategy, unavailable))
+
+    plotLimits(df, log=False)
+    plotLimits(df, log=True)
@@ -0,0 +1,283 @@
+#######################################################
+
+# This script runs the Combine expected limits (combine -t -1) for all workspaces,
+# replacing the loops of run_limit.sh (serial) and run_limit_condor.sh (condor files only).
+# The workspaces are found by (template, MX, MY) from their names (workspace_XYH_4b_<template>_..._MX-<MX>_MY-<MY>...).
+# Backends:
+#   local  = combine jobs run in parallel on this machine (-j), failed jobs are retried (-retries)
+#   condor = execute_*.sh and submit_*.sub are written, plus condor_submit.sh to submit them all,
+#            -collect afterwards reads the finished jobs back
+# Every result is cached (limit_cache.json in the output directory) with the hash of the workspace and
+# of the combine options, so a rerun only recomputes new or changed workspaces and the failed ones.
+# The runtime of each job is kept in the cache, and the longest jobs (from the previous run) are started first.
+
+# command to run this scripts:
+# python3 run_limits.py -i workspace_v6 -j 16
+# python3 run_limits.py -i workspace_v6 -backend condor, then after the jobs are done: python3 run_limits.py -i workspace_v6 -collect
+# optional: -t [templates, e.g. 1 2 3] -o [output directory, default = input directory] -retries [number] -force
+# the outputs are higgsCombine<template>_<MX>_<MY>.AsymptoticLimits.mH120.root, as before (plotLimits.py)
+
+#######################################################
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+combine_args = ["-t", "-1", "--rMin", "-100", "--rMax", "100"]
+cache_name = "limit_cache.json"
+
+workspace_pattern = re.compile(r"4b_(\d+)_.*MX-(\d+)_MY-(\d+)")
+
+
+def find_workspaces(input_dir, templates=None):
+
+    # [{"template", "MX", "MY", "workspace", "name"}] sorted by (template, MX, MY)
+    jobs = []
+    for workspace in glob.glob(os.path.join(input_dir, "workspace*.root")):
+        match = workspace_pattern.search(os.path.basename(workspace))
+        if match is None:
+            continue
+
+        template, mx, my = (int(value) for value in match.groups())
+        if templates and template not in templates:
+            continue
+
+        jobs.append({"template": template, "MX": mx, "MY": my, "workspace": os.path.abspath(workspace),
+                     "name": f"{template}_{mx}_{my}"})
+
+    return sorted(jobs, key=lambda job: (job["template"], job["MX"], job["MY"]))
+
+def file_hash(path, chunk_size=1 << 20):
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+def job_hash(job, args):
+
+    # the workspace content and the combine options
+    return hashlib.sha1(f"{file_hash(job['workspace'])}:{' '.join(args)}".encode()).hexdigest()
+
+def output_file(job, output_dir, method="AsymptoticLimits"):
+
+    return os.path.join(output_dir, f"higgsCombine{job['name']}.{method}.mH120.root")
+
+def combine_command(job, args):
+
+    return ["combine"] + args + [job["workspace"], "-n", job["name"]]
+
+def read_cache(output_dir):
+
+    path = os.path.join(output_dir, cache_name)
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as cache_file:
+        return json.load(cache_file)
+
+def write_cache(output_dir, cache):
+
+    path = os.path.join(output_dir, cache_name)
+    with open(path + ".tmp", "w") as cache_file:
+        json.dump(cache, cache_file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def is_done(job, cache, output_dir):
+
+    entry = cache.get(job["name"])
+    return entry is not None and entry.get("status") == "done" and entry.get("hash") == job["hash"] and os.path.exists(output_file(job, output_dir))
+
+def run_job(job, args, output_dir, retries=0):
+
+    # returns (status, runtime in s, attempts, last lines of the log)
+    log_path = os.path.join(output_dir, f"job_{job['name']}.log")
+
+    for attempt in range(1, retries + 2):
+        time_start = time.perf_counter()
+        with open(log_path, "w") as log:
+            process = subprocess.run(combine_command(job, args), cwd=output_dir, stdout=log, stderr=subprocess.STDOUT)
+        runtime = time.perf_counter() - time_start
+
+        if process.returncode == 0 and os.path.exists(output_file(job, output_dir)):
+            return "done", runtime, attempt, ""
+
+    with open(log_path) as log:
+        tail = "".join(log.readlines()[-5:])
+
+    return "failed", runtime, attempt, tail
+
+def run_local(jobs, cache, args, output_dir, n_workers=None, retries=0):
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+
+        futures = {pool.submit(run_job, job, args, output_dir, retries): job for job in jobs}
+
+        for idx, future in enumerate(as_completed(futures)):
+            job = futures[future]
+            try:
+                status, runtime, attempts, tail = future.result()
+            except Exception as e:
+                # e.g. combine not in PATH or the log not writable, the job is recorded as failed and retried next run
+                status, runtime, attempts, tail = "failed", 0.0, 0, str(e)
+
+            cache[job["name"]] = {"hash": job["hash"], "workspace": job["workspace"], "status": status,
+                                  "runtime": runtime, "attempts": attempts}
+            # the cache is written after every job, so an interrupted run keeps the finished ones
+            write_cache(output_dir, cache)
+
+            print(f"[{idx + 1}/{len(jobs)}] {status}: {job['name']} ({runtime:.1f} s, {attempts} attempts)")
+            if status != "done":
+                failed.append(job)
+                print(tail)
+
+    return failed
+
+def submit_condor(jobs, cache, args, output_dir, n_workers=None, retries=0):
+
+    # one executable and one submit file per job, as run_limit_condor.sh, the runtime is written by the job
+    submission_file = os.path.join(output_dir, "condor_submit.sh")
+
+    with open(submission_file, "w") as submission:
+        submission.write("#!/bin/bash\n")
+
+        for job in jobs:
+            name = job["name"]
+            execute_file = os.path.join(output_dir, f"execute_{name}.sh")
+            submit_file = os.path.join(output_dir, f"submit_{name}.sub")
+
+            with open(execute_file, "w") as execute:
+                execute.write(f"""#!/bin/bash
+source /cvmfs/cms.cern.ch/cmsset_default.sh
+cd {output_dir}
+eval `scramv1 runtime -sh`
+start=$(date +%s)
+{" ".join(combine_command(job, args))}
+status=$?
+echo "$status $(( $(date +%s) - start ))" > {output_dir}/runtime_{name}.txt
+exit $status
+""")
+            os.chmod(execute_file, 0o755)
+
+            with open(submit_file, "w") as submit:
+                submit.write(f"""universe = vanilla
+executable = {execute_file}
+getenv = TRUE
+log = {output_dir}/job_{name}.log
+output = {output_dir}/job_{name}.out
+error = {output_dir}/job_{name}.err
+notification = never
+should_transfer_files = YES
+when_to_transfer_output = ON_EXIT
+max_retries = {retries}
++MaxRuntime = 100000
+queue
+""")
+
+            submission.write(f"condor_submit {submit_file}\n")
+            cache[name] = {"hash": job["hash"], "workspace": job["workspace"], "status": "submitted"}
+
+            # files of a previous submission, so -collect only reads the results of this one
+            for old_file in [f"runtime_{name}.txt", f"job_{name}.out", f"job_{name}.err", f"job_{name}.log"]:
+                if os.path.exists(os.path.join(output_dir, old_file)):
+                    os.remove(os.path.join(output_dir, old_file))
+
+    os.chmod(submission_file, 0o755)
+    write_cache(output_dir, cache)
+
+    print(f"Created {len(jobs)} condor jobs, submit them with: {submission_file}")
+    return []
+
+def collect_condor(cache, output_dir):
+
+    # updates the submitted jobs from the runtime files written by the condor jobs
+    failed = []
+    for name, entry in cache.items():
+        runtime_file = os.path.join(output_dir, f"runtime_{name}.txt")
+        if entry.get("status") != "submitted" or not os.path.exists(runtime_file):
+            continue
+
+        with open(runtime_file) as f:
+            returncode, runtime = f.read().split()
+
+        done = int(returncode) == 0 and os.path.exists(output_file({"name": name}, output_dir))
+        entry.update({"status": "done" if done else "failed", "runtime": float(runtime)})
+        if not done:
+            failed.append(name)
+
+    write_cache(output_dir, cache)
+    return failed
+
+def report(cache):
+
+    status = {}
+    for entry in cache.values():
+        status[entry.get("status")] = status.get(entry.get("status"), 0) + 1
+
+    runtimes = [entry["runtime"] for entry in cache.values() if "runtime" in entry]
+    print(f"Status: {status}")
+    if runtimes:
+        print(f"Runtime: total {sum(runtimes):.0f} s, mean {sum(runtimes) / len(runtimes):.1f} s, max {max(runtimes):.1f} s")
+
+
+backends = {"local": run_local, "condor": submit_condor}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input_dir", required=True, help="directory with the workspaces")
+    parser.add_argument("-o", "--output_dir", default=None, help="directory of the combine outputs (default: input directory)")
+    parser.add_argument("-t", "--templates", nargs="+", type=int, default=None, help="templates to run (default: all)")
+    parser.add_argument("-backend", "--backend", default="local", choices=list(backends), help="local processes or condor files")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="parallel combine jobs (local)")
+    parser.add_argument("-retries", "--retries", type=int, default=1, help="retries of a failed job")
+    parser.add_argument("-args", "--args", default=" ".join(combine_args), help="combine options")
+    parser.add_argument("-force", "--force", action="store_true", help="rerun all jobs, also the cached ones")
+    parser.add_argument("-collect", "--collect", action="store_true", help="collect the finished condor jobs")
+
+    args = parser.parse_args()
+
+    output_dir = os.path.abspath(args.output_dir or args.input_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    cache = read_cache(output_dir)
+
+    if args.collect:
+        failed = collect_condor(cache, output_dir)
+        print(f"Failed: {failed}")
+        report(cache)
+        raise SystemExit
+
+    combine_options = args.args.split()
+
+    jobs = find_workspaces(args.input_dir, args.templates)
+    for job in jobs:
+        job["hash"] = job_hash(job, combine_options)
+
+    todo = [job for job in jobs if args.force or not is_done(job, cache, output_dir)]
+
+    # longest jobs first (runtime of the previous run), so the last ones do not run alone
+    todo.sort(key=lambda job: -cache.get(job["name"], {}).get("runtime", float("inf")))
+
+    print(f"Workspaces: {len(jobs)}, cached: {len(jobs) - len(todo)}, to run: {len(todo)}")
+
+    failed = backends[args.backend](todo, cache, combine_options, output_dir, args.jobs, args.retries)
+
+    if failed:
+        print(f"{len(failed)} jobs failed, rerun the same command to retry them:")
+        for job in failed:
+            print(f"  {job['name']} (log: {os.path.join(output_dir, 'job_' + job['name'] + '.log')})")
+
+    report(cache)
@@ -0,0 +1,105 @@
+# checks the dependency graph and the staleness logic of build_limits.py
+# python3 -m pytest Combine/XYHto4b/tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import build_limits
+
+
+def write(path, content):
+
+    with open(path, "w") as f:
+        f.write(content)
+
+def copy_target(source, output, deps=(), constant=None):
+
+    # target which copies its input to the output (or writes a constant), instead of the Combine tools
+    code = "import sys; open(sys.argv[2], 'w').write(open(sys.argv[1]).read() if sys.argv[3] == '' else sys.argv[3])"
+    return {"output": output, "inputs": [source], "deps": list(deps), "command": [sys.executable, "-c", code, source, output, constant or ""],
+            "cwd": os.path.dirname(output), "stdout": None}
+
+def build(targets, state, tmp_path, capsys):
+
+    hashes = build_limits.FileHashes(state["files"])
+    failed = build_limits.build(targets, state, hashes, str(tmp_path / build_limits.state_name), n_workers=2)
+    built = sorted(line.split()[1] for line in capsys.readouterr().out.splitlines() if line.startswith("built "))
+    return failed, built
+
+
+def test_make_graph(tmp_path):
+
+    card_dir, workspace_dir = tmp_path / "datacards", tmp_path / "workspaces"
+    card_dir.mkdir()
+    for template in [2, 3, 4]:
+        write(str(card_dir / f"XYH_4b_{template}_13p6TeV_2023_MX-300_MY-60.txt"),
+              f"shapes * * shapes_{template}.root $PROCESS $PROCESS_$SYSTEMATIC\n")
+
+    targets = build_limits.make_graph(str(card_dir), str(workspace_dir), str(workspace_dir))
+
+    assert sorted(targets) == ["card_5_300_60"] + [f"{stage}_{template}_300_60" for stage in ["limit", "workspace"] for template in [2, 3, 4, 5]]
+    assert targets["card_5_300_60"]["output"].endswith("XYH_4b_5_13p6TeV_2023_MX-300_MY-60.txt")
+    assert targets["workspace_5_300_60"]["deps"] == ["card_5_300_60"]
+    assert targets["limit_5_300_60"]["deps"] == ["workspace_5_300_60"]
+
+    # the shape files of the cards are inputs, the combined card has those of its three cards
+    assert str(card_dir / "shapes_2.root") in targets["workspace_2_300_60"]["inputs"]
+    assert [str(card_dir / f"shapes_{t}.root") for t in [2, 3, 4]] == targets["workspace_5_300_60"]["inputs"][1:]
+
+    assert sorted(build_limits.make_graph(str(card_dir), str(workspace_dir), str(workspace_dir), templates=[5], stage="workspace")) == \
+        ["card_5_300_60", "workspace_5_300_60"]
+
+def test_outdated_reasons(tmp_path, capsys):
+
+    write(str(tmp_path / "card.txt"), "card\n")
+    targets = {"workspace": copy_target(str(tmp_path / "card.txt"), str(tmp_path / "workspace.root"))}
+    state = build_limits.read_state(str(tmp_path / build_limits.state_name))
+    hashes = build_limits.FileHashes(state["files"])
+
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes) == "output missing"
+
+    assert build(targets, state, tmp_path, capsys) == (set(), ["workspace"])
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes) is None
+
+    # same content with a new modification time: the hash is recomputed, nothing to rebuild
+    os.utime(tmp_path / "card.txt", ns=(10**18, 10**18))
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes) is None
+
+    write(str(tmp_path / "card.txt"), "new card\n")
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes) == "input changed: card.txt"
+
+    targets["workspace"]["command"] = targets["workspace"]["command"] + ["-v"]
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes) == "command changed"
+
+    os.remove(tmp_path / "card.txt")
+    assert build_limits.outdated("workspace", targets["workspace"], state, hashes).startswith("input missing")
+
+def test_unchanged_output_does_not_rebuild_the_next_targets(tmp_path, capsys):
+
+    write(str(tmp_path / "card.txt"), "card\n")
+    targets = {"workspace": copy_target(str(tmp_path / "card.txt"), str(tmp_path / "workspace.root"), constant="workspace"),
+               "limit": copy_target(str(tmp_path / "workspace.root"), str(tmp_path / "limit.root"), deps=["workspace"])}
+    state = build_limits.read_state(str(tmp_path / build_limits.state_name))
+
+    assert build(targets, state, tmp_path, capsys) == (set(), ["limit", "workspace"])
+    assert build(targets, state, tmp_path, capsys) == (set(), [])
+
+    # the workspace is rebuilt but its content is the same, the limit is up to date
+    write(str(tmp_path / "card.txt"), "new card\n")
+    assert build(targets, state, tmp_path, capsys) == (set(), ["workspace"])
+
+    # the state is written, a new run reads it back
+    state = build_limits.read_state(str(tmp_path / build_limits.state_name))
+    assert build(targets, state, tmp_path, capsys) == (set(), [])
+
+def test_failed_target_skips_its_dependents(tmp_path, capsys):
+
+    write(str(tmp_path / "card.txt"), "card\n")
+    targets = {"workspace": copy_target(str(tmp_path / "missing.txt"), str(tmp_path / "workspace.root")),
+               "limit": copy_target(str(tmp_path / "workspace.root"), str(tmp_path / "limit.root"), deps=["workspace"]),
+               "other": copy_target(str(tmp_path / "card.txt"), str(tmp_path / "other.root"))}
+    state = build_limits.read_state(str(tmp_path / build_limits.state_name))
+
+    assert build(targets, state, tmp_path, capsys) == ({"workspace", "limit"}, ["other"])
@@ -0,0 +1,67 @@
+# checks the incremental refresh of the limits table of harvest_limits.py
+# python3 -m pytest Combine/XYHto4b/tests
+
+import os
+import sys
+import numpy as np
+import uproot
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import harvest_limits
+
+
+def write_limits(path, median, mtime=None):
+
+    # limit tree of combine -M AsymptoticLimits: 5 expected quantiles + observed
+    quantile = np.array([0.025, 0.16, 0.5, 0.84, 0.975, -1.0])
+    with uproot.recreate(path) as root_file:
+        root_file["limit"] = {"limit": median * np.array([0.5, 0.7, 1.0, 1.4, 1.9, 1.1]), "quantileExpected": quantile}
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+def harvest(tmp_path, capsys, templates=None):
+
+    df = harvest_limits.harvest(str(tmp_path), str(tmp_path / "limits.csv"), templates, jobs=1)
+    counts = dict(item.split(": ") for item in capsys.readouterr().out.strip().splitlines()[-1].split(", "))
+    return df, {name: int(value) for name, value in counts.items()}
+
+
+def test_refresh_reads_only_changed_files(tmp_path, capsys):
+
+    for name, median in [("1_300_60", 1.0), ("1_500_60", 0.5), ("2_300_60", 2.0)]:
+        write_limits(str(tmp_path / f"higgsCombine{name}.AsymptoticLimits.mH120.root"), median, mtime=10**18)
+
+    df, counts = harvest(tmp_path, capsys)
+    assert counts["read"] == 3
+    assert df[["Scenario", "MX", "MY"]].values.tolist() == [[1, 300, 60], [1, 500, 60], [2, 300, 60]]
+    assert df["Limits"].tolist() == [1.0, 0.5, 2.0]
+    assert df["Plus2"].tolist() == [1.9, 0.95, 3.8]
+
+    # nothing changed
+    df, counts = harvest(tmp_path, capsys)
+    assert counts["read"] == 0 and counts["from table"] == 3
+
+    # one file changed, one removed, one new
+    write_limits(str(tmp_path / "higgsCombine1_300_60.AsymptoticLimits.mH120.root"), 3.0, mtime=2 * 10**18)
+    os.remove(tmp_path / "higgsCombine1_500_60.AsymptoticLimits.mH120.root")
+    write_limits(str(tmp_path / "higgsCombine1_1000_60.AsymptoticLimits.mH120.root"), 0.1)
+
+    df, counts = harvest(tmp_path, capsys)
+    assert counts["read"] == 2 and counts["removed"] == 1 and counts["from table"] == 1
+    assert df[["Scenario", "MX", "Limits"]].values.tolist() == [[1, 300, 3.0], [1, 1000, 0.1], [2, 300, 2.0]]
+
+def test_subset_keeps_the_other_scenarios(tmp_path, capsys):
+
+    for name, median in [("1_300_60", 1.0), ("2_300_60", 2.0)]:
+        write_limits(str(tmp_path / f"higgsCombine{name}.AsymptoticLimits.mH120.root"), median)
+
+    harvest(tmp_path, capsys)
+
+    # only scenario 1 is returned and refreshed, the row of scenario 2 stays in the table
+    df, counts = harvest(tmp_path, capsys, templates=[1])
+    assert df["Scenario"].tolist() == [1]
+    assert counts["read"] == 0
+
+    table = harvest_limits.read_table(str(tmp_path / "limits.csv"))
+    assert table["Scenario"].tolist() == [1, 2]
@@ -0,0 +1,60 @@
+# checks the grid and the fills of limits_grid.py (plotLimits.py)
+# python3 -m pytest Combine/XYHto4b/tests
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("mplhep")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import limits_grid
+
+
+def limits_table():
+
+    # scenario 2 has no limit at MX = 1000 (failed fit)
+    rows = [[scenario, mx, 60, limit * scenario] for scenario in [1, 2] for mx, limit in [(300, 1.0), (500, 0.1), (1000, 0.01)]]
+    df = pd.DataFrame(rows, columns=["Scenario", "MX", "MY", "Limits"])
+    return df[~((df["Scenario"] == 2) & (df["MX"] == 1000))].reset_index(drop=True)
+
+
+def test_x10_fills_the_missing_points():
+
+    grid = limits_grid.fill(limits_grid.make_grid(limits_table()), "x10")
+    df = limits_grid.to_frame(grid)
+
+    filled = df[df["Filled"]]
+    assert filled[["Scenario", "MX", "MY"]].values.tolist() == [[2, 1000, 60]]
+    assert filled["Limits"].iloc[0] == pytest.approx(10 * 0.2)
+    assert grid.missing.sum() == 0
+
+def test_loglinear_extrapolates_in_mx():
+
+    grid = limits_grid.fill(limits_grid.make_grid(limits_table()), "loglinear")
+    df = limits_grid.to_frame(grid)
+
+    # log(limit) linear in MX through (300, 2) and (500, 0.2)
+    slope = (np.log(0.2) - np.log(2.0)) / 200
+    assert df[df["Filled"]]["Limits"].iloc[0] == pytest.approx(np.exp(np.log(0.2) + slope * 500))
+
+def test_points_only_for_existing_scenarios_and_my():
+
+    # a point of a new MX is filled, points of a new scenario or a new MY are not added to the grid
+    points = [[2, 1000, 60], [1, 4000, 60], [3, 1000, 60], [1, 1000, 90]]
+    grid = limits_grid.make_grid(limits_table(), points=points)
+
+    assert grid.scenarios.tolist() == [1, 2]
+    assert grid.my.tolist() == [60]
+    assert grid.mx.tolist() == [300, 500, 1000, 4000]
+
+    df = limits_grid.to_frame(limits_grid.fill(grid, "x10", points))
+    filled = df[df["Filled"]].sort_values(["Scenario", "MX"])
+
+    assert filled[["Scenario", "MX"]].values.tolist() == [[1, 4000], [2, 1000]]
+    assert filled["Limits"].tolist() == pytest.approx([10 * 0.01, 10 * 0.2])
+    assert set(df["Scenario"]) == {1, 2} and set(df["MY"]) == {60}
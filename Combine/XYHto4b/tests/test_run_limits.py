@@ -0,0 +1,33 @@
+# checks that run_limits.py -collect only reads the results of the last condor submission
+# python3 -m pytest Combine/XYHto4b/tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import run_limits
+
+
+def test_resubmission_removes_old_results(tmp_path):
+
+    output_dir = str(tmp_path)
+    job = {"template": 1, "MX": 300, "MY": 60, "workspace": os.path.join(output_dir, "workspace.root"), "name": "1_300_60", "hash": "new"}
+
+    # failed result of a previous submission
+    for name, content in [("runtime_1_300_60.txt", "1 12\n"), ("job_1_300_60.out", "old\n"), ("job_1_300_60.err", "old\n")]:
+        (tmp_path / name).write_text(content)
+
+    cache = {"1_300_60": {"hash": "old", "workspace": job["workspace"], "status": "failed", "runtime": 12.0}}
+    run_limits.submit_condor([job], cache, run_limits.combine_args, output_dir)
+
+    assert not any(os.path.exists(os.path.join(output_dir, name)) for name in ["runtime_1_300_60.txt", "job_1_300_60.out", "job_1_300_60.err"])
+    assert run_limits.collect_condor(cache, output_dir) == []
+    assert cache["1_300_60"]["status"] == "submitted"
+
+    # the new job finished
+    (tmp_path / "runtime_1_300_60.txt").write_text("0 30\n")
+    (tmp_path / "higgsCombine1_300_60.AsymptoticLimits.mH120.root").write_text("")
+
+    assert run_limits.collect_condor(cache, output_dir) == []
+    assert cache["1_300_60"]["status"] == "done" and cache["1_300_60"]["runtime"] == 30.0
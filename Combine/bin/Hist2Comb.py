@@ -1,61 +1,61 @@
-import ROOT
+import argparse
 import os
+import ROOT
 
-def get_histogram_from_root(file_path, histogram_name):
+def get_histograms_from_root(file_path, histogram_names):
+    # each input file is opened once and all requested categories are taken in the same pass
     file = ROOT.TFile.Open(file_path, "READ")
-    if not file:
+    if not file or file.IsZombie():
         print(f"Error: ROOT file {file_path} could not be opened!")
-        return None
-    histogram = file.Get(histogram_name)
-    if not histogram:
-        print(f"Error: Histogram {histogram_name} not found in {file_path}!")
-        file.Close()
-        return None
-    histogram.SetDirectory(0)
+        return {}
+    histograms = {}
+    for histogram_name in histogram_names:
+        histogram = file.Get(histogram_name)
+        if not histogram:
+            print(f"Error: Histogram {histogram_name} not found in {file_path}!")
+            continue
+        histogram.SetDirectory(0)
+        histograms[histogram_name] = histogram
     file.Close()
-    return histogram
+    return histograms
+
+def read_inputs(input_dir, signals, backgrounds, data, histogram_names):
 
-def write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="hx"):
-    
-    # Add process information
-    processes = []  # Store process names: signal + backgrounds
-    hists = []
+    # [(process name in the datacard, {histogram name: histogram})], signal + backgrounds + data
+    inputs = []
 
-    # Process signal
     for sig in signals:
         sig_file = input_dir+"Histogram_"+sig+".root"
         print(sig_file)
-        hist = get_histogram_from_root(sig_file, histogram_name)
-        if hist:
-            processes.append(sig)  # Signal process
-            hist.SetName(sig)
-            hists.append(hist)
+        inputs.append((sig, get_histograms_from_root(sig_file, histogram_names)))
 
-    # Process background files
     for bkg in backgrounds:
         bkg_file = input_dir+"Output_"+bkg+".root"
         print(bkg_file)
-        hist = get_histogram_from_root(bkg_file, histogram_name)
-        if hist:
-            processes.append(bkg)  # Background process
-            hist.SetName(bkg)
-            hists.append(hist)
+        inputs.append((bkg, get_histograms_from_root(bkg_file, histogram_names)))
 
     data_file = input_dir+"Output_"+data+".root"
-    hist = get_histogram_from_root(data_file,histogram_name)
-    if hist:
-        processes.append(data)
-        hist.SetName("data_obs")
-        hists.append(hist)
+    print(data_file)
+    inputs.append(("data_obs", get_histograms_from_root(data_file, histogram_names)))
+
+    return inputs
+
+def write_outputfile(output_filename, inputs, histogram_names):
 
-    # Write the histogram to file
+    # all category directories are written in one session
+    output_file = ROOT.TFile.Open(output_filename, "RECREATE")
 
-    output_file.cd()
-    dirc = output_file.mkdir(histogram_name)
-    dirc.cd()
+    for histogram_name in histogram_names:
+        dirc = output_file.mkdir(histogram_name)
+        dirc.cd()
 
-    for hist in hists:
-        hist.Write()
+        for process, histograms in inputs:
+            if histogram_name in histograms:
+                hist = histograms[histogram_name].Clone(process)
+                hist.Write()
+
+    output_file.Close()
+    print(f"Output: {output_filename}")
 
 #Input signal and background processes here
 
@@ -111,50 +111,42 @@ backgrounds = ["TT","ST","Zto2Q","Wto2Q","Diboson","QCD" ]
 
 data = "Data"
 
-# Output directory & file
-
-output_dir = "datacards"
-
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-output_filename = os.path.join(output_dir, "combine_input_XYH4b_v3.root")
-output_file = ROOT.TFile.Open(output_filename, "RECREATE")
-
-# Write to the output file
-
-## v1 (old histograms) and v2 (new histograms)
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_4_4_Inclusive")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_4_4")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_5_4")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_5_5")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_3_3_3_2_Inclusive")
-
-## v3
-write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_4_4_Inclusive_mHcut")
-write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_4_4_mHcut")
-write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_5_4_mHcut")
-write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_5_5_5_5_mHcut")
-write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_3_3_3_2_Inclusive_mHcut")
-
-## v4
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_4_4_Inclusive")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_4_4")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_5_4")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_5_5")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_3_3_3_2_Inclusive")
-
-## v5
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_4_4_Inclusive_mHcut")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_4_4_mHcut")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_5_4_mHcut")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_5_5_5_5_mHcut")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_3_3_3_2_Inclusive_mHcut")
-
-## v6
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_Comb_3_3_3_2_Inclusive_mHcut")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_3_3_3_2_Inclusive")
-# write_outputfile(output_file, input_dir, signals, backgrounds, data, histogram_name="h_MX_MY_Comb_3_3_3_2_Inclusive_mHcut")
-
-output_file.Write()
-output_file.Close()
+# Categories (histogram names) of each version
+
+versions = {
+    # v1 (old histograms) and v2 (new histograms)
+    "v1": ["h_MX_Comb_5_5_4_4_Inclusive", "h_MX_Comb_5_5_4_4", "h_MX_Comb_5_5_5_4", "h_MX_Comb_5_5_5_5", "h_MX_Comb_3_3_3_2_Inclusive"],
+    "v2": ["h_MX_Comb_5_5_4_4_Inclusive", "h_MX_Comb_5_5_4_4", "h_MX_Comb_5_5_5_4", "h_MX_Comb_5_5_5_5", "h_MX_Comb_3_3_3_2_Inclusive"],
+    "v3": ["h_MX_Comb_5_5_4_4_Inclusive_mHcut", "h_MX_Comb_5_5_4_4_mHcut", "h_MX_Comb_5_5_5_4_mHcut", "h_MX_Comb_5_5_5_5_mHcut", "h_MX_Comb_3_3_3_2_Inclusive_mHcut"],
+    "v4": ["h_MX_MY_Comb_5_5_4_4_Inclusive", "h_MX_MY_Comb_5_5_4_4", "h_MX_MY_Comb_5_5_5_4", "h_MX_MY_Comb_5_5_5_5", "h_MX_MY_Comb_3_3_3_2_Inclusive"],
+    "v5": ["h_MX_MY_Comb_5_5_4_4_Inclusive_mHcut", "h_MX_MY_Comb_5_5_4_4_mHcut", "h_MX_MY_Comb_5_5_5_4_mHcut", "h_MX_MY_Comb_5_5_5_5_mHcut", "h_MX_MY_Comb_3_3_3_2_Inclusive_mHcut"],
+    "v6": ["h_MX_Comb_3_3_3_2_Inclusive_mHcut", "h_MX_MY_Comb_3_3_3_2_Inclusive", "h_MX_MY_Comb_3_3_3_2_Inclusive_mHcut"],
+}
+
+# command to run this scripts:
+# python3 Hist2Comb.py -v v3 (or several versions: -v v3 v5, the inputs are read once for all of them)
+# optional: -i [input directory] -o [output directory]
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-v", "--versions", nargs="+", default=["v3"], choices=list(versions), help="versions to write")
+    parser.add_argument("-i", "--input_dir", default=input_dir, help="input histogram directory")
+    parser.add_argument("-o", "--output_dir", default="datacards", help="output directory")
+
+    args = parser.parse_args()
+
+    # Output directory & file
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    # every category needed by the requested versions, each input file is opened once
+    histogram_names = list(dict.fromkeys(sum([versions[version] for version in args.versions], [])))
+
+    inputs = read_inputs(args.input_dir, signals, backgrounds, data, histogram_names)
+
+    for version in args.versions:
+        output_filename = os.path.join(args.output_dir, f"combine_input_XYH4b_{version}.root")
+        write_outputfile(output_filename, inputs, versions[version])
@@ -2,6 +2,7 @@
 
 # This script evaluates model performance by displaying variable distributions. 
 # Weight calculation and application are also performed.
+# The 4b kinematic features (MX, MH, MY, ...) come from kinematics.py.
 
 # command to run this scripts:
 # python3 background_estimation.py
@@ -14,37 +15,32 @@
 import pandas as pd
 import numpy as np
 import uproot
-import vector
 import mplhep as hep
 import matplotlib.pyplot as plt
+from dataset_io import read_dataset
+from kinematics import add_kinematics
+from histograms import HistSpec, fill_histograms
 
-def addMX(df_):
+def book_histograms(df, is_3T, is_2T, variables):
 
-    df_ = df_.copy()
+    # all 3T, 2T and weighted 2T histograms of every variable are filled in one go
+    specs = []
+    for var, bins in variables:
 
-    p4 = vector.arr({
-                    "pt": df_[["JetAK4_pt_1", "JetAK4_pt_2", "JetAK4_pt_3", "JetAK4_pt_4"]].to_numpy(),
-                    "eta": df_[["JetAK4_eta_1", "JetAK4_eta_2", "JetAK4_eta_3", "JetAK4_eta_4"]].to_numpy(),
-                    "phi": df_[["JetAK4_phi_1", "JetAK4_phi_2", "JetAK4_phi_3", "JetAK4_phi_4"]].to_numpy(),
-                    "mass": df_[["JetAK4_mass_1", "JetAK4_mass_2", "JetAK4_mass_3", "JetAK4_mass_4"]].to_numpy(),
-                    })
+        if bins is None:
+            bins = np.linspace(df.loc[is_3T, var].min(), df.loc[is_3T, var].max(), 51)
 
-    mx = (p4[:, 0] + p4[:, 1] + p4[:, 2] + p4[:, 3]).mass
-    df_.insert(len(df_.columns)-1, "MX", mx)
+        specs += [HistSpec(f"{var}_3T", var, bins, selection=is_3T),
+                  HistSpec(f"{var}_2T", var, bins, selection=is_2T),
+                  HistSpec(f"{var}_2T_weighted", var, bins, weight="Weights", selection=is_2T)]
 
-    return df_
+    return fill_histograms(df, specs)
 
-def plotting(df_3T, df_2T, bins_=None, add_bins_=True, var="MX", suffix="reweight", ratio_ylim=[0, 2]):
+def plotting(hists, var="MX", suffix="reweight", ratio_ylim=[0, 2]):
 
-    if add_bins_:
+    h_3T, h_2T, h_2T_weighted = hists[f"{var}_3T"], hists[f"{var}_2T"], hists[f"{var}_2T_weighted"]
 
-        if bins_ is None:
-            raise ValueError("bins_ must be provided when add_bin=True")
-
-        bins = bins_
-
-    else:
-        bins = np.linspace(df_3T[var].min(), df_3T[var].max(), 51)
+    bins = h_3T.edges
 
     xlim = [bins[0], bins[-1]]
 
@@ -54,9 +50,9 @@ def plotting(df_3T, df_2T, bins_=None, add_bins_=True, var="MX", suffix="reweigh
     ax.set_ylabel("Entries")
     rax.set_xlabel(var)
 
-    hist_3T, _ = np.histogram(df_3T[var], bins=bins, density=True)
-    hist_2T, _ = np.histogram(df_2T[var], bins=bins, density=True)
-    hist_2T_weighted, _ = np.histogram(df_2T[var], weights=df_2T["Weights"], bins=bins, density=True)
+    hist_3T = h_3T.values(density=True)
+    hist_2T = h_2T.values(density=True)
+    hist_2T_weighted = h_2T_weighted.values(density=True)
 
     hep.histplot([hist_3T, hist_2T, hist_2T_weighted], bins=bins, ax=ax, histtype='step', label=["3T", "2T", "2T_weighted"])
 
@@ -65,13 +61,13 @@ def plotting(df_3T, df_2T, bins_=None, add_bins_=True, var="MX", suffix="reweigh
 
     # calculating yerr_ratio (normolize)
 
-    hist_3T_raw, _ = np.histogram(df_3T[var], bins=bins, density=False)
-    hist_2T_raw, _ = np.histogram(df_2T[var], bins=bins, density=False)
-    hist_2T_weighted_raw, _ = np.histogram(df_2T[var], weights=df_2T["Weights"], bins=bins, density=False)
+    hist_3T_raw = h_3T.values()
+    hist_2T_raw = h_2T.values()
+    hist_2T_weighted_raw = h_2T_weighted.values()
 
-    bin_widths = np.diff(bins)
+    bin_widths = h_3T.widths
 
-    I = len(df_3T[var]) * bin_widths
+    I = h_3T.n_selected * bin_widths
 
     yerr_3T = np.sqrt(hist_3T_raw) / I
     yerr_2T = np.sqrt(hist_2T_raw) / I
@@ -112,9 +108,10 @@ def plotting(df_3T, df_2T, bins_=None, add_bins_=True, var="MX", suffix="reweigh
 
 if __name__ == "__main__":
 
-    df = pd.read_csv("data_add_dnn_score.csv")
+    df = read_dataset("data_add_dnn_score")
 
-    df = addMX(df)
+    # MX, MH, MY, dR and pairing features (cached in kinematics_cache/)
+    add_kinematics(df, source="data_add_dnn_score")
 
     dnn_score = np.array(df["DNN_Score"])
 
@@ -146,14 +143,21 @@ if __name__ == "__main__":
 
     df["Weights"] = dnn_weights
 
-    df_3T = df[df.iloc[:, 0] == 1]
-    df_2T = df[df.iloc[:, 0] == 0]
+    is_3T = (df.iloc[:, 0] == 1).to_numpy()
+    is_2T = (df.iloc[:, 0] == 0).to_numpy()
 
     mx_bin_edges = np.array([100,120,140,160,180,200,225,250,275,300,330,360,400,450,500,550,600,650,700,750,800,850,900,950,1000,1100,1200,1300,1400,1500,1600,1800,2000,2250,2500,2750,3000,3500,4000,4500])
 
-    plotting(df_3T, df_2T, add_bins_=True, bins_=bin_edges, var="DNN_Score", suffix=suff, ratio_ylim=[-2, 4])
-    # plotting(df_3T, df_2T, add_bins_=True, bins_=mx_bin_edges, var="MX", suffix=suff, ratio_ylim=[0, 2])
-    # plotting(df_3T, df_2T, add_bins_=False, bins_=None, var="JetAK4_pt_3", suffix=suff, ratio_ylim=[0, 2])
-    # plotting(df_3T, df_2T, add_bins_=False, bins_=None, var="JetAK4_eta_3", suffix=suff, ratio_ylim=[0, 2])
-    # plotting(df_3T, df_2T, add_bins_=False, bins_=None, var="JetAK4_phi_3", suffix=suff, ratio_ylim=[0, 2])
-    # plotting(df_3T, df_2T, add_bins_=False, bins_=None, var="JetAK4_mass_3", suffix=suff, ratio_ylim=[0, 2])
+    # (variable, bins (None = 50 bins between min and max of 3T), ratio_ylim)
+    plots = [("DNN_Score", bin_edges, [-2, 4]),
+             # ("MX", mx_bin_edges, [0, 2]),
+             # ("JetAK4_pt_3", None, [0, 2]),
+             # ("JetAK4_eta_3", None, [0, 2]),
+             # ("JetAK4_phi_3", None, [0, 2]),
+             # ("JetAK4_mass_3", None, [0, 2]),
+             ]
+
+    hists = book_histograms(df, is_3T, is_2T, [(var, bins) for var, bins, _ in plots])
+
+    for var, _, ratio_ylim in plots:
+        plotting(hists, var=var, suffix=suff, ratio_ylim=ratio_ylim)
@@ -0,0 +1,161 @@
+#######################################################
+
+# This script provides the on-disk dataset format shared by the DNN scripts.
+# Datasets are stored as uncompressed Arrow IPC (Feather v2) files, which keep the column names
+# and dtypes, can be memory-mapped, and allow reading only the needed columns.
+# The schema version is stored in the file metadata and checked when reading.
+# A .csv copy can still be exported for quick inspection.
+
+# usage:
+# from dataset_io import read_dataset, write_dataset
+# df = read_dataset("train_data", columns=["signal", "JetAK4_pt_1"])
+# write_dataset(df, "train_data", csv=True)
+
+#######################################################
+
+import os
+import pyarrow as pa
+
+
+schema_version = 1
+extension = ".feather"
+version_key = b"xtoyh4b_schema_version"
+
+
+def dataset_path(name):
+
+    if name.endswith(extension):
+        return name
+    return name + extension
+
+def _check_version(schema, path):
+
+    metadata = schema.metadata or {}
+    if version_key not in metadata:
+        raise ValueError(f"{path} has no dataset schema version, was it written by dataset_io?")
+
+    version = int(metadata[version_key])
+    if version > schema_version:
+        raise ValueError(f"{path} has schema version {version}, this code only reads up to {schema_version}")
+
+def _with_version(schema):
+
+    metadata = dict(schema.metadata or {})
+    metadata.pop(b"pandas", None)
+    metadata[version_key] = str(schema_version).encode()
+    return schema.with_metadata(metadata)
+
+
+class DatasetWriter:
+
+    # writes a dataset chunk by chunk, every chunk must have the same columns and dtypes
+
+    def __init__(self, name, csv=False):
+
+        self.path = dataset_path(name)
+        self.csv_path = os.path.splitext(self.path)[0] + ".csv" if csv else None
+        self.schema = None
+        self.entries = 0
+        self._sink = None
+        self._writer = None
+        self._csv = None
+
+    def write(self, df):
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self._writer is None:
+            self.schema = _with_version(table.schema)
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+            if self.csv_path is not None:
+                self._csv = open(self.csv_path, "w", newline="")
+                df.iloc[:0].to_csv(self._csv, index=False)
+
+        self._writer.write_table(table.cast(self.schema))
+        self.entries += len(df)
+
+        if self._csv is not None:
+            df.to_csv(self._csv, index=False, header=False)
+
+    def close(self):
+
+        if self._writer is None:
+            # no file would be written and the readers would fail later, an empty dataset needs one empty DataFrame
+            raise ValueError(f"nothing was written to {self.path}, write at least one (empty) DataFrame with the columns")
+
+        self._writer.close()
+        self._sink.close()
+        if self._csv is not None:
+            self._csv.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # an exception inside the with block is not hidden by the error of an unwritten dataset
+        if exc_type is None or self._writer is not None:
+            self.close()
+
+
+def write_dataset(df, name, csv=False):
+
+    with DatasetWriter(name, csv=csv) as writer:
+        writer.write(df)
+
+    return writer.path
+
+def open_dataset(name, memory_map=True):
+
+    # returns the Arrow table, with memory_map=True the columns are not copied into memory
+
+    path = dataset_path(name)
+    source = pa.memory_map(path, "r") if memory_map else pa.OSFile(path, "rb")
+    reader = pa.ipc.open_file(source)
+
+    _check_version(reader.schema, path)
+
+    return reader.read_all()
+
+def read_dataset(name, columns=None, nrows=None, memory_map=True):
+
+    table = open_dataset(name, memory_map=memory_map)
+
+    if columns is not None:
+        table = table.select(columns)
+    if nrows is not None:
+        table = table.slice(0, nrows)
+
+    return table.to_pandas()
+
+def iter_dataset(name, columns=None, chunk_size=None):
+
+    # yields DataFrames of at most chunk_size rows (default: the batches as they were written)
+
+    table = open_dataset(name)
+
+    if columns is not None:
+        table = table.select(columns)
+
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        yield batch.to_pandas()
+
+def read_schema(name):
+
+    path = dataset_path(name)
+    with pa.memory_map(path, "r") as source:
+        schema = pa.ipc.open_file(source).schema
+
+    _check_version(schema, path)
+
+    return {field.name: str(field.type) for field in schema}
+
+def export_csv(name):
+
+    path = os.path.splitext(dataset_path(name))[0] + ".csv"
+
+    with open(path, "w", newline="") as output:
+        for idx, df in enumerate(iter_dataset(name)):
+            df.to_csv(output, index=False, header=(idx == 0))
+
+    return path
@@ -0,0 +1,109 @@
+#######################################################
+
+# This script provides the standardization used for the DNN inputs.
+# The mean and scale are accumulated chunk by chunk (one pass, merged as in Chan et al.),
+# so they can be computed from the training split without holding it twice in memory.
+# The fitted values are saved as a small versioned .json artifact next to the model,
+# and the same transform is re-applied (also chunk by chunk) when scoring new data.
+# The result is the same as sklearn StandardScaler (population variance, zero scale -> 1).
+
+# usage:
+# scaler = FeatureScaler(features).fit(df_train)
+# scaler.save("scaler.json")
+# x = FeatureScaler.load("scaler.json").transform(df[features].to_numpy())
+
+#######################################################
+
+import json
+import numpy as np
+
+
+scaler_version = 1
+
+
+class FeatureScaler:
+
+    def __init__(self, features):
+
+        self.features = list(features)
+        self.n_samples = 0
+        self.mean = np.zeros(len(self.features))
+        self._m2 = np.zeros(len(self.features))
+        self._scale = None
+
+    def update(self, x):
+
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return self
+
+        n_chunk = len(x)
+        mean_chunk = x.mean(axis=0)
+        m2_chunk = ((x - mean_chunk) ** 2).sum(axis=0)
+
+        n_total = self.n_samples + n_chunk
+        delta = mean_chunk - self.mean
+
+        self.mean = self.mean + delta * n_chunk / n_total
+        self._m2 = self._m2 + m2_chunk + delta ** 2 * self.n_samples * n_chunk / n_total
+        self.n_samples = n_total
+        self._scale = None
+
+        return self
+
+    def fit(self, df, chunk_size=None):
+
+        chunk_size = chunk_size or max(len(df), 1)
+        for start in range(0, len(df), chunk_size):
+            self.update(df[self.features].iloc[start:start + chunk_size].to_numpy())
+
+        return self
+
+    @property
+    def var(self):
+        return self._m2 / self.n_samples if self.n_samples else np.zeros(len(self.features))
+
+    @property
+    def scale(self):
+        if self._scale is not None:
+            return self._scale
+        scale = np.sqrt(self.var)
+        return np.where(scale == 0, 1.0, scale)
+
+    def transform(self, x):
+
+        return (np.asarray(x, dtype=np.float64) - self.mean) / self.scale
+
+    def transform_frame(self, df):
+
+        # returns a copy of df with the feature columns standardized, other columns are kept
+        df = df.copy()
+        df[self.features] = self.transform(df[self.features].to_numpy())
+        return df
+
+    def save(self, path):
+
+        with open(path, "w") as output:
+            json.dump({"version": scaler_version,
+                       "features": self.features,
+                       "n_samples": int(self.n_samples),
+                       "mean": self.mean.tolist(),
+                       "var": self.var.tolist(),
+                       "scale": self.scale.tolist()}, output, indent=2)
+
+    @classmethod
+    def load(cls, path):
+
+        with open(path) as input_:
+            info = json.load(input_)
+
+        if info.get("version", 0) > scaler_version:
+            raise ValueError(f"{path} has scaler version {info.get('version')}, this code only reads up to {scaler_version}")
+
+        scaler = cls(info["features"])
+        scaler.n_samples = info["n_samples"]
+        scaler.mean = np.asarray(info["mean"], dtype=np.float64)
+        scaler._m2 = np.asarray(info["var"], dtype=np.float64) * scaler.n_samples
+        scaler._scale = np.asarray(info["scale"], dtype=np.float64)
+
+        return scaler
@@ -0,0 +1,100 @@
+#######################################################
+
+# This script books and fills many 1D histograms from one DataFrame in a single pass.
+# Each histogram is given as HistSpec(name, var, bins, weight, selection), and the bin index of
+# a variable is computed only once for all histograms sharing the same variable and binning.
+# For every histogram the sum of weights and sum of weights^2 per bin are kept,
+# normalised (density) values are derived from them, same as np.histogram(density=True).
+
+# usage:
+# specs = [HistSpec("MX_3T", "MX", mx_bins, selection=is_3T),
+#          HistSpec("MX_2T_weighted", "MX", mx_bins, weight="Weights", selection=is_2T)]
+# hists = fill_histograms(df, specs)
+# hists["MX_3T"].values(density=True)
+
+#######################################################
+
+from collections import namedtuple
+import numpy as np
+
+
+HistSpec = namedtuple("HistSpec", ["name", "var", "bins", "weight", "selection"], defaults=[None, None])
+
+
+class Histogram:
+
+    def __init__(self, edges, sumw, sumw2, n_selected):
+
+        self.edges = edges
+        self.sumw = sumw
+        self.sumw2 = sumw2
+        self.n_selected = n_selected  # selected rows, including the ones outside the binning
+
+    @property
+    def widths(self):
+        return np.diff(self.edges)
+
+    def values(self, density=False):
+
+        if not density:
+            return self.sumw
+
+        total = self.sumw.sum()
+        return self.sumw / (total * self.widths) if total != 0 else np.full(len(self.sumw), np.nan)
+
+    def errors(self):
+        return np.sqrt(self.sumw2)
+
+
+def bin_index(x, edges):
+
+    # same convention as np.histogram: last bin includes the upper edge,
+    # values outside the binning (and NaN) go to the extra index len(edges) - 1
+    nbins = len(edges) - 1
+
+    idx = np.searchsorted(edges, x, side="right") - 1
+    idx[x == edges[-1]] = nbins - 1
+    idx[(idx < 0) | (idx >= nbins)] = nbins
+
+    return idx
+
+def fill_histograms(df, specs):
+
+    # selection: None (all rows) or a boolean array, weight: None or a column name
+    indices, columns = {}, {}
+    hists = {}
+
+    for spec in specs:
+
+        edges = np.asarray(spec.bins, dtype=np.float64)
+        nbins = len(edges) - 1
+
+        key = (spec.var, edges.tobytes())
+        if key not in indices:
+            if spec.var not in columns:
+                columns[spec.var] = df[spec.var].to_numpy(dtype=np.float64)
+            indices[key] = bin_index(columns[spec.var], edges)
+
+        idx = indices[key]
+        weights = None
+
+        if spec.weight is not None:
+            if spec.weight not in columns:
+                columns[spec.weight] = df[spec.weight].to_numpy(dtype=np.float64)
+            weights = columns[spec.weight]
+
+        if spec.selection is not None:
+            selection = np.asarray(spec.selection, dtype=bool)
+            idx = idx[selection]
+            weights = weights[selection] if weights is not None else None
+
+        if weights is None:
+            sumw = np.bincount(idx, minlength=nbins + 1)[:nbins]
+            sumw2 = sumw.astype(np.float64)
+        else:
+            sumw = np.bincount(idx, weights=weights, minlength=nbins + 1)[:nbins]
+            sumw2 = np.bincount(idx, weights=weights**2, minlength=nbins + 1)[:nbins]
+
+        hists[spec.name] = Histogram(edges, sumw, sumw2, len(idx))
+
+    return hists
@@ -0,0 +1,140 @@
+#######################################################
+
+# This script computes the kinematic features of the 4b system for all events at once with NumPy:
+# MX of the 4 jets, and for the three jet pairings (12|34), (13|24), (14|23) the masses of the two pairs
+# (MH = pair closest to 125 GeV, MY = the other one), the dR inside each pair and between the two pairs.
+# The chosen pairing is the one with MH closest to 125 GeV, its MH and MY are also stored.
+# The derived columns are cached on disk, keyed by the input file (path, size, mtime) and feature_version,
+# so reruns of background_estimation.py or the training scripts skip the computation.
+
+# usage:
+# from kinematics import add_kinematics
+# df = read_dataset("data_add_dnn_score")
+# add_kinematics(df, source="data_add_dnn_score")
+
+#######################################################
+
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from dataset_io import dataset_path, read_dataset, write_dataset
+
+
+feature_version = 1
+mass_higgs = 125.0
+njets = 4
+
+# jet indices of the two pairs for each pairing
+pairings = [((0, 1), (2, 3)), ((0, 2), (1, 3)), ((0, 3), (1, 2))]
+
+
+def jet_arrays(df):
+
+    return [df[[f"JetAK4_{var}_{i+1}" for i in range(njets)]].to_numpy(dtype=np.float64) for var in ["pt", "eta", "phi", "mass"]]
+
+def four_momenta(pt, eta, phi, mass):
+
+    px = pt * np.cos(phi)
+    py = pt * np.sin(phi)
+    pz = pt * np.sinh(eta)
+    energy = np.sqrt(px**2 + py**2 + pz**2 + mass**2)
+
+    # (events, jets, 4)
+    return np.stack([px, py, pz, energy], axis=-1)
+
+def invariant_mass(p4):
+
+    m2 = p4[..., 3]**2 - p4[..., 0]**2 - p4[..., 1]**2 - p4[..., 2]**2
+    return np.sqrt(np.maximum(m2, 0))
+
+def eta_phi(p4):
+
+    pt = np.hypot(p4[..., 0], p4[..., 1])
+    return np.arcsinh(p4[..., 2] / np.where(pt > 0, pt, np.nan)), np.arctan2(p4[..., 1], p4[..., 0])
+
+def delta_r(eta_1, phi_1, eta_2, phi_2):
+
+    dphi = np.mod(phi_1 - phi_2 + np.pi, 2 * np.pi) - np.pi
+    return np.hypot(eta_1 - eta_2, dphi)
+
+def compute_kinematics(df):
+
+    pt, eta, phi, mass = jet_arrays(df)
+    p4 = four_momenta(pt, eta, phi, mass)
+
+    features = {"MX": invariant_mass(p4.sum(axis=1))}
+
+    mh_all, my_all = [], []
+    for ipair, (pair_a, pair_b) in enumerate(pairings):
+        p4_a = p4[:, pair_a[0]] + p4[:, pair_a[1]]
+        p4_b = p4[:, pair_b[0]] + p4[:, pair_b[1]]
+
+        m_a, m_b = invariant_mass(p4_a), invariant_mass(p4_b)
+        a_is_h = np.abs(m_a - mass_higgs) <= np.abs(m_b - mass_higgs)
+
+        dr_a = delta_r(eta[:, pair_a[0]], phi[:, pair_a[0]], eta[:, pair_a[1]], phi[:, pair_a[1]])
+        dr_b = delta_r(eta[:, pair_b[0]], phi[:, pair_b[0]], eta[:, pair_b[1]], phi[:, pair_b[1]])
+
+        eta_a, phi_a = eta_phi(p4_a)
+        eta_b, phi_b = eta_phi(p4_b)
+
+        mh_all.append(np.where(a_is_h, m_a, m_b))
+        my_all.append(np.where(a_is_h, m_b, m_a))
+
+        features[f"MH_{ipair+1}"] = mh_all[-1]
+        features[f"MY_{ipair+1}"] = my_all[-1]
+        features[f"dR_H_{ipair+1}"] = np.where(a_is_h, dr_a, dr_b)
+        features[f"dR_Y_{ipair+1}"] = np.where(a_is_h, dr_b, dr_a)
+        features[f"dR_HY_{ipair+1}"] = delta_r(eta_a, phi_a, eta_b, phi_b)
+
+    mh_all, my_all = np.stack(mh_all, axis=1), np.stack(my_all, axis=1)
+
+    # pairing with MH closest to 125 GeV (1, 2 or 3)
+    best = np.argmin(np.abs(mh_all - mass_higgs), axis=1)
+    rows = np.arange(len(best))
+
+    features["Pairing"] = (best + 1).astype(np.int8)
+    features["MH"] = mh_all[rows, best]
+    features["MY"] = my_all[rows, best]
+
+    return features
+
+def cache_name(source, cache_dir):
+
+    path = os.path.abspath(dataset_path(source)) if os.path.exists(dataset_path(source)) else os.path.abspath(source)
+    stat = os.stat(path)
+
+    key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{feature_version}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"kinematics_{name}_{digest}")
+
+def add_kinematics(df, source=None, cache_dir="kinematics_cache"):
+
+    # adds the feature columns to df (in place) and returns df
+    # with source (the dataset or file df was read from) the features are cached in cache_dir
+
+    features = None
+    name = None
+
+    if source is not None:
+        name = cache_name(source, cache_dir)
+        if os.path.exists(dataset_path(name)):
+            df_cached = read_dataset(name)
+            if len(df_cached) == len(df):
+                print(f"Kinematics from cache: {dataset_path(name)}")
+                features = {col: df_cached[col].to_numpy() for col in df_cached.columns}
+
+    if features is None:
+        features = compute_kinematics(df)
+
+        if name is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_dataset(pd.DataFrame(features), name)
+
+    for col, values in features.items():
+        df[col] = values
+
+    return df
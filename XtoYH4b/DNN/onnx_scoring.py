@@ -0,0 +1,108 @@
+#######################################################
+
+# This script scores a dataset with the DNN exported by convert_h5_to_onnx.py, using ONNX Runtime on CPU.
+# The input dataset is read in batches, standardized with the saved scaler (scaler.json),
+# scored, and written with an extra DNN_Score column, so whole eras can be scored
+# without TensorFlow and without holding every row in memory.
+# With -check the scores of the first events are compared to the Keras model (model_v2.h5).
+
+# command to run this scripts:
+# python3 onnx_scoring.py -i data -o data_add_dnn_score
+# python3 onnx_scoring.py -i data -o data_add_dnn_score -batch 100000 -intra 8 -inter 1 -check model_v2.h5
+
+#######################################################
+
+import argparse
+import time
+import numpy as np
+import onnxruntime as ort
+from dataset_io import DatasetWriter, iter_dataset
+from feature_scaler import FeatureScaler
+
+
+class OnnxScorer:
+
+    def __init__(self, model_path="model.onnx", intra_op_threads=1, inter_op_threads=1, batch_size=65536):
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL if inter_op_threads <= 1 else ort.ExecutionMode.ORT_PARALLEL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.batch_size = batch_size
+
+    def predict(self, x):
+
+        # returns the signal score of each row as a 1D float32 array
+        x = np.ascontiguousarray(x, dtype=np.float32)
+
+        scores = np.empty(len(x), dtype=np.float32)
+        for start in range(0, len(x), self.batch_size):
+            output = self.session.run(None, {self.input_name: x[start:start + self.batch_size]})[0]
+            scores[start:start + self.batch_size] = output.reshape(-1)
+
+        return scores
+
+
+def score_dataset(input_name, output_name, scorer, scaler, chunk_size=65536, csv=False):
+
+    n_events = 0
+    time_start = time.perf_counter()
+
+    with DatasetWriter(output_name, csv=csv) as output:
+        for df in iter_dataset(input_name, chunk_size=chunk_size):
+            df["DNN_Score"] = scorer.predict(scaler.transform(df[scaler.features].to_numpy()))
+            output.write(df)
+            n_events += len(df)
+
+    elapsed = time.perf_counter() - time_start
+    print(f"Scored {n_events} events in {elapsed:.1f} s ({n_events / max(elapsed, 1e-9):.0f} events/s)")
+    print(f"Output: {output.path}")
+
+    return n_events
+
+def check_keras(input_name, scorer, scaler, keras_model, nevents=10000, tolerance=1e-5):
+
+    # compares ONNX and Keras scores on the first nevents events
+    from tensorflow.keras.models import load_model
+
+    df = next(iter_dataset(input_name, columns=scaler.features, chunk_size=nevents))
+    x = scaler.transform(df.to_numpy()).astype(np.float32)
+
+    score_onnx = scorer.predict(x)
+    score_keras = load_model(keras_model).predict(x, verbose=0).reshape(-1)
+
+    max_diff = np.max(np.abs(score_onnx - score_keras)) if len(x) else 0
+    print(f"ONNX vs Keras on {len(x)} events: max |diff| = {max_diff:.3g} (tolerance {tolerance:g})")
+
+    if max_diff > tolerance:
+        raise RuntimeError(f"ONNX and Keras scores differ by {max_diff:.3g} > {tolerance:g}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", default="data", help="input dataset (unscaled)")
+    parser.add_argument("-o", "--output", default="data_add_dnn_score", help="output dataset with DNN_Score")
+    parser.add_argument("-m", "--model", default="model.onnx", help="ONNX model")
+    parser.add_argument("-scaler", "--scaler", default="scaler.json", help="scaler saved by prepare_data.py")
+    parser.add_argument("-batch", "--batch", type=int, default=65536, help="events per batch")
+    parser.add_argument("-intra", "--intra", type=int, default=1, help="intra-op threads")
+    parser.add_argument("-inter", "--inter", type=int, default=1, help="inter-op threads")
+    parser.add_argument("-csv", "--csv", action="store_true", help="also export the output as .csv")
+    parser.add_argument("-check", "--check", default=None, help="Keras model (.h5) for the parity check")
+    parser.add_argument("-tolerance", "--tolerance", type=float, default=1e-5, help="max allowed |ONNX - Keras|")
+
+    args = parser.parse_args()
+
+    scaler = FeatureScaler.load(args.scaler)
+    scorer = OnnxScorer(args.model, intra_op_threads=args.intra, inter_op_threads=args.inter, batch_size=args.batch)
+
+    if args.check:
+        check_keras(args.input, scorer, scaler, args.check, tolerance=args.tolerance)
+
+    score_dataset(args.input, args.output, scorer, scaler, chunk_size=args.batch, csv=args.csv)
@@ -1,11 +1,21 @@
 #######################################################
 
-# This script extracts data from a ROOT file and converts it into a DataFrame format. 
-# It applies signal and background selection cuts, as well as standard scaling using StandardScaler. 
-# The data is then split into various sets, particularly training and testing datasets.
+# This script extracts data from a ROOT file and converts it into a DataFrame format.
+# It applies signal and background selection cuts and splits the data into training and testing datasets.
+# The standard scaling is fitted on the training dataset only and saved to scaler.json (see feature_scaler.py),
+# then applied to all datasets.
+# The datasets (data, scaled_data, train_data, test_data) are written as .feather files (see dataset_io.py),
+# use -csv to also export them as .csv.
+# With -mode stream the tree is read in chunks of -chunk entries, each chunk is selected and
+# written out directly, and the scaler is fitted and applied chunk by chunk, so the memory stays bounded
+# by the chunk size instead of the whole era.
+# In stream mode the train/test split is exact and stratified: the test rows of each class are drawn once
+# from the signal and background counts, and the splits are written shuffled, chunk by chunk,
+# from the memory-mapped data (only the row indices of the split are held in memory).
 
 # command to run this scripts:
 # python3 prepare_data.py
+# python3 prepare_data.py -mode stream -chunk 500000
 
 # Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
 # 27 Mar 2025
@@ -13,95 +23,220 @@
 #######################################################
 
 
+import argparse
+import os
+import numpy as np
 import uproot
 import awkward as ak
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from dataset_io import DatasetWriter, dataset_path, iter_dataset, open_dataset, read_schema, write_dataset
+from feature_scaler import FeatureScaler
 
 
 input_path = "/data/dust/user/chatterj/XToYHTo4b/SmallNtuples/Analysis_NTuples/2022/Data_Run3_2022_C_JetMET.root"
 
-f = uproot.open(input_path)
+columns_jetAK4 = ["JetAK4_btag_PNetB_WP", "JetAK4_pt", "JetAK4_eta", "JetAK4_phi", "JetAK4_mass"]
 
-tree = f["Tout"]
+njets = 4
 
-columns_jetAK4 = ["JetAK4_btag_PNetB_WP", "JetAK4_pt", "JetAK4_eta", "JetAK4_phi", "JetAK4_mass"]
+columns_wp = [f"JetAK4_btag_PNetB_WP_{i+1}" for i in range(njets)]
 
-ak_array = tree.arrays(columns_jetAK4, library="ak")
+test_size = 0.2
+split_seed = 1234
 
-# df = df[columns_jetAK4]
 
-njets = 4
-df_dict = {f"{col}_{i+1}": ak.to_list(ak_array[col][:, i]) for col in columns_jetAK4 for i in range(njets)}
+def make_dataframe(ak_array):
+
+    # events with less than njets jets are padded with NaN, they fail both selections below
+    df_dict = {}
+    for col in columns_jetAK4:
+        jets = ak.to_numpy(ak.fill_none(ak.pad_none(ak_array[col], njets, clip=True), np.nan)).astype(np.float64)
+        for i in range(njets):
+            df_dict[f"{col}_{i+1}"] = jets[:, i]
+
+    return pd.DataFrame(df_dict)
+
+def select_masks(df_data):
+
+    # 3T (signal) and 2T (background) selections
+    mask_signal = ((df_data["JetAK4_btag_PNetB_WP_1"] >= 3) &
+                   (df_data["JetAK4_btag_PNetB_WP_2"] >= 3) &
+                   (df_data["JetAK4_btag_PNetB_WP_3"] >= 2) &
+                   (df_data["JetAK4_btag_PNetB_WP_4"] < 2))
+
+    mask_background = ((df_data["JetAK4_btag_PNetB_WP_1"] >= 3) &
+                       (df_data["JetAK4_btag_PNetB_WP_2"] >= 3) &
+                       (df_data["JetAK4_btag_PNetB_WP_3"] < 2) &
+                       (df_data["JetAK4_btag_PNetB_WP_4"] < 2))
+
+    return mask_signal, mask_background
+
+def select_signal_background(df_data):
+
+    mask_signal, mask_background = select_masks(df_data)
+
+    df_signal = df_data[mask_signal]
+    df_background = df_data[mask_background]
+
+    # df_background = df_data[~df_data.index.isin(df_signal.index)]
+
+    df_signal = df_signal.drop(columns=columns_wp)
+    df_background = df_background.drop(columns=columns_wp)
+
+    # df_background = df_background.iloc[:len(df_signal), :]
+
+    df_signal.insert(0, "signal", 1)
+    df_background.insert(0, "signal", 0)
+
+    return df_signal, df_background
+
+def split_fit_scale(df_selected, scaler_path, csv=False):
+
+    # df_selected = all signal rows followed by the same number of background rows
+    idx_train, idx_test = train_test_split(np.arange(len(df_selected)), test_size=test_size, random_state=split_seed)
+
+    df_train = df_selected.iloc[idx_train]
+    df_test = df_selected.iloc[idx_test]
+
+    # the scaling is fitted on the training split only and saved for the inference
+    scaler = FeatureScaler(df_selected.columns[1:]).fit(df_train)
+    scaler.save(scaler_path)
+    print(f"Scaler: {scaler_path} (fitted on {scaler.n_samples} training events)")
+
+    write_dataset(scaler.transform_frame(df_train), "train_data", csv=csv)
+    write_dataset(scaler.transform_frame(df_test), "test_data", csv=csv)
+
+    return scaler
+
+def stratified_split(n_signal, n_background, rng):
+
+    # rows = n_signal signal rows followed by n_background background rows,
+    # returns the shuffled (train, test) row indices with exactly test_size of each class in test
+    is_test = np.zeros(n_signal + n_background, dtype=bool)
+    for n_rows, offset in [(n_signal, 0), (n_background, n_signal)]:
+        is_test[offset + rng.choice(n_rows, size=int(round(test_size * n_rows)), replace=False)] = True
+
+    idx_train, idx_test = np.flatnonzero(~is_test), np.flatnonzero(is_test)
+    rng.shuffle(idx_train)
+    rng.shuffle(idx_test)
+
+    return idx_train, idx_test, is_test
+
+def iter_rows(name, nrows, chunk_size):
+
+    # chunks of the first nrows rows of a dataset
+    position = 0
+    for df in iter_dataset(name, chunk_size=chunk_size):
+        if position >= nrows:
+            break
+        yield df.iloc[:nrows - position]
+        position += len(df)
+
+def split_fit_scale_streaming(name, n_signal, n_background, scaler_path, chunk_size, csv=False):
+
+    # split of the first n_signal + n_background rows of the dataset, with one chunk of rows in memory at a time:
+    # first pass fits the scaling on the training rows, second pass writes the scaled splits in shuffled order
+    idx_train, idx_test, is_test = stratified_split(n_signal, n_background, np.random.default_rng(split_seed))
+
+    scaler = FeatureScaler(list(read_schema(name))[1:])
+
+    position = 0
+    for df in iter_rows(name, n_signal + n_background, chunk_size):
+        scaler.update(df[scaler.features].to_numpy()[~is_test[position:position + len(df)]])
+        position += len(df)
+
+    scaler.save(scaler_path)
+    print(f"Scaler: {scaler_path} (fitted on {scaler.n_samples} training events)")
+
+    table = open_dataset(name)
+    for output_name, indices in [("train_data", idx_train), ("test_data", idx_test)]:
+        with DatasetWriter(output_name, csv=csv) as output:
+            # at least one (possibly empty) chunk, so an empty split is still written with its columns
+            for start in range(0, max(len(indices), 1), chunk_size):
+                output.write(scaler.transform_frame(table.take(indices[start:start + chunk_size]).to_pandas()))
+
+    return scaler
+
+def prepare_in_memory(tree, scaler_path, csv=False):
+
+    ak_array = tree.arrays(columns_jetAK4, library="ak")
+
+    df_data = make_dataframe(ak_array)
+
+    df_signal, df_background = select_signal_background(df_data)
+
+    print(f"signal: {len(df_signal)}")
+    print(f"background: {len(df_background)}")
+
+    nrows = len(df_signal) + min(len(df_signal), len(df_background))
+
+    df_signal_background = pd.concat([df_signal, df_background], axis=0, ignore_index=True)
+    del df_data, df_signal, df_background
+
+    write_dataset(df_signal_background, "data", csv=csv)
+
+    scaler = split_fit_scale(df_signal_background.iloc[:nrows], scaler_path, csv=csv)
+
+    df_signal_background_scaled = scaler.transform_frame(df_signal_background)
+    print(df_signal_background_scaled)
 
-# data = {col: [[row[ijet] for row in df[col]] for ijet in range(njets)] for col in columns_jetAK4}
+    write_dataset(df_signal_background_scaled, "scaled_data", csv=csv)
 
-# columns_data = [["JetAK4_btag_PNetB_WP_1", "JetAK4_btag_PNetB_WP_2", "JetAK4_btag_PNetB_WP_3", "JetAK4_btag_PNetB_WP_4"],
-#                 ["JetAK4_pt_1", "JetAK4_pt_2", "JetAK4_pt_3", "JetAK4_pt_4"],
-#                 ["JetAK4_eta_1", "JetAK4_eta_2", "JetAK4_eta_3", "JetAK4_eta_4"],
-#                 ["JetAK4_phi_1", "JetAK4_phi_2", "JetAK4_phi_3", "JetAK4_phi_4"],
-#                 ["JetAK4_mass_1", "JetAK4_mass_2", "JetAK4_mass_3", "JetAK4_mass_4"]]
+def prepare_streaming(tree, scaler_path, chunk_size, csv=False):
 
-# df_data = pd.DataFrame()
-# i = 0
-# for idx_obj, obj in enumerate(data.values()):
-#     for idx_col, col in enumerate(obj):
-#         df_data.insert(i, columns_data[idx_obj][idx_col], col)
-#         i += 1
+    # signal and background are written to separate parts and joined at the end,
+    # so data keeps the same row order as the in-memory path (all signal, then all background)
+    part_signal, part_background = "data_signal.part", "data_background.part"
 
-df_data = pd.DataFrame(df_dict)
+    n_signal, n_background = 0, 0
 
-df_signal = df_data[(df_data["JetAK4_btag_PNetB_WP_1"] >= 3) &
-                    (df_data["JetAK4_btag_PNetB_WP_2"] >= 3) &
-                    (df_data["JetAK4_btag_PNetB_WP_3"] >= 2) &
-                    (df_data["JetAK4_btag_PNetB_WP_4"] < 2)]
+    with DatasetWriter(part_signal) as output_signal, DatasetWriter(part_background) as output_background:
+        for ak_array in tree.iterate(columns_jetAK4, step_size=chunk_size, library="ak"):
 
-df_background = df_data[(df_data["JetAK4_btag_PNetB_WP_1"] >= 3) &
-                        (df_data["JetAK4_btag_PNetB_WP_2"] >= 3) &
-                        (df_data["JetAK4_btag_PNetB_WP_3"] < 2) &
-                        (df_data["JetAK4_btag_PNetB_WP_4"] < 2)]
+            df_signal, df_background = select_signal_background(make_dataframe(ak_array))
 
-# df_background = df_data[~df_data.index.isin(df_signal.index)]
+            output_signal.write(df_signal)
+            output_background.write(df_background)
 
-df_signal = df_signal.drop(columns=["JetAK4_btag_PNetB_WP_1", 
-                                    "JetAK4_btag_PNetB_WP_2", 
-                                    "JetAK4_btag_PNetB_WP_3", 
-                                    "JetAK4_btag_PNetB_WP_4"])
+            n_signal += len(df_signal)
+            n_background += len(df_background)
 
-df_background = df_background.drop(columns=["JetAK4_btag_PNetB_WP_1", 
-                                            "JetAK4_btag_PNetB_WP_2", 
-                                            "JetAK4_btag_PNetB_WP_3", 
-                                            "JetAK4_btag_PNetB_WP_4"])
+    print(f"signal: {n_signal}")
+    print(f"background: {n_background}")
 
-# df_background = df_background.iloc[:len(df_signal), :]
+    with DatasetWriter("data", csv=csv) as output:
+        for part in [part_signal, part_background]:
+            for df in iter_dataset(part, chunk_size=chunk_size):
+                output.write(df)
+            os.remove(dataset_path(part))
 
-df_signal.insert(0, "signal", 1)
-df_background.insert(0, "signal", 0)
+    # only the signal rows and the same number of background rows (at the top of the file) are used for training
+    scaler = split_fit_scale_streaming("data", n_signal, min(n_signal, n_background), scaler_path, chunk_size, csv=csv)
 
-print(f"signal: {len(df_signal)}")
-print(f"background: {len(df_background)}")
+    # apply the scaling chunk by chunk
+    with DatasetWriter("scaled_data", csv=csv) as output:
+        for df in iter_dataset("data", chunk_size=chunk_size):
+            output.write(scaler.transform_frame(df))
 
-df_signal_background = pd.concat([df_signal, df_background], axis=0, ignore_index=True)
 
-df_signal_background.to_csv("data.csv", index=False)
+if __name__ == "__main__":
 
-features = df_signal_background.iloc[:, 1:].to_numpy()
+    parser = argparse.ArgumentParser(description="")
 
-scaler = StandardScaler()
-features_scaled = scaler.fit_transform(features)
+    parser.add_argument("-i", "--input", default=input_path, help="Input ROOT file")
+    parser.add_argument("-mode", "--mode", default="memory", choices=["memory", "stream"], help="memory = whole tree at once, stream = chunks of -chunk entries")
+    parser.add_argument("-chunk", "--chunk", type=int, default=500000, help="entries per chunk in stream mode (sets the memory ceiling)")
+    parser.add_argument("-csv", "--csv", action="store_true", help="also export every dataset as .csv")
+    parser.add_argument("-scaler", "--scaler", default="scaler.json", help="output file of the fitted scaler (keep it next to the model)")
 
-df_features_scaled = pd.DataFrame(features_scaled)
-df_signal_background_scaled = pd.concat([df_signal_background.iloc[:, 0], df_features_scaled], axis=1, ignore_index=True)
-print(df_signal_background_scaled)
+    args = parser.parse_args()
 
-df_signal_background_scaled.to_csv("scaled_data.csv", index=False)
+    f = uproot.open(args.input)
 
-df_signal_ = df_signal_background_scaled[df_signal_background_scaled.iloc[:, 0] == 1]
-df_background_ = df_signal_background_scaled[df_signal_background_scaled.iloc[:, 0] == 0]
-df_background_ = df_background_.iloc[:len(df_signal_), :]
-df_signal_background_scaled_ = pd.concat([df_signal_, df_background_], axis=0, ignore_index=True)
+    tree = f["Tout"]
 
-df_train, df_test = train_test_split(df_signal_background_scaled_, test_size=0.2, random_state=1234)
-df_train.to_csv("train_data.csv", index=False)
-df_test.to_csv("test_data.csv", index=False)
+    if args.mode == "stream":
+        prepare_streaming(tree, args.scaler, args.chunk, csv=args.csv)
+    else:
+        prepare_in_memory(tree, args.scaler, csv=args.csv)
@@ -0,0 +1,185 @@
+#######################################################
+
+# This script applies the DNN to every event of full Tout ntuples (not only the 3T/2T subset in data).
+# The input files are split into shards (file, entry range) which are scored in parallel by a process pool.
+# Each worker loads the ONNX model and the saved scaler once, streams its shard in chunks
+# and writes one shard file, so an interrupted job is restarted from the missing shards only.
+# A shard file is named by the identity of its input file (path, size, mtime), the content of the model and the scaler,
+# and its entry range, so adding or removing inputs, changing an input or retraining never reuses old scores.
+# At the end the shards are merged into a single output indexed by (file_index, entry),
+# the file names are stored next to it in <output>_files.json, and the events/s of each worker is printed.
+
+# command to run this scripts:
+# python3 score_ntuples.py -i /path/Data_Run3_2022_*.root -o scores_2022 -j 8 -shard 2000000
+# please check -m and -scaler before running
+
+#######################################################
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import uproot
+from dataset_io import DatasetWriter, dataset_path, iter_dataset
+from feature_scaler import FeatureScaler
+from onnx_scoring import OnnxScorer
+from prepare_data import columns_jetAK4, make_dataframe, select_masks
+
+
+_worker = {}
+
+
+def make_shards(input_files, shard_size, tree_name="Tout"):
+
+    shards = []
+    for file_index, input_file in enumerate(input_files):
+        with uproot.open(input_file) as f:
+            num_entries = f[tree_name].num_entries
+
+        for start in range(0, num_entries, shard_size):
+            shards.append((file_index, input_file, start, min(start + shard_size, num_entries)))
+
+    return shards
+
+def file_id(path):
+
+    # identity of an input file, changes when the file is replaced or modified
+    stat = os.stat(path)
+    return hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+def model_id(model_path, scaler_path):
+
+    # content of the model and the scaler, the scores of a retrained model or a refitted scaler are not reused
+    digest = hashlib.sha1()
+    for path in [model_path, scaler_path]:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+    return digest.hexdigest()[:16]
+
+def shard_name(shard_dir, input_file, start, stop, model_key):
+
+    return os.path.join(shard_dir, f"shard_{file_id(input_file)}_{model_key}_{start}_{stop}")
+
+def init_worker(model_path, scaler_path, intra_op_threads, batch_size):
+
+    # the model and the scaler are loaded once per process
+    _worker["scaler"] = FeatureScaler.load(scaler_path)
+    _worker["scorer"] = OnnxScorer(model_path, intra_op_threads=intra_op_threads, inter_op_threads=1, batch_size=batch_size)
+
+def score_shard(shard, shard_dir, chunk_size, model_key, tree_name="Tout"):
+
+    file_index, input_file, start, stop = shard
+    scaler, scorer = _worker["scaler"], _worker["scorer"]
+
+    name = shard_name(shard_dir, input_file, start, stop, model_key)
+    tmp_name = name + ".tmp"
+
+    n_events = 0
+    time_start = time.perf_counter()
+
+    with uproot.open(input_file) as f:
+        tree = f[tree_name]
+
+        with DatasetWriter(tmp_name) as output:
+            entry = start
+            for ak_array in tree.iterate(columns_jetAK4, entry_start=start, entry_stop=stop, step_size=chunk_size, library="ak"):
+
+                df_data = make_dataframe(ak_array)
+                mask_signal, mask_background = select_masks(df_data)
+
+                df_score = df_data[scaler.features].copy()
+                df_score.insert(0, "entry", np.arange(entry, entry + len(df_data), dtype=np.int64))
+
+                # 1 = 3T, 0 = 2T, -1 = neither
+                df_score.insert(1, "signal", np.where(mask_signal, 1, np.where(mask_background, 0, -1)).astype(np.int8))
+                df_score["DNN_Score"] = scorer.predict(scaler.transform(df_data[scaler.features].to_numpy()))
+
+                output.write(df_score)
+                entry += len(df_data)
+                n_events += len(df_data)
+
+    # the shard only counts as done once it is complete
+    os.replace(dataset_path(tmp_name), dataset_path(name))
+
+    return os.getpid(), n_events, time.perf_counter() - time_start
+
+def merge_shards(shards, shard_dir, output_name, input_files, model_key, csv=False):
+
+    # file_index = position in input_files of this run, only added here (the shards do not depend on it)
+    with DatasetWriter(output_name, csv=csv) as output:
+        for file_index, input_file, start, stop in sorted(shards, key=lambda shard: (shard[0], shard[2])):
+            for df in iter_dataset(shard_name(shard_dir, input_file, start, stop, model_key)):
+                df.insert(0, "file_index", np.full(len(df), file_index, dtype=np.int32))
+                output.write(df)
+
+    with open(f"{output_name}_files.json", "w") as output_json:
+        json.dump({str(file_index): input_file for file_index, input_file in enumerate(input_files)}, output_json, indent=2)
+
+    print(f"Output: {output.path} ({output.entries} events)")
+
+def report(results):
+
+    per_worker = defaultdict(lambda: [0, 0.0])
+    for pid, n_events, elapsed in results:
+        per_worker[pid][0] += n_events
+        per_worker[pid][1] += elapsed
+
+    for pid, (n_events, elapsed) in sorted(per_worker.items()):
+        print(f"worker {pid}: {n_events} events in {elapsed:.1f} s ({n_events / max(elapsed, 1e-9):.0f} events/s)")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="input ROOT files (Tout)")
+    parser.add_argument("-o", "--output", required=True, help="output dataset name")
+    parser.add_argument("-m", "--model", default="model.onnx", help="ONNX model")
+    parser.add_argument("-scaler", "--scaler", default="scaler.json", help="scaler saved by prepare_data.py")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("-threads", "--threads", type=int, default=1, help="ONNX threads per worker")
+    parser.add_argument("-shard", "--shard", type=int, default=2000000, help="entries per shard")
+    parser.add_argument("-chunk", "--chunk", type=int, default=200000, help="entries per chunk inside a shard")
+    parser.add_argument("-csv", "--csv", action="store_true", help="also export the merged output as .csv")
+
+    args = parser.parse_args()
+
+    input_files = sorted(set(sum([glob.glob(pattern) or [pattern] for pattern in args.input], [])))
+
+    shard_dir = f"{args.output}_shards"
+    os.makedirs(shard_dir, exist_ok=True)
+
+    shards = make_shards(input_files, args.shard)
+    model_key = model_id(args.model, args.scaler)
+    todo = [shard for shard in shards if not os.path.exists(dataset_path(shard_name(shard_dir, shard[1], shard[2], shard[3], model_key)))]
+
+    print(f"Files: {len(input_files)}, shards: {len(shards)}, already done: {len(shards) - len(todo)}")
+
+    results, failed = [], []
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker,
+                             initargs=(args.model, args.scaler, args.threads, args.chunk)) as pool:
+
+        futures = {pool.submit(score_shard, shard, shard_dir, args.chunk, model_key): shard for shard in todo}
+
+        for idx, future in enumerate(as_completed(futures)):
+            file_index, input_file, start, stop = futures[future]
+            try:
+                results.append(future.result())
+                print(f"[{idx + 1}/{len(todo)}] done: {os.path.basename(input_file)} entries {start}-{stop}")
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"[{idx + 1}/{len(todo)}] failed: {os.path.basename(input_file)} entries {start}-{stop}: {e}")
+
+    report(results)
+
+    if failed:
+        print(f"{len(failed)} shards failed, rerun the same command to retry them")
+    else:
+        merge_shards(shards, shard_dir, args.output, input_files, model_key, csv=args.csv)
@@ -21,19 +21,25 @@ import ROOT
 import sklearn.metrics as metrics
 from hist.intervals import ratio_uncertainty
 from tensorflow.keras.models import load_model
+from dataset_io import read_dataset, write_dataset
+from feature_scaler import FeatureScaler
 
 
-df_test = pd.read_csv("scaled_data.csv")
-x_test = df_test.iloc[:, 1:].to_numpy()
-y_test = df_test.iloc[:, 0].to_numpy()
+export_csv = False   ### also write the output dataset as .csv
+
+# the scaling fitted on the training data by prepare_data.py is re-applied here
+scaler = FeatureScaler.load("scaler.json")
+
+df_data = read_dataset("data")
+x_test = scaler.transform(df_data[scaler.features].to_numpy())
+y_test = df_data["signal"].to_numpy()
 
 model = load_model("model_v2.h5")
 
 dnn_score = model.predict(x_test)
 
-df_data = pd.read_csv("data.csv")
 df_data["DNN_Score"] = dnn_score
-df_data.to_csv("data_add_dnn_score_v2.csv", index=False)
+write_dataset(df_data, "data_add_dnn_score_v2", csv=export_csv)
 
 dnn_signal = dnn_score[y_test == 1]
 dnn_background = dnn_score[y_test == 0]
@@ -0,0 +1,44 @@
+# small synthetic inputs shared by the tests: a Tout tree (as the SmallNtuples) and an ONNX model
+
+import awkward as ak
+import numpy as np
+import onnx
+import uproot
+from onnx import TensorProto, helper
+
+
+def make_tree(path, n_events=500, seed=1):
+
+    # Tout with 3 to 6 jets per event and WP in 0..5, so both selections and the padding are used
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(3, 7, n_events)
+    n_jets = counts.sum()
+
+    branches = {
+        "JetAK4_btag_PNetB_WP": ak.unflatten(rng.integers(0, 6, n_jets).astype(np.float64), counts),
+        "JetAK4_pt": ak.unflatten(rng.uniform(30, 500, n_jets), counts),
+        "JetAK4_eta": ak.unflatten(rng.uniform(-2.5, 2.5, n_jets), counts),
+        "JetAK4_phi": ak.unflatten(rng.uniform(-np.pi, np.pi, n_jets), counts),
+        "JetAK4_mass": ak.unflatten(rng.uniform(5, 50, n_jets), counts),
+    }
+
+    with uproot.recreate(path) as f:
+        f["Tout"] = branches
+
+def make_model(path, n_features, seed=1):
+
+    # sigmoid(x @ w), the same interface as the converted Keras model: float32 (N, n_features) -> (N, 1)
+    w = np.random.default_rng(seed).normal(size=(n_features, 1)).astype(np.float32)
+
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "w"], ["z"]), helper.make_node("Sigmoid", ["z"], ["score"])],
+        "dnn",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, n_features])],
+        [helper.make_tensor_value_info("score", TensorProto.FLOAT, [None, 1])],
+        initializer=[helper.make_tensor("w", TensorProto.FLOAT, w.shape, w.ravel())],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+    return w
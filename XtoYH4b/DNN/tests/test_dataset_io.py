@@ -0,0 +1,51 @@
+# checks dataset_io.py: chunked writes, empty datasets and the unwritten-dataset error
+# python3 -m pytest XtoYH4b/DNN/tests
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from dataset_io import DatasetWriter, dataset_path, iter_dataset, read_dataset, read_schema
+
+
+def test_chunks_round_trip(tmp_path):
+
+    df = pd.DataFrame({"signal": np.arange(10) % 2, "x": np.linspace(0, 1, 10)})
+    name = str(tmp_path / "data")
+
+    with DatasetWriter(name) as writer:
+        for start in range(0, 10, 3):
+            writer.write(df.iloc[start:start + 3])
+
+    assert writer.entries == 10
+    pd.testing.assert_frame_equal(read_dataset(name), df)
+    assert sum(len(chunk) for chunk in iter_dataset(name, chunk_size=4)) == 10
+
+def test_empty_dataframe_writes_readable_file(tmp_path):
+
+    name = str(tmp_path / "empty")
+    with DatasetWriter(name) as writer:
+        writer.write(pd.DataFrame({"signal": np.array([], dtype=np.int64), "x": np.array([], dtype=np.float64)}))
+
+    assert len(read_dataset(name)) == 0
+    assert read_schema(name) == {"signal": "int64", "x": "double"}
+    assert list(iter_dataset(name)) == [] or all(len(chunk) == 0 for chunk in iter_dataset(name))
+
+def test_unwritten_dataset_raises_at_close(tmp_path):
+
+    name = str(tmp_path / "never")
+    with pytest.raises(ValueError, match="nothing was written"):
+        with DatasetWriter(name):
+            pass
+
+    assert not os.path.exists(dataset_path(name))
+
+def test_error_inside_block_is_not_hidden(tmp_path):
+
+    with pytest.raises(KeyError):
+        with DatasetWriter(str(tmp_path / "never")):
+            raise KeyError("from the block")
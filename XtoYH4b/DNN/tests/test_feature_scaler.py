@@ -0,0 +1,50 @@
+# checks that FeatureScaler merges chunks (as in prepare_data.py -mode stream) to the one-pass result
+# python3 -m pytest XtoYH4b/DNN/tests
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from feature_scaler import FeatureScaler
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 100, None])
+def test_chunked_fit_matches_standard_scaler(chunk_size):
+
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(rng.normal(1e3, 50, size=(257, 4)), columns=["a", "b", "c", "d"])
+    df["d"] = 5.0   # constant column, scale 1
+
+    scaler = FeatureScaler(df.columns).fit(df, chunk_size=chunk_size)
+    reference = StandardScaler().fit(df.to_numpy())
+
+    np.testing.assert_allclose(scaler.mean, reference.mean_, rtol=1e-12)
+    np.testing.assert_allclose(scaler.scale, reference.scale_, rtol=1e-9)
+    np.testing.assert_allclose(scaler.transform(df.to_numpy()), reference.transform(df.to_numpy()), atol=1e-9)
+
+def test_uneven_chunks_and_empty_chunk():
+
+    rng = np.random.default_rng(4)
+    x = rng.uniform(-1, 1, size=(100, 2))
+
+    scaler = FeatureScaler(["a", "b"])
+    for start, stop in [(0, 1), (1, 1), (1, 40), (40, 100)]:
+        scaler.update(x[start:stop])
+
+    assert scaler.n_samples == 100
+    np.testing.assert_allclose(scaler.mean, x.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(scaler.var, x.var(axis=0), rtol=1e-12)
+
+def test_save_load(tmp_path):
+
+    x = np.random.default_rng(5).normal(size=(50, 3))
+    scaler = FeatureScaler(["a", "b", "c"]).update(x)
+    scaler.save(str(tmp_path / "scaler.json"))
+
+    loaded = FeatureScaler.load(str(tmp_path / "scaler.json"))
+    np.testing.assert_allclose(loaded.transform(x), scaler.transform(x))
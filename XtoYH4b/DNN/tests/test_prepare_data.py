@@ -0,0 +1,113 @@
+# checks prepare_data.py: the stream mode writes the same data as the in-memory mode, with an exact,
+# stratified and chunk-independent train/test split and the scaler fitted on its training rows
+# python3 -m pytest XtoYH4b/DNN/tests
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+import uproot
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import prepare_data
+from dataset_io import read_dataset
+from feature_scaler import FeatureScaler
+from ntuples import make_tree
+
+
+def prepare(tmp_path, input_file, mode, chunk_size, monkeypatch):
+
+    output_dir = tmp_path / f"{mode}_{chunk_size}"
+    output_dir.mkdir()
+    monkeypatch.chdir(output_dir)
+
+    with uproot.open(input_file) as f:
+        if mode == "stream":
+            prepare_data.prepare_streaming(f["Tout"], "scaler.json", chunk_size)
+        else:
+            prepare_data.prepare_in_memory(f["Tout"], "scaler.json")
+
+    return output_dir
+
+def unscale(df, scaler):
+
+    df = df.copy()
+    df[scaler.features] = df[scaler.features].to_numpy() * scaler.scale + scaler.mean
+    return df
+
+def sort_rows(df):
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+@pytest.fixture
+def input_file(tmp_path):
+
+    path = str(tmp_path / "Tout.root")
+    make_tree(path, n_events=2000)
+    return path
+
+def test_memory_split_is_train_test_split(tmp_path, input_file, monkeypatch):
+
+    output_dir = prepare(tmp_path, input_file, "memory", None, monkeypatch)
+
+    data = read_dataset(str(output_dir / "data"))
+    n_signal = int((data["signal"] == 1).sum())
+    nrows = n_signal + min(n_signal, len(data) - n_signal)
+
+    idx_train, idx_test = train_test_split(np.arange(nrows), test_size=0.2, random_state=1234)
+    scaler = FeatureScaler.load(str(output_dir / "scaler.json"))
+
+    for name, idx in [("train_data", idx_train), ("test_data", idx_test)]:
+        df = unscale(read_dataset(str(output_dir / name)), scaler)
+        pd.testing.assert_frame_equal(df, data.iloc[idx].reset_index(drop=True), rtol=1e-9)
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 5000])
+def test_stream_split(tmp_path, input_file, monkeypatch, chunk_size):
+
+    memory = prepare(tmp_path, input_file, "memory", None, monkeypatch)
+    stream = prepare(tmp_path, input_file, "stream", chunk_size, monkeypatch)
+
+    # the selected data do not depend on the mode
+    data = read_dataset(str(stream / "data"))
+    pd.testing.assert_frame_equal(data, read_dataset(str(memory / "data")))
+
+    n_signal = int((data["signal"] == 1).sum())
+    n_background = min(n_signal, len(data) - n_signal)
+    assert n_signal > 0 and n_background > 0
+
+    scaler = FeatureScaler.load(str(stream / "scaler.json"))
+    train = unscale(read_dataset(str(stream / "train_data")), scaler)
+    test = unscale(read_dataset(str(stream / "test_data")), scaler)
+
+    # exact and stratified: round(test_size * n) rows of each class in test, every used row exactly once
+    assert (test["signal"] == 1).sum() == round(0.2 * n_signal)
+    assert (test["signal"] == 0).sum() == round(0.2 * n_background)
+    pd.testing.assert_frame_equal(sort_rows(pd.concat([train, test])), sort_rows(data.iloc[:n_signal + n_background]), rtol=1e-9)
+
+    # shuffled: the training rows are not signal-first
+    assert (train["signal"].to_numpy()[:len(train) // 2] == 1).mean() < 0.9
+
+    # the scaler is the one of the training rows, as fitted in memory
+    reference = FeatureScaler(scaler.features).fit(train)
+    assert scaler.n_samples == len(train)
+    np.testing.assert_allclose(scaler.mean, reference.mean, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(scaler.var, reference.var, rtol=1e-7)
+
+def test_stream_split_does_not_depend_on_chunking(tmp_path, input_file, monkeypatch):
+
+    small = prepare(tmp_path, input_file, "stream", 7, monkeypatch)
+    large = prepare(tmp_path, input_file, "stream", 5000, monkeypatch)
+
+    for name in ["train_data", "test_data", "scaled_data"]:
+        pd.testing.assert_frame_equal(read_dataset(str(small / name)), read_dataset(str(large / name)), rtol=1e-12)
+
+def test_stratified_split_counts():
+
+    idx_train, idx_test, is_test = prepare_data.stratified_split(11, 7, np.random.default_rng(1))
+
+    assert len(idx_test) == round(0.2 * 11) + round(0.2 * 7)
+    assert sorted(np.concatenate([idx_train, idx_test]).tolist()) == list(range(18))
+    assert is_test[idx_test].all() and not is_test[idx_train].any()
@@ -0,0 +1,98 @@
+# checks the shards of score_ntuples.py: scores, merged file_index, and which shards a resumed run reuses
+# python3 -m pytest XtoYH4b/DNN/tests
+
+import os
+import sys
+import time
+import numpy as np
+import uproot
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import score_ntuples
+from dataset_io import dataset_path, read_dataset
+from feature_scaler import FeatureScaler
+from ntuples import make_model, make_tree
+from prepare_data import make_dataframe, columns_jetAK4
+
+
+def setup_inputs(tmp_path, names=("b", "d")):
+
+    input_files = []
+    for seed, name in enumerate(names):
+        input_file = str(tmp_path / f"{name}.root")
+        make_tree(input_file, n_events=120, seed=seed)
+        input_files.append(input_file)
+
+    with uproot.open(input_files[0]) as f:
+        df = make_dataframe(f["Tout"].arrays(columns_jetAK4, library="ak"))
+    features = [column for column in df.columns if not column.startswith("JetAK4_btag")]
+
+    scaler_path, model_path = str(tmp_path / "scaler.json"), str(tmp_path / "model.onnx")
+    FeatureScaler(features).fit(df.fillna(0)).save(scaler_path)
+    make_model(model_path, len(features))
+
+    return sorted(input_files), model_path, scaler_path
+
+def run(input_files, model_path, scaler_path, shard_dir, output_name, shard_size=50):
+
+    # the same steps as the main of score_ntuples.py, in this process
+    shards = score_ntuples.make_shards(input_files, shard_size)
+    model_key = score_ntuples.model_id(model_path, scaler_path)
+    todo = [shard for shard in shards
+            if not os.path.exists(dataset_path(score_ntuples.shard_name(shard_dir, shard[1], shard[2], shard[3], model_key)))]
+
+    score_ntuples.init_worker(model_path, scaler_path, 1, 64)
+    for shard in todo:
+        score_ntuples.score_shard(shard, shard_dir, 32, model_key)
+    score_ntuples.merge_shards(shards, shard_dir, output_name, input_files, model_key)
+
+    return todo
+
+def test_merged_scores(tmp_path):
+
+    input_files, model_path, scaler_path = setup_inputs(tmp_path)
+    shard_dir = str(tmp_path / "shards")
+    os.makedirs(shard_dir)
+
+    run(input_files, model_path, scaler_path, shard_dir, str(tmp_path / "scores"))
+    df = read_dataset(str(tmp_path / "scores"))
+
+    assert list(df.columns[:3]) == ["file_index", "entry", "signal"]
+    for file_index, input_file in enumerate(input_files):
+        part = df[df["file_index"] == file_index]
+        assert (part["entry"].to_numpy() == np.arange(120)).all()
+
+        with uproot.open(input_file) as f:
+            df_data = make_dataframe(f["Tout"].arrays(columns_jetAK4, library="ak"))
+        scaler = FeatureScaler.load(scaler_path)
+        expected = score_ntuples.OnnxScorer(model_path).predict(scaler.transform(df_data[scaler.features].to_numpy()))
+        np.testing.assert_allclose(part["DNN_Score"].to_numpy(), expected, rtol=1e-6)
+
+def test_resume_only_reuses_matching_shards(tmp_path):
+
+    input_files, model_path, scaler_path = setup_inputs(tmp_path)
+    shard_dir = str(tmp_path / "shards")
+    os.makedirs(shard_dir)
+
+    assert len(run(input_files, model_path, scaler_path, shard_dir, str(tmp_path / "scores"))) == 6
+    assert len(run(input_files, model_path, scaler_path, shard_dir, str(tmp_path / "scores"))) == 0
+
+    # a new file sorted first shifts the file_index of the others, their shards are still reused
+    new_file = str(tmp_path / "a.root")
+    make_tree(new_file, n_events=120, seed=5)
+    todo = run(sorted(input_files + [new_file]), model_path, scaler_path, shard_dir, str(tmp_path / "scores"))
+    assert {shard[1] for shard in todo} == {new_file}
+
+    df = read_dataset(str(tmp_path / "scores"))
+    assert sorted(df["file_index"].unique()) == [0, 1, 2]
+
+    # a modified input is scored again
+    time.sleep(0.01)
+    make_tree(input_files[0], n_events=120, seed=7)
+    todo = run(sorted(input_files + [new_file]), model_path, scaler_path, shard_dir, str(tmp_path / "scores"))
+    assert {shard[1] for shard in todo} == {input_files[0]}
+
+    # a retrained model invalidates every shard
+    make_model(model_path, len(FeatureScaler.load(scaler_path).features), seed=2)
+    assert len(run(sorted(input_files + [new_file]), model_path, scaler_path, shard_dir, str(tmp_path / "scores"))) == 9
@@ -0,0 +1,92 @@
+# checks the search logic of tuning_model.py with a fake trial (no TensorFlow): halving rungs,
+# duplicate configurations and which trials the store lets a rerun reuse
+# python3 -m pytest XtoYH4b/DNN/tests
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import tuning_model
+from dataset_io import write_dataset
+
+
+@pytest.fixture
+def trained(monkeypatch):
+
+    # [(config key, epochs)] of every trial which is trained
+    calls = []
+
+    def fake_trial(config, epochs, patience):
+        calls.append((tuning_model.config_key(config), epochs))
+        return {"config": config, "epochs": epochs, "val_auc": config["learning_rate"] * epochs, "best_epoch": epochs,
+                "epochs_run": epochs, "time": 0.0}
+
+    monkeypatch.setattr(tuning_model, "run_trial", fake_trial)
+    return calls
+
+def search(store, configs, **kwargs):
+
+    with ThreadPoolExecutor(2) as pool:
+        return tuning_model.search(pool, store, configs, **kwargs)
+
+def test_halving_budgets():
+
+    assert tuning_model.halving_budgets(3, 30, 3) == [3, 9, 27, 30]
+    assert tuning_model.halving_budgets(2, 8, 2) == [2, 4, 8]
+
+def test_halving_keeps_best(tmp_path, trained):
+
+    store = tuning_model.TrialStore(str(tmp_path / "store.jsonl"), {"data": 1})
+    configs = tuning_model.sample_configs(9)
+    trials = search(store, configs, search_type="halving", max_epochs=9, min_epochs=1, eta=3)
+
+    assert [epochs for _, epochs in trained].count(1) == 9
+    assert [epochs for _, epochs in trained].count(3) == 3
+    assert [epochs for _, epochs in trained].count(9) == 1
+
+    best = max(configs, key=lambda config: config["learning_rate"])
+    assert max(trials, key=lambda trial: (trial["epochs"], trial["val_auc"]))["config"] == best
+
+def test_duplicate_configs_are_trained_once(tmp_path, trained):
+
+    store = tuning_model.TrialStore(str(tmp_path / "store.jsonl"), {"data": 1})
+    config = tuning_model.sample_configs(1)[0]
+
+    trials = search(store, [config, dict(config), config], search_type="random", max_epochs=5)
+
+    assert len(trained) == 1 and len(trials) == 1
+
+def test_store_reuse_and_extension(tmp_path, trained):
+
+    path = str(tmp_path / "store.jsonl")
+    search(tuning_model.TrialStore(path, {"data": 1}), tuning_model.sample_configs(4), search_type="random", max_epochs=5)
+    assert len(trained) == 4
+
+    # rerun with a larger -n: only the new configurations are trained
+    search(tuning_model.TrialStore(path, {"data": 1}), tuning_model.sample_configs(6), search_type="random", max_epochs=5)
+    assert len(trained) == 6
+
+    # other data settings: nothing is reused
+    search(tuning_model.TrialStore(path, {"data": 2}), tuning_model.sample_configs(6), search_type="random", max_epochs=5)
+    assert len(trained) == 12
+
+def test_dataset_fingerprint_follows_content(tmp_path):
+
+    name = str(tmp_path / "train_data")
+    df = pd.DataFrame({"signal": [0, 1, 1], "x": [0.1, 0.2, 0.3]})
+
+    write_dataset(df, name)
+    first = tuning_model.dataset_fingerprint(name)
+    write_dataset(df, name)
+    assert tuning_model.dataset_fingerprint(name) == first
+
+    write_dataset(df.assign(x=np.array([0.1, 0.2, 0.4])), name)
+    assert tuning_model.dataset_fingerprint(name) != first
+
+    write_dataset(df.rename(columns={"x": "y"}), name)
+    assert tuning_model.dataset_fingerprint(name)["schema"] == {"signal": "int64", "y": "double"}
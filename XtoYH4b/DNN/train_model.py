@@ -15,9 +15,10 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.optimizers import Adam
+from dataset_io import read_dataset
 
 
-df_train = pd.read_csv("train_data.csv")
+df_train = read_dataset("train_data")
 
 print(df_train)
 
@@ -17,9 +17,10 @@ import tensorflow as tf
 from tensorflow.keras import Input, Model
 from tensorflow.keras.layers import Dense, Flatten
 from tensorflow.keras.optimizers import Adam
+from dataset_io import read_dataset
 
 
-df_train = pd.read_csv("train_data.csv")
+df_train = read_dataset("train_data")
 
 x_train, y_train  = df_train.iloc[:, 1:], df_train.iloc[:, 0]
 
@@ -1,59 +1,270 @@
 #######################################################
 
-# This script is very simple, just tuning hyperparameters of Tensorflow Sequential
-# and displays result based on the best roc_auc.
+# This script tunes the hyperparameters of the DNN (Sequential, as train_model.py) and displays the result
+# based on the best validation roc_auc.
+# The configurations (learning rate, neurons, depth, batch size, dropout) are drawn at random from search_space, then:
+#   random  = every configuration is trained for -epochs
+#   halving = successive halving (Hyperband-style): every configuration is trained for -min_epochs,
+#             the best 1/eta are trained again for eta times more epochs, ..., up to -epochs
+# The trials run in parallel in -j processes, each one with -threads TensorFlow threads (pinned, so the trials
+# do not compete for the cores), and a trial stops early when the validation AUC has not improved for -patience epochs.
+# The train data is split once into train and validation (-val, fixed seed), and is read once per process.
+# Every finished trial is appended to the trial store (-store, .jsonl): a rerun or an extended search
+# (larger -n, same -seed) only trains the (configuration, epochs) which are not in the store yet.
+# Stored trials are only reused for the same content of the train dataset (hash and schema), so a new
+# prepare_data.py output with the same name is tuned again.
 
 # command to run this scripts:
 # python3 tuning_model.py
+# optional: -search [random/halving] -n [configurations] -epochs [max epochs] -min_epochs [first rung] -eta [halving factor]
+#           -j [parallel trials] -threads [threads per trial] -patience [epochs] -store [trial store] -seed [seed]
 
 # Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
 # 27 Mar 2025
 
 #######################################################
 
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.wrappers.scikit_learn import KerasClassifier
-# from scikeras.wrappers import KerasClassifier
-from sklearn.model_selection import GridSearchCV
-
-
-def the_model(learning_rate=0.001, neurons=128):
-    model = tf.keras.models.Sequential([
-    tf.keras.layers.Flatten(input_shape=(len(x_train[0]),)),
-    tf.keras.layers.Dense(neurons, activation='relu'),
-    # tf.keras.layers.Dropout(0.2),
-    tf.keras.layers.Dense(64, activation='relu'),
-    tf.keras.layers.Dense(1, activation='sigmoid')
-    ])
-
-    model.compile(optimizer=Adam(learning_rate=learning_rate),
+from sklearn.model_selection import train_test_split
+from dataset_io import dataset_path, read_dataset, read_schema
+
+
+searches = ["random", "halving"]
+
+search_space = {
+    "learning_rate": (1e-4, 1e-2),   # log-uniform
+    "neurons": [64, 128, 256, 512],
+    "depth": [1, 2, 3, 4],
+    "batch_size": [16, 32, 64, 128],
+    "dropout": [0.0, 0.1, 0.2, 0.3],
+}
+
+_worker = {}
+
+
+def sample_configs(n, seed=1234):
+
+    # the first n configurations of the seed are always the same, so a larger -n extends the previous search
+    rng = np.random.default_rng(seed)
+    low, high = search_space["learning_rate"]
+
+    configs = []
+    for _ in range(n):
+        config = {"learning_rate": float(f"{10**rng.uniform(np.log10(low), np.log10(high)):.3g}")}
+        for name in ["neurons", "depth", "batch_size", "dropout"]:
+            config[name] = search_space[name][int(rng.integers(len(search_space[name])))]
+        configs.append(config)
+
+    return configs
+
+def config_key(config):
+
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+def dataset_fingerprint(name):
+
+    # content hash and schema of the train dataset
+    digest = hashlib.sha1()
+    with open(dataset_path(name), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 24), b""):
+            digest.update(chunk)
+
+    return {"sha1": digest.hexdigest(), "schema": read_schema(name)}
+
+
+class TrialStore:
+
+    # finished trials, one json line each, keyed by (configuration, epochs) and the data settings
+
+    def __init__(self, path, settings):
+
+        self.path = path
+        self.settings = settings
+        self.trials = {}
+
+        if os.path.exists(path):
+            with open(path) as store:
+                for line in store:
+                    if not line.strip():
+                        continue
+                    trial = json.loads(line)
+                    if trial["settings"] == settings:
+                        self.trials[(trial["key"], trial["epochs"])] = trial
+
+    def get(self, config, epochs):
+
+        return self.trials.get((config_key(config), epochs))
+
+    def add(self, trial):
+
+        trial = dict(trial, key=config_key(trial["config"]), settings=self.settings)
+        self.trials[(trial["key"], trial["epochs"])] = trial
+
+        # one line per trial, written at once, so an interrupted search keeps every finished trial
+        with open(self.path, "a") as store:
+            store.write(json.dumps(trial) + "\n")
+
+        return trial
+
+
+def init_worker(input_file, validation, seed, threads):
+
+    # TensorFlow is imported in the worker, after the thread counts are set
+    for name in ["OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"]:
+        os.environ[name] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    df_train = read_dataset(input_file)
+    x = df_train.iloc[:, 1:].to_numpy()
+    y = df_train.iloc[:, 0].to_numpy()
+
+    x_train, x_val, y_train, y_val = train_test_split(x, y, test_size=validation, random_state=seed, stratify=y)
+    _worker.update({"tf": tf, "data": (x_train, y_train, x_val, y_val), "seed": seed})
+
+def the_model(n_inputs, learning_rate=0.001, neurons=128, depth=2, dropout=0.0):
+
+    tf = _worker["tf"]
+
+    # depth hidden layers, the width is halved after the first one (128 -> 64 as train_model.py)
+    layers = [tf.keras.layers.Input(shape=(n_inputs,))]
+    for idx in range(depth):
+        layers.append(tf.keras.layers.Dense(max(neurons // 2**min(idx, 1), 8), activation='relu'))
+        if dropout > 0:
+            layers.append(tf.keras.layers.Dropout(dropout))
+    layers.append(tf.keras.layers.Dense(1, activation='sigmoid'))
+
+    model = tf.keras.models.Sequential(layers)
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
                   loss='binary_crossentropy',
-                  metrics=['accuracy'])
+                  metrics=[tf.keras.metrics.AUC(name='auc')])
 
     return model
 
+def run_trial(config, epochs, patience):
+
+    tf = _worker["tf"]
+    x_train, y_train, x_val, y_val = _worker["data"]
+    tf.keras.utils.set_random_seed(_worker["seed"])
+
+    time_start = time.perf_counter()
+    model = the_model(x_train.shape[1], config["learning_rate"], config["neurons"], config["depth"], config["dropout"])
+
+    early_stopping = tf.keras.callbacks.EarlyStopping(monitor='val_auc', mode='max', patience=patience, restore_best_weights=True)
+    history = model.fit(x_train, y_train, validation_data=(x_val, y_val), epochs=epochs, batch_size=config["batch_size"],
+                        callbacks=[early_stopping], verbose=0)
+
+    val_auc = history.history["val_auc"]
+    return {"config": config, "epochs": epochs, "val_auc": float(max(val_auc)), "best_epoch": int(np.argmax(val_auc)) + 1,
+            "epochs_run": len(val_auc), "time": time.perf_counter() - time_start}
+
+def run_rung(pool, store, configs, epochs, patience):
+
+    # trials of one budget, each configuration once, the ones already in the store are not trained again
+    configs = list({config_key(config): config for config in configs}.values())
+    results = {config_key(config): store.get(config, epochs) for config in configs}
+    todo = [config for config in configs if results[config_key(config)] is None]
+    print(f"Epochs: {epochs}, configurations: {len(configs)}, already in the store: {len(configs) - len(todo)}")
+
+    futures = {pool.submit(run_trial, config, epochs, patience): config for config in todo}
+    for idx, future in enumerate(as_completed(futures)):
+        config = futures[future]
+        try:
+            trial = store.add(future.result())
+            results[trial["key"]] = trial
+            print(f"[{idx + 1}/{len(todo)}] done: {config} val_auc {trial['val_auc']:.4f} "
+                  f"(epochs {trial['epochs_run']}, {trial['time']:.1f} s)")
+        except Exception as e:
+            print(f"[{idx + 1}/{len(todo)}] failed: {config}: {e}")
+
+    return [trial for trial in results.values() if trial is not None]
+
+def halving_budgets(min_epochs, max_epochs, eta):
+
+    budgets = [min_epochs]
+    while budgets[-1] * eta < max_epochs:
+        budgets.append(budgets[-1] * eta)
+    if budgets[-1] < max_epochs:
+        budgets.append(max_epochs)
+
+    return budgets
+
+def search(pool, store, configs, search_type="halving", max_epochs=30, min_epochs=3, eta=3, patience=3):
+
+    if search_type == "random":
+        return run_rung(pool, store, configs, max_epochs, patience)
+
+    trials = []
+    for budget in halving_budgets(min_epochs, max_epochs, eta):
+        rung = sorted(run_rung(pool, store, configs, budget, patience), key=lambda trial: -trial["val_auc"])
+        trials += rung
+        configs = [trial["config"] for trial in rung[:max(1, math.ceil(len(rung) / eta))]]
+
+    return trials
+
+def results_table(trials):
+
+    df = pd.DataFrame([dict(trial["config"], **{name: trial[name] for name in ["epochs", "val_auc", "best_epoch", "epochs_run", "time"]})
+                       for trial in trials])
+    return df.sort_values(["epochs", "val_auc"], ascending=False, ignore_index=True)
+
+
 if __name__ == "__main__":
 
-    df_train = pd.read_csv("train_data.csv")
-    x_train = df_train.iloc[:, 1:].to_numpy()
-    y_train = df_train.iloc[:, 0].to_numpy()
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", default="train_data", help="train dataset")
+    parser.add_argument("-search", "--search", default="halving", choices=searches, help="search method")
+    parser.add_argument("-n", "--n", type=int, default=27, help="number of configurations")
+    parser.add_argument("-epochs", "--epochs", type=int, default=30, help="maximum epochs of a trial")
+    parser.add_argument("-min_epochs", "--min_epochs", type=int, default=3, help="epochs of the first halving rung")
+    parser.add_argument("-eta", "--eta", type=int, default=3, help="halving factor")
+    parser.add_argument("-patience", "--patience", type=int, default=3, help="early stopping patience (epochs without val AUC improvement)")
+    parser.add_argument("-val", "--val", type=float, default=0.2, help="validation fraction of the train data")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="parallel trials")
+    parser.add_argument("-threads", "--threads", type=int, default=None, help="TensorFlow threads per trial (default: cores / -j)")
+    parser.add_argument("-store", "--store", default="tuning_trials.jsonl", help="trial store")
+    parser.add_argument("-seed", "--seed", type=int, default=1234, help="seed of the configurations and of the validation split")
+    parser.add_argument("-o", "--output", default="tuning_results.csv", help="table of the trials")
+
+    args = parser.parse_args()
+
+    threads = args.threads or max(1, os.cpu_count() // args.jobs)
+    configs = sample_configs(args.n, args.seed)
+
+    # trials are only reused with the same data (content), validation split and early stopping
+    store = TrialStore(args.store, {"input": args.input, "data": dataset_fingerprint(args.input), "val": args.val,
+                                    "seed": args.seed, "patience": args.patience})
 
-    model = KerasClassifier(build_fn=the_model, epochs=10, batch_size=32, verbose=0)
+    time_start = time.perf_counter()
 
-    param_grid = {
-        'learning_rate': [0.0001, 0.001, 0.01], 
-        'neurons': [64, 128, 256], 
-        'batch_size': [16, 32, 64] 
-    }
+    # spawn: every trial process starts without TensorFlow, so the thread settings of init_worker apply
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(args.input, args.val, args.seed, threads)) as pool:
+        trials = search(pool, store, configs, args.search, args.epochs, args.min_epochs, args.eta, args.patience)
 
-    grid = GridSearchCV(estimator=model, param_grid=param_grid, cv=3, scoring='roc_auc', n_jobs=4)
-    grid_result = grid.fit(x_train, y_train)
+    df = results_table(trials)
+    df.to_csv(args.output, index=False)
 
-    print("Best Parameters:", grid_result.best_params_)
-    print("Best Accuracy:", grid_result.best_score_)
+    if len(df):
+        best = df.iloc[0]
+        print("Best Parameters:", {name: best[name].item() for name in search_space})
+        print(f"Best roc_auc: {best['val_auc']:.4f} (epochs {best['epochs']})")
+    print(f"Trials: {len(df)}, time: {time.perf_counter() - time_start:.1f} s, output: {args.output}, store: {args.store}")
 
-    # lastest results (14.03.25)
+    # lastest results of the GridSearchCV version (14.03.25)
     # Best Parameters: {'batch_size': 32, 'learning_rate': 0.001, 'neurons': 128}
-    # Best Accuracy: 0.6357778722250879  
\ No newline at end of file
+    # Best Accuracy: 0.6357778722250879
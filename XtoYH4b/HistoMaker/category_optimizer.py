@@ -0,0 +1,220 @@
+#######################################################
+
+# This script chooses the WP-combination categories of each mass point, instead of the hard-coded
+# Comb_5_5_4_4 / Comb_5_5_5_4 / Comb_5_5_5_5 of Hist2Comb.py and CreateCards_XYHto4b.C.
+# The combinations (bins of hist_wp_combinations) are grouped into up to -n mutually exclusive categories
+# which maximize the total significance sqrt(sum Z_c^2), Z_c = sqrt(2 * ((S + B)*log(1 + (S/B)) - S)) of each category,
+# with at least -minB background in every category. Combinations which do not help can be left out.
+# The combinations are ordered by S/B, and the categories are ranges of this order, so the S and B of every
+# possible category come from two cumulative sums (computed once per mass point). Methods:
+#   exact  = best grouping of the ordered combinations (dynamic programming over the category boundaries)
+#   greedy = starts from the best single category and splits or extends it while the significance increases
+# The mass points are optimized in parallel (-j).
+# Z_Reference is the significance of the current categories (5_5_4_4, 5_5_5_4, 5_5_5_5) for comparison.
+
+# command to run this scripts:
+# python3 category_optimizer.py -s signal/WP_*.root -b background/combine_background_PNetB.root background/combine_background_RobustParTAK4B.root
+# optional: -n [max categories, default 3] -minB [min background per category] -method [exact/greedy] -New [True/False] -o [output name] -j [processes]
+# -> <output>.csv (one row per category), <output>_summary.csv (one row per mass point)
+
+#######################################################
+
+import argparse
+import glob
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import hist_cache
+import wp_index
+from significance_batch import parse_signal, significance
+
+
+methods = ["exact", "greedy"]
+reference_categories = [[5, 5, 4, 4], [5, 5, 5, 4], [5, 5, 5, 5]]
+
+
+def asimov2(s, b):
+
+    # squared Asimov significance, 0 for empty categories
+    long_ = significance(s, b)[0]
+    return np.nan_to_num(long_**2, nan=0.0)
+
+def segment_z2(s, b, min_background):
+
+    # (n+1, n+1) squared significance of the categories [i, j) of the ordered bins, -inf if not allowed
+    cs = np.concatenate([[0.0], np.cumsum(s)])
+    cb = np.concatenate([[0.0], np.cumsum(b)])
+
+    seg_s = cs[None, :] - cs[:, None]
+    seg_b = cb[None, :] - cb[:, None]
+
+    idx = np.arange(len(cs))
+    allowed = (idx[None, :] > idx[:, None]) & (seg_b >= min_background) & (seg_b > 0)
+
+    return np.where(allowed, asimov2(np.where(allowed, seg_s, 0.0), np.where(allowed, seg_b, 1.0)), -np.inf)
+
+def optimize_exact(z2, max_categories):
+
+    # best[k, j]: best sum of Z^2 with k categories among the first j ordered bins (bins can be left out)
+    n = z2.shape[0] - 1
+    best = np.full((max_categories + 1, n + 1), -np.inf)
+    best[0, :] = 0.0
+    start = np.full((max_categories + 1, n + 1), -1)
+
+    for k in range(1, max_categories + 1):
+        total = best[k - 1][:, None] + z2
+        start[k] = np.argmax(total, axis=0)
+        best[k] = total[start[k], np.arange(n + 1)]
+
+        # leaving bin j-1 out
+        for j in range(1, n + 1):
+            if best[k, j - 1] > best[k, j]:
+                best[k, j], start[k, j] = best[k, j - 1], -2
+
+    k, j = np.unravel_index(np.argmax(best[1:]), best[1:].shape)
+    k += 1
+    if not np.isfinite(best[k, j]):
+        return []
+
+    segments = []
+    while k > 0 and j > 0:
+        if start[k, j] == -2:
+            j -= 1
+            continue
+        if start[k, j] < 0:
+            break
+        segments.append((start[k, j], j))
+        k, j = k - 1, start[k, j]
+
+    return sorted(segments)
+
+def optimize_greedy(z2, max_categories):
+
+    n = z2.shape[0] - 1
+    if not np.isfinite(z2).any():
+        return []
+
+    # best single category, then the best split of a category or the best new category after the last one
+    i, j = np.unravel_index(np.argmax(z2), z2.shape)
+    segments = [(i, j)]
+
+    while len(segments) < max_categories:
+        best_gain, best_segments = 0.0, None
+
+        for idx, (i, j) in enumerate(segments):
+            if j - i > 1:
+                gains = z2[i, i + 1:j] + z2[i + 1:j, j] - z2[i, j]
+                m = np.argmax(gains)
+                if gains[m] > best_gain:
+                    best_gain, best_segments = gains[m], segments[:idx] + [(i, i + 1 + m), (i + 1 + m, j)] + segments[idx + 1:]
+
+        last = max(j for _, j in segments)
+        first = min(i for i, _ in segments)
+        if last < n:
+            m = last + np.argmax(z2[last, last:])
+            if z2[last, m] > best_gain:
+                best_gain, best_segments = z2[last, m], segments + [(last, m)]
+        if first > 0:
+            m = np.argmax(z2[:first, first])
+            if z2[m, first] > best_gain:
+                best_gain, best_segments = z2[m, first], [(m, first)] + segments
+
+        if best_segments is None:
+            break
+        segments = best_segments
+
+    return sorted(segments)
+
+optimizers = {"exact": optimize_exact, "greedy": optimize_greedy}
+
+def optimize(s, b, bins, max_categories=3, min_background=1.0, method="exact"):
+
+    # s, b: (n_bins,) of the candidate bins, returns [(bins of the category, S, B, Z)]
+    ratio = s / np.where(b > 0, b, 1e-9)
+    order = np.argsort(-ratio, kind="stable")
+
+    z2 = segment_z2(s[order], b[order], min_background)
+    segments = optimizers[method](z2, max_categories)
+
+    categories = []
+    for i, j in segments:
+        category_bins = bins[order[i:j]]
+        categories.append((np.sort(category_bins), s[order[i:j]].sum(), b[order[i:j]].sum(), np.sqrt(z2[i, j])))
+
+    return categories
+
+def optimize_signal(signal, s, b, bins, reference_bins, max_categories, min_background, method):
+
+    # one mass point: category rows and summary row
+    tagger, mx, my = parse_signal(signal)
+    categories = optimize(s[bins - 1], b[bins - 1], bins, max_categories, min_background, method)
+
+    index = wp_index.get_index()
+    rows = []
+    for idx, (category_bins, s_cat, b_cat, z) in enumerate(categories):
+        rows.append({"Tagger": tagger, "MX": mx, "MY": my, "Signal": signal, "Category": idx + 1,
+                     "Combinations": ";".join("_".join(str(wp) for wp in index.label(bin_number)) for bin_number in category_bins),
+                     "N_Bins": len(category_bins), "S": s_cat, "B": b_cat, "Z": z})
+
+    z_total = np.sqrt(sum(z**2 for _, _, _, z in categories))
+    z_reference = np.sqrt(asimov2(s[reference_bins - 1], b[reference_bins - 1]).sum())
+
+    summary = {"Tagger": tagger, "MX": mx, "MY": my, "Signal": signal, "N_Categories": len(categories),
+               "Z_Total": z_total, "Z_Reference": z_reference}
+
+    return rows, summary
+
+def optimize_table(signal_files, background_files, max_categories=3, min_background=1.0, method="exact", isNew="False", jobs=None):
+
+    index = wp_index.get_index(njets=4, nwp=6, rejected_wp=(0.0,))
+    bins = index.selected_bins() if isNew == "True" else np.arange(1, index.nbins + 1)
+    reference_bins = np.array([index.bin(label) for label in reference_categories])
+
+    backgrounds = {parse_signal(f)[0]: hist_cache.load_hist(f, "hist_wp_combinations").contents for f in background_files}
+
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for signal_file in signal_files:
+            tagger = parse_signal(signal_file)[0]
+            b = backgrounds.get(tagger, next(iter(backgrounds.values())) if len(backgrounds) == 1 else None)
+            if b is None:
+                print(f"No background for tagger {tagger}, skipping {signal_file}")
+                continue
+
+            s = hist_cache.load_hist(signal_file, "hist_wp_combinations").contents
+            futures.append(pool.submit(optimize_signal, signal_file, s, b, bins, reference_bins, max_categories, min_background, method))
+
+        for future in futures:
+            results.append(future.result())
+
+    categories = pd.DataFrame(sum([rows for rows, _ in results], []))
+    summary = pd.DataFrame([summary for _, summary in results])
+
+    return categories, summary
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-s", "--signal", nargs="+", required=True, help="signal files")
+    parser.add_argument("-b", "--background", nargs="+", required=True, help="background file(s), one per tagger")
+    parser.add_argument("-n", "--categories", type=int, default=3, help="maximum number of categories")
+    parser.add_argument("-minB", "--minB", type=float, default=1.0, help="minimum background in each category")
+    parser.add_argument("-method", "--method", default="exact", choices=methods, help="search method")
+    parser.add_argument("-New", "--New", default="False", help="only the combinations selected for the New optimization")
+    parser.add_argument("-o", "--output", default="categories", help="output name")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="parallel processes")
+
+    args = parser.parse_args()
+
+    signal_files = sorted(set(sum([glob.glob(pattern) or [pattern] for pattern in args.signal], [])))
+
+    categories, summary = optimize_table(signal_files, args.background, args.categories, args.minB, args.method, args.New, args.jobs)
+
+    categories.to_csv(f"{args.output}.csv", index=False)
+    summary.to_csv(f"{args.output}_summary.csv", index=False)
+
+    print(summary.to_string(index=False))
+    print(f"Output: {args.output}.csv, {args.output}_summary.csv")
@@ -0,0 +1,305 @@
+#######################################################
+
+# This script processes signal or background in root files containing jet-level information 
+# to analyze the combinations of b-tagging working points (WP) for 4 jets 
+# using either the PNetB or RobustParTAK4B taggers. 
+# It reads the tagging decisions and weights of the JetTree as arrays (columnar backend, wp_columnar.py, the default),
+# categorizes events based on combinations of WP indices, and show in histograms.
+# The per-event PyROOT loop is kept as -backend root, and -backend validate runs both and checks they agree.
+# The script supports both standard and optimized combinations (the "new" mode),
+# (1 = pass loose but fail medium ... 2, 3, 4 ,5) and (1 = pass loose ... 2, 3, 4 ,5) respectively.
+# And saves the outputs in .root, with the per-event labels and weights in .npz (or .npy) and a .json summary. 
+
+# One implementation for all eras (era settings in eras.py), run through 2022/CombineHist.py or 2023/CombineHist.py:
+# command to run this scripts (in the year directory):
+# python3 CombineHist.py -i [path/file*.root] -isSignal [1 or 0] (1 = signal, 0 = background)
+# optional: -backend [columnar/root/validate] (default columnar, root = old per-event loop for validation)
+# optional: -sidecar [npz/npy] (per-event output, npy can be memory-mapped, see event_sidecar.py)
+# optional: -j [number of parallel files, default all cores] -force (also remake up-to-date outputs)
+# outputs made with another -backend or -sidecar are not up to date and are remade
+# several eras in one pool: see histomaker.py
+
+# Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
+# 27 Mar 2025
+
+#######################################################
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import ROOT
+import numpy as np
+import matplotlib.pyplot as plt
+import mplhep as hep
+import eras
+import event_sidecar
+import wp_columnar
+import wp_index
+
+
+njets = 4  # max = 6
+nwp = 6
+rejected_wp = (0.0,) # for a single rejected please use (num,)
+
+
+def Read_Hist_ROOT(input_file, method, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    # reference per-event loop, use backend "root" to validate the columnar backend
+
+    file = ROOT.TFile.Open(input_file, "READ")
+
+    tree = file.Get("JetTree")
+
+    all_branches = [branch.GetName() for branch in tree.GetListOfBranches()]
+
+    jet_branch, weight_branch, b_tag_pass = wp_columnar.get_branches(all_branches, method)
+
+    b_tag_pass_L   = b_tag_pass["L"]
+    b_tag_pass_M   = b_tag_pass["M"]
+    b_tag_pass_T   = b_tag_pass["T"]
+    b_tag_pass_XT  = b_tag_pass["XT"]
+    b_tag_pass_XXT = b_tag_pass["XXT"]
+
+    # event_wp = [[getattr(event, branch_name) for branch_name in branches[:njets]] for event in tree]
+
+    event_wp, event_weights = [], []
+    event_pass = []
+    for event in tree:
+
+        jet_wp = [getattr(event, jet) for jet in jet_branch[:njets]]
+        
+        weight = [getattr(event, weight) for weight in weight_branch[:njets]]
+
+        # if all(value not in rejected_wp for value in jet_wp):  # 0 == not pass loose wp
+        #     event_wp.append(jet_wp)
+        #     event_weights.append(weight)
+
+        pass_L   = [getattr(event, b) for b in b_tag_pass_L[:njets]]
+        pass_M   = [getattr(event, b) for b in b_tag_pass_M[:njets]]
+        pass_T   = [getattr(event, b) for b in b_tag_pass_T[:njets]]
+        pass_XT  = [getattr(event, b) for b in b_tag_pass_XT[:njets]]
+        pass_XXT = [getattr(event, b) for b in b_tag_pass_XXT[:njets]]
+
+        event_wp.append(jet_wp)
+        event_weights.append(weight)
+
+        event_pass.append([pass_L, pass_M, pass_T, pass_XT, pass_XXT])
+
+    file.Close()
+
+    return wp_columnar.Loop_Combinations(event_wp, event_weights, event_pass, njets, nwp, rejected_wp)
+
+def Set_Hist(hist, sumw, sumw2, entries):
+
+    # contents and errors from the sums per bin, instead of filling event by event
+    for idx, (content, content2) in enumerate(zip(sumw, sumw2)):
+        hist.SetBinContent(idx + 1, content)
+        hist.SetBinError(idx + 1, np.sqrt(content2))
+
+    hist.SetEntries(entries)
+
+def Make_Hist(input_file, output_file, method="PNetB", backend="columnar", sidecar="npz", result=None, skip_unreadable=False):
+
+    # method = tagger name of the branches (eras.py taggers), e.g. PNetB or RobustParTAK4B
+
+    try:
+        if result is not None:
+            # already read, e.g. both taggers from one read in Make_Hists
+            label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = result
+        elif backend == "root":
+            label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = Read_Hist_ROOT(input_file, method, njets, nwp, rejected_wp)
+        else:
+            label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = wp_columnar.Make_WP_Combinations(input_file, method, njets, nwp, rejected_wp)
+
+    except Exception as e:
+        # era setting (eras.py), e.g. 2023
+        if not skip_unreadable:
+            raise
+        print(f"Cannot get branches from {input_file}: {e}")
+        return
+
+    if backend == "validate":
+        reference = Read_Hist_ROOT(input_file, method, njets, nwp, rejected_wp)
+        if not wp_columnar.compare_results(reference, (label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled)):
+            raise RuntimeError(f"columnar and ROOT backends differ for {input_file} ({method})")
+        print(f"Backends agree: {input_file} ({method})")
+
+    index = wp_index.get_index(njets, nwp, rejected_wp)
+
+    print(f"rejected wp: {rejected_wp}")
+    print(f"Events: {len(event_wp_labeled)}")
+
+    if len(event_wp_labeled) == 0: # len(event_wp_labeled) must be == len(event_weights_labeled)
+        print(f"Check the input file ------> {input_file}")
+
+    # per-event labels and weights as typed arrays + a JSON header with the summary (see event_sidecar.py)
+    info = {"input": input_file, "method": method, "backend": backend, "njets": njets, "nwp": nwp, "rejected_wp": list(rejected_wp)}
+    event_sidecar.write_events(output_file, index, new_hist, event_wp_labeled, event_weights_labeled, info=info, format=sidecar)
+
+    # hep.style.use("CMS")
+    # hep.cms.text("", loc=0)
+
+    # plt.hist(event_wp_labeled, bins=range(min(event_wp_labeled), max(event_wp_labeled)+1), weights=event_weights_labeled, density=False)
+    # plt.xlabel("combination WP of 4 jets")
+    # plt.ylabel("Entries")
+    # plt.savefig(output_file)
+    # plt.clf()
+
+    sumw, sumw2, new_sumw, new_sumw2 = wp_columnar.hist_arrays(label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled, index.nbins)
+
+    # written to a temporary file first, so an interrupted job is not taken as up to date
+    output = ROOT.TFile(f"{output_file}.tmp.root", "RECREATE")
+
+    min_bin = 0.5
+    max_bin = index.nbins
+    n_bins = index.nbins
+
+    hist = ROOT.TH1D("hist_wp_combinations", f"Combination WP of {njets} Jets", n_bins, min_bin, max_bin + 0.5)
+    new_hist_root = ROOT.TH1D("hist_wp_combinations_new", f"New Combination WP of {njets} Jets", n_bins, min_bin, max_bin + 0.5)
+
+    hist.Sumw2()
+    new_hist_root.Sumw2()
+
+    Set_Hist(hist, sumw, sumw2, np.count_nonzero(np.asarray(event_wp_labeled) > 0))
+    Set_Hist(new_hist_root, new_sumw, new_sumw2, sum(value[0] for value in new_hist.values()))
+
+    hist.GetXaxis().SetTitle(f"Combination WP of {njets} Jets")
+    hist.GetYaxis().SetTitle("Entries")
+
+    canvas_hist = ROOT.TCanvas("canvas_hist", "WP Combinations", 800, 600)
+    canvas_hist.Draw()
+    hist.Draw("HIST") 
+    hist.Write()
+
+    new_hist_root.GetXaxis().SetTitle(f"Combination WP of {njets} Jets")
+    new_hist_root.GetYaxis().SetTitle("Entries")
+
+    canvas_new_hist = ROOT.TCanvas("canvas_new_hist", "WP Combinations", 800, 600)
+    canvas_new_hist.Draw()
+    new_hist_root.Draw("HIST") 
+    new_hist_root.Write()
+
+    output.Close()
+
+    os.replace(f"{output_file}.tmp.root", f"{output_file}.root")
+
+def Uncertainty_Hist(input_hist):
+
+    hist_ = ROOT.TFile.Open(f"{input_hist}.root", "READ")
+    hist = hist_.Get("hist_wp_combinations")
+
+    nbins = hist.GetNbinsX()
+
+    hist_center, hist_content = [], []
+    hist_err = []
+    for i in range(1, nbins + 1):
+        hist_center.append(hist.GetBinCenter(i))
+        hist_content.append(hist.GetBinContent(i))
+        hist_err.append(hist.GetBinError(i) / hist.GetBinContent(i) if hist.GetBinContent(i) != 0 else 0)
+
+    hep.style.use("CMS")
+    hep.cms.text("", loc=0)
+
+    plt.scatter(hist_center, hist_err)
+    plt.xlabel("bins")
+    plt.ylabel("Statistical Uncertainty")
+
+    directory, filename = os.path.split(input_hist)
+    output_name = os.path.join(directory, f"Stat_Unc_{filename}.pdf")
+
+    plt.savefig(output_name)
+    plt.clf()
+
+def Output_Files(input_file, isSignal, prefixes, output_dir=""):
+
+    # prefixes = taggers of the era (eras.py), output_dir = "" -> signal/ and background/ of the current directory, as before
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    if isSignal:
+        dir_path = os.path.join(output_dir, "signal/")
+    else:
+        dir_path = os.path.join(output_dir, "background/")
+
+    return {method: dir_path + prefix + name for method, prefix in prefixes.items()}
+
+def Is_Up_To_Date(input_file, output_file, backend="columnar", sidecar="npz"):
+
+    # .root and .json both written after the last change of the input, with the same backend and sidecar format
+    outputs = [f"{output_file}.root", f"{output_file}.json"]
+    if not all(os.path.exists(output) for output in outputs):
+        return False
+
+    if min(os.path.getmtime(output) for output in outputs) < os.path.getmtime(input_file):
+        return False
+
+    header = event_sidecar.read_header(output_file)
+    return header.get("backend") == backend and header.get("format") == sidecar
+
+def Make_Hists(input_file, outputs, backend="columnar", sidecar="npz", skip_unreadable=False):
+
+    # outputs = {method: output file}, both taggers are made from a single read of JetTree
+    time_start = time.perf_counter()
+
+    results = {}
+    if backend != "root":
+        try:
+            results = wp_columnar.Make_WP_Combinations_Taggers(input_file, list(outputs), njets, nwp, rejected_wp)
+        except Exception as e:
+            if not skip_unreadable:
+                raise
+            print(f"Cannot get branches from {input_file}: {e}")
+            return time.perf_counter() - time_start
+
+    for method, output_file in outputs.items():
+        Make_Hist(input_file, output_file, method=method, backend=backend, sidecar=sidecar, result=results.get(method),
+                  skip_unreadable=skip_unreadable)
+        print(f"Output file: {output_file}")
+
+    return time.perf_counter() - time_start
+
+def main(era_name, argv=None):
+
+    era = eras.get_era(era_name)
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="Input ROOT files")
+    parser.add_argument("-isSignal", "--isSignal", required=True, help="signal = 1, background = 0")
+    parser.add_argument("-backend", "--backend", default="columnar", choices=["columnar", "root", "validate"],
+                        help="columnar = NumPy arrays (default), root = per-event PyROOT loop, validate = run both and compare")
+    parser.add_argument("-sidecar", "--sidecar", default="npz", choices=event_sidecar.formats,
+                        help="per-event output: npz = compressed (default), npy = plain arrays which can be memory-mapped")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of files processed in parallel")
+    parser.add_argument("-force", "--force", action="store_true", help="remake outputs which are already up to date")
+
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for input_ in args.input:
+        outputs = Output_Files(input_, int(args.isSignal), prefixes=era.taggers)
+
+        if not args.force and all(Is_Up_To_Date(input_, output_file, args.backend, args.sidecar) for output_file in outputs.values()):
+            print(f"Up to date, skipping: {input_}")
+            continue
+
+        jobs.append((input_, outputs))
+
+    print(f"Era: {era.name}, files: {len(args.input)}, to process: {len(jobs)}, jobs: {args.jobs}")
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+
+        futures = {pool.submit(Make_Hists, input_, outputs, args.backend, args.sidecar, era.skip_unreadable): input_ for input_, outputs in jobs}
+
+        for idx, future in enumerate(as_completed(futures)):
+            input_ = futures[future]
+            try:
+                print(f"[{idx + 1}/{len(jobs)}] done: {input_} ({future.result():.1f} s)")
+            except Exception as e:
+                failed.append(input_)
+                print(f"[{idx + 1}/{len(jobs)}] failed: {input_}: {e}")
+
+    if failed:
+        print(f"{len(failed)} files failed, rerun the same command to retry them (up to date outputs are skipped):")
+        for input_ in failed:
+            print(f"  {input_}")
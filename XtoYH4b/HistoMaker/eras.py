@@ -0,0 +1,94 @@
+#######################################################
+
+# Registry of the data-taking eras used by the HistoMaker stages (combine_hist.py, significance.py, stat_unc.py,
+# highest_significance.py) and by histomaker.py, so the year directories (2022/, 2023/) only keep thin entry points
+# and a new era (e.g. 2024) is one register_era(...) call instead of a copy of every script.
+# An era has:
+#   input_dir   = CutOptimizer outputs (Histogram_<sample>.root) of the era
+#   work_dir    = directory of the stage outputs (signal/, background/, tables), the year directory
+#   data        = data samples
+#   taggers     = {tagger: prefix of the CombineHist.py outputs}
+#   skip_unreadable = CombineHist.py prints and skips the inputs without the JetTree branches (2023)
+#   skip_infinite   = highest_significance.py skips the signals with infinite significance (2023)
+
+# usage:
+# era = get_era("2023")
+# era.signal_files()     # Histogram_NMSSM_... files of the era in input_dir
+
+#######################################################
+
+import os
+import sample_catalogue
+
+
+histomaker_dir = os.path.dirname(os.path.abspath(__file__))
+
+histogram_dir = "/afs/desy.de/user/c/chokepra/private/XtoYH4b/CMSSW_14_2_1/src/XtoYH4b/HistoMaker/output/"
+
+default_taggers = {"PNetB": "WP_PNetB_", "RobustParTAK4B": "WP_RobustParTAK4B_"}
+
+
+class Era:
+
+    def __init__(self, name, input_dir, work_dir, data=(), taggers=None,
+                 skip_unreadable=False, skip_infinite=False):
+
+        self.name = name
+        self.input_dir = input_dir
+        self.work_dir = work_dir
+        self.data = list(data)
+        self.taggers = dict(taggers or default_taggers)
+        self.skip_unreadable = skip_unreadable
+        self.skip_infinite = skip_infinite
+
+    def input_files(self):
+
+        # CutOptimizer outputs of the era: (signal files, background files), data are not used by the stages
+        signal_files, background_files = [], []
+        if not os.path.isdir(self.input_dir):
+            return signal_files, background_files
+
+        for name in sorted(os.listdir(self.input_dir)):
+            if not (name.startswith("Histogram_") and name.endswith(".root")):
+                continue
+
+            sample = name[len("Histogram_"):-len(".root")]
+            if sample in self.data or sample.startswith("Data"):
+                continue
+            (signal_files if sample.startswith("NMSSM") else background_files).append(os.path.join(self.input_dir, name))
+
+        return signal_files, background_files
+
+    def signal_files(self):
+
+        return self.input_files()[0]
+
+    def background_files(self):
+
+        return self.input_files()[1]
+
+    def mass(self, filename):
+
+        # "MX-<mx>_MY-<my>" from a significance file name (with or without New_), as highest_significance.py
+        return sample_catalogue.mass_name(sample_catalogue.parse(filename, self.name))
+
+
+registry = {}
+
+def register_era(era):
+
+    registry[era.name] = era
+    return era
+
+def get_era(name):
+
+    if name not in registry:
+        raise KeyError(f"unknown era {name}, registered: {sorted(registry)}")
+    return registry[name]
+
+
+register_era(Era("2022", histogram_dir + "2022/", os.path.join(histomaker_dir, "2022"),
+                 data=["Data_Run3_2022_C_JetHT", "Data_Run3_2022_C_JetMET", "Data_Run3_2022_D_JetMET"]))
+
+register_era(Era("2023", histogram_dir + "2023/", os.path.join(histomaker_dir, "2023"),
+                 skip_unreadable=True, skip_infinite=True))
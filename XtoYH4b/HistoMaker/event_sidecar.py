@@ -0,0 +1,81 @@
+#######################################################
+
+# Per-event output of CombineHist.py, replacing the .txt dump (one line per label and per weight).
+# The event arrays are stored as typed arrays: bin label as uint16 and weight as float32,
+# either compressed in one {output}_events.npz (default) or as two plain .npy files
+# ({output}_labels.npy, {output}_weights.npy) which can be memory-mapped.
+# The summary (label map, new combinations with count and mean weight, number of events)
+# is kept in a small JSON header {output}.json, which also points to the event files.
+
+# usage:
+# write_events(output_file, index, new_hist, event_wp_labeled, event_weights_labeled, info={...})
+# header, labels, weights = read_events(output_file)                   # .npz or .npy
+# header, labels, weights = read_events(output_file, mmap_mode="r")    # .npy only, no copy
+
+#######################################################
+
+import json
+import os
+import numpy as np
+
+
+sidecar_version = 1
+formats = ["npz", "npy"]
+
+
+def write_events(output_file, index, new_hist, event_wp_labeled, event_weights_labeled, info=None, format="npz"):
+
+    if format not in formats:
+        raise ValueError(f"format must be one of {formats}, got {format}")
+
+    labels = np.asarray(event_wp_labeled, dtype=np.uint16)
+    weights = np.asarray(event_weights_labeled, dtype=np.float32)
+
+    if len(labels) != len(weights):
+        raise ValueError(f"{len(labels)} labels but {len(weights)} weights")
+
+    # everything is written to a temporary file first, so an interrupted job never leaves a broken output
+    if format == "npz":
+        events = {"events": os.path.basename(f"{output_file}_events.npz")}
+        np.savez_compressed(f"{output_file}_events.tmp.npz", labels=labels, weights=weights)
+        os.replace(f"{output_file}_events.tmp.npz", f"{output_file}_events.npz")
+    else:
+        events = {"labels": os.path.basename(f"{output_file}_labels.npy"), "weights": os.path.basename(f"{output_file}_weights.npy")}
+        for name, array in [("labels", labels), ("weights", weights)]:
+            np.save(f"{output_file}_{name}.tmp.npy", array)
+            os.replace(f"{output_file}_{name}.tmp.npy", f"{output_file}_{name}.npy")
+
+    header = {
+        "version": sidecar_version,
+        **(info or {}),
+        "format": format,
+        "files": events,
+        "events": int(len(labels)),
+        "sum_weights": float(np.sum(weights, dtype=np.float64)),
+        "label": {str(idx + 1): l for idx, l in enumerate(index.label_list())},
+        "new_combinations": [{"combination": list(key), "count": value[0], "mean_weight": value[1], "sum_weight": value[2]} for key, value in new_hist.items()],
+    }
+
+    with open(f"{output_file}.json.tmp", "w") as output_json:
+        json.dump(header, output_json, indent=1)
+    os.replace(f"{output_file}.json.tmp", f"{output_file}.json")
+
+def read_header(output_file):
+
+    with open(f"{output_file}.json") as input_json:
+        return json.load(input_json)
+
+def read_events(output_file, mmap_mode=None):
+
+    # returns (header, labels, weights), mmap_mode is only used for the npy format
+    header = read_header(output_file)
+    directory = os.path.dirname(output_file)
+
+    if header["format"] == "npz":
+        with np.load(os.path.join(directory, header["files"]["events"])) as events:
+            return header, events["labels"], events["weights"]
+
+    labels = np.load(os.path.join(directory, header["files"]["labels"]), mmap_mode=mmap_mode)
+    weights = np.load(os.path.join(directory, header["files"]["weights"]), mmap_mode=mmap_mode)
+
+    return header, labels, weights
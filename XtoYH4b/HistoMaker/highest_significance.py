@@ -0,0 +1,99 @@
+#######################################################
+
+# This script identifies and visualizes the bin with the highest signal significance 
+# for each signal multiple significance.csv files. 
+# For .csv output file, tt combines signal significance values with statistical uncertainties 
+# and selects the row with the highest significance (Short_Significance) from each file. 
+# For plots, it shows both significance metrics per selected bin. 
+# The script works with both standard and optimized (-New flag) WP combination definition.
+
+# One implementation for all eras (era settings in eras.py), run through 2022/highest_significance.py or 2023/highest_significance.py:
+# command to run this scripts (in the year directory):
+# python3 highest_significance.py -s significance*.csv -u Stat_Unc.csv -New [True/False]
+# please check input file names in running command before running
+# optional: -tagger [PNetB/RobustParTAK4B] (default RobustParTAK4B, only used in the output name)
+# MX and MY are read from the file names by sample_catalogue.py
+# for the significance table of significance_batch.py, the join by bin is done by stat_unc_batch.py -sig
+
+# Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
+# 27 Mar 2025
+
+#######################################################
+
+
+import ROOT
+import os
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import mplhep as hep
+import eras
+
+
+def main(era_name, argv=None):
+
+    era = eras.get_era(era_name)
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-s", "--significance", nargs="+", required=True, help="")
+    parser.add_argument("-u", "--uncertainty", required=True, help="")
+    parser.add_argument("-New", "--New", required=True, help="")
+    parser.add_argument("-tagger", "--tagger", default="RobustParTAK4B", help="tagger of the output name")
+    
+    args = parser.parse_args(argv)
+
+    tagger = args.tagger
+
+    df_unc = pd.read_csv(args.uncertainty)
+
+    df_unc = df_unc[["Bin_Center", "Uncertainty"]]
+
+    highest_row_total = pd.DataFrame()
+    for significance in args.significance:
+
+        filename = os.path.basename(significance)
+        filename, _ = os.path.splitext(filename)
+
+        mass_info = era.mass(filename)
+        
+        df_sig = pd.read_csv(f"{filename}.csv")
+
+        # joined by bin, not by row position (the New Stat_Unc.csv only has the selected bins)
+        df = df_sig.merge(df_unc, on="Bin_Center", how="left", validate="one_to_one")
+
+        max_significance = df["Short_Significance"].max()
+
+        if era.skip_infinite and np.isinf(max_significance):
+            print(f"Max significance is infinity. From {filename}")
+            continue
+        highest_row = df[df["Short_Significance"] == max_significance]
+
+        highest_row.insert(0, "Mass", mass_info)
+
+        highest_row_total = pd.concat([highest_row_total, highest_row], axis=0)
+
+    if args.New == "True":
+        output_name = "New_highest_significance_" + tagger
+    else:
+        output_name = "highest_significance_" + tagger
+        
+    highest_row_total.to_csv(f"{output_name}.csv", index=False)
+
+    hep.style.use("CMS")
+    hep.cms.text("", loc=0)
+    plt.scatter(highest_row_total["Bin_Center"], highest_row_total["Long_Significance"], label="sqrt(2 * ((S + B)*log(1 + (S/B)) - S))")
+    plt.scatter(highest_row_total["Bin_Center"], highest_row_total["Short_Significance"], label="S/sqrt(B)")
+    plt.xticks(highest_row_total["Bin_Center"], highest_row_total["Combination"] , fontsize=11, rotation=90)
+    plt.xlabel("bins")
+    plt.ylabel("Highest Significance")
+    plt.legend()
+    plt.savefig(f"{output_name}.pdf")
+    plt.clf()
+
+        
+
+        
+        
+
@@ -0,0 +1,173 @@
+#######################################################
+
+# Shared histogram loading for the HistoMaker analysis scripts (Significance.py, Stat_Unc.py, ...).
+# Every 1D histogram of a ROOT file is read once (uproot) into NumPy arrays:
+# contents, errors, edges and bin labels.
+# The arrays are kept in an on-disk cache (one .npz per ROOT file, in $XTOYH4B_HIST_CACHE or .hist_cache/),
+# which is invalidated when the size or the modification time of the ROOT file changes,
+# and in memory for the rest of the run, so a file used by many signal points is read only once.
+
+# write_file writes Hist objects back to a ROOT file as TH1D (uproot, no PyROOT needed).
+
+# usage:
+# hist = load_hist("background/combine_background.root", "hist_wp_combinations")
+# hist.contents, hist.errors, hist.edges, hist.centers, hist.labels
+# write_file("background/combine_background_PNetB.root", {"hist_wp_combinations": hist})
+
+#######################################################
+
+import hashlib
+import json
+import os
+import numpy as np
+import uproot
+
+
+cache_version = 1
+default_cache_dir = os.environ.get("XTOYH4B_HIST_CACHE", ".hist_cache")
+
+_memory = {}
+
+
+class Hist:
+
+    def __init__(self, contents, errors, edges, labels=None):
+
+        self.contents = contents
+        self.errors = errors
+        self.edges = edges
+        self.labels = labels
+
+    @property
+    def centers(self):
+        return 0.5 * (self.edges[:-1] + self.edges[1:])
+
+    @property
+    def nbins(self):
+        return len(self.contents)
+
+    def rel_errors(self):
+
+        # error / content, 0 for empty bins
+        return np.divide(self.errors, self.contents, out=np.zeros(self.nbins), where=self.contents != 0)
+
+
+def _file_key(path):
+
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": cache_version}
+
+def _cache_path(path, cache_dir):
+
+    digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{digest}.npz")
+
+def _read_root(path):
+
+    hists = {}
+    with uproot.open(path) as file:
+        for name, classname in file.classnames(recursive=False).items():
+            if not classname.startswith("TH1"):
+                continue
+
+            hist = file[name]
+            labels = hist.axis().labels()
+
+            hists[name.split(";")[0]] = Hist(np.asarray(hist.values(), dtype=np.float64),
+                                             np.asarray(hist.errors(), dtype=np.float64),
+                                             np.asarray(hist.axis().edges(), dtype=np.float64),
+                                             np.asarray(labels) if labels else None)
+
+    return hists
+
+def _write_cache(cache_file, key, hists):
+
+    arrays = {"__key__": np.array(json.dumps(key))}
+    for name, hist in hists.items():
+        arrays[f"{name}/contents"] = hist.contents
+        arrays[f"{name}/errors"] = hist.errors
+        arrays[f"{name}/edges"] = hist.edges
+        if hist.labels is not None:
+            arrays[f"{name}/labels"] = hist.labels
+
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+
+    # written to a temporary file first, so an interrupted job never leaves a broken cache
+    tmp_file = cache_file + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **arrays)
+    os.replace(tmp_file, cache_file)
+
+def _read_cache(cache_file, key):
+
+    if not os.path.exists(cache_file):
+        return None
+
+    with np.load(cache_file, allow_pickle=False) as cached:
+        if json.loads(str(cached["__key__"])) != key:
+            return None
+
+        names = sorted({name.rsplit("/", 1)[0] for name in cached.files if name != "__key__"})
+        return {name: Hist(cached[f"{name}/contents"], cached[f"{name}/errors"], cached[f"{name}/edges"],
+                           cached[f"{name}/labels"] if f"{name}/labels" in cached.files else None)
+                for name in names}
+
+def load_file(path, cache_dir=default_cache_dir):
+
+    # returns {histogram name: Hist} for all 1D histograms in the ROOT file
+    path = os.path.abspath(path)
+    key = _file_key(path)
+
+    if path in _memory and _memory[path][0] == key:
+        return _memory[path][1]
+
+    cache_file = _cache_path(path, cache_dir)
+    hists = _read_cache(cache_file, key)
+
+    if hists is None:
+        hists = _read_root(path)
+        _write_cache(cache_file, key, hists)
+
+    _memory[path] = (key, hists)
+
+    return hists
+
+def load_hist(path, name, cache_dir=default_cache_dir):
+
+    hists = load_file(path, cache_dir)
+    if name not in hists:
+        raise KeyError(f"Histogram {name} not found in {path}")
+
+    return hists[name]
+
+def to_th1d(name, hist, title=""):
+
+    sumw2 = hist.errors**2
+    centers = hist.centers
+
+    # uniform binning is stored as (nbins, min, max), like TH1D("", "", nbins, min, max)
+    widths = np.diff(hist.edges)
+    uniform = np.allclose(widths, widths[0])
+    axis = uproot.writing.identify.to_TAxis("xaxis", "", len(widths), hist.edges[0], hist.edges[-1],
+                                            fXbins=None if uniform else hist.edges)
+
+    # underflow and overflow are empty
+    data = np.concatenate([[0.0], hist.contents, [0.0]])
+    total_sumw2 = float(sumw2.sum())
+    entries = hist.contents.sum()**2 / total_sumw2 if total_sumw2 > 0 else 0.0
+
+    return uproot.writing.identify.to_TH1x(name, title, data, entries,
+                                           float(hist.contents.sum()), total_sumw2,
+                                           float((hist.contents * centers).sum()), float((hist.contents * centers**2).sum()),
+                                           np.concatenate([[0.0], sumw2, [0.0]]), axis)
+
+def write_file(path, hists, titles=None):
+
+    # {name: Hist} -> TH1D in a new ROOT file, written to a temporary file first
+    titles = titles or {}
+    tmp_path = path + f".{os.getpid()}.tmp.root"
+
+    with uproot.recreate(tmp_path) as file:
+        for name, hist in hists.items():
+            file[name] = to_th1d(name, hist, titles.get(name, ""))
+
+    os.replace(tmp_path, path)
@@ -0,0 +1,162 @@
+#######################################################
+
+# This script runs the HistoMaker stages for several eras in one invocation (era settings in eras.py):
+#   combine      = combine_hist.py (WP-combination histograms) of the CutOptimizer outputs of each era
+#   merge        = merge_hists.py (one background per tagger)
+#   significance = significance_batch.py (one table per era)
+#   unc          = stat_unc_batch.py (one table per era, joined by bin with the significance)
+# The files of all eras share one process pool (combine, merge), so a small era does not leave cores idle
+# while a large one is still running, and the histograms are read through one hist_cache (significance, unc).
+# The outputs are written in the work directory of each era (2022/, 2023/): signal/, background/ and the tables,
+# the same files as the year scripts.
+
+# command to run this scripts:
+# python3 histomaker.py -eras 2022 2023
+# optional: -stages [combine merge significance unc] -New [True/False] -j [processes] -force (remake up-to-date histograms)
+#           -backend [columnar/root/validate] -sidecar [npz/npy] (combine_hist.py)
+
+#######################################################
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import eras
+import combine_hist
+import event_sidecar
+import hist_cache
+import merge_hists
+import significance_batch
+import stat_unc_batch
+
+
+stages = ["combine", "merge", "significance", "unc"]
+
+
+def combine_jobs(era, force=False, backend="columnar", sidecar="npz"):
+
+    # [(era, input file, {tagger: output file})] of the inputs which are not up to date
+    signal_files, background_files = era.input_files()
+
+    jobs = []
+    for input_file, isSignal in [(f, 1) for f in signal_files] + [(f, 0) for f in background_files]:
+        outputs = combine_hist.Output_Files(input_file, isSignal, output_dir=era.work_dir, prefixes=era.taggers)
+        if force or not all(combine_hist.Is_Up_To_Date(input_file, output_file, backend, sidecar) for output_file in outputs.values()):
+            jobs.append((era, input_file, outputs))
+
+    print(f"Era {era.name}: {len(signal_files)} signals, {len(background_files)} backgrounds, to process: {len(jobs)}")
+    return jobs
+
+def run_combine(pool, selected_eras, force=False, backend="columnar", sidecar="npz"):
+
+    jobs = sum([combine_jobs(era, force, backend, sidecar) for era in selected_eras], [])
+
+    futures = {pool.submit(combine_hist.Make_Hists, input_file, outputs, backend, sidecar, era.skip_unreadable): (era, input_file)
+               for era, input_file, outputs in jobs}
+
+    failed = []
+    for idx, future in enumerate(as_completed(futures)):
+        era, input_file = futures[future]
+        try:
+            print(f"[{idx + 1}/{len(jobs)}] done: {era.name} {input_file} ({future.result():.1f} s)")
+        except Exception as e:
+            failed.append(input_file)
+            print(f"[{idx + 1}/{len(jobs)}] failed: {era.name} {input_file}: {e}")
+
+    return failed
+
+def wp_files(era, kind):
+
+    # CombineHist outputs of the era, kind = "signal" or "background"
+    return sorted(glob.glob(os.path.join(era.work_dir, kind, "WP_*.root")))
+
+def background_files(era):
+
+    return {tagger: os.path.join(era.work_dir, "background", f"combine_background_{tagger}.root") for tagger in era.taggers}
+
+def run_merge(pool, selected_eras):
+
+    # the groups of all eras are submitted before any result is collected
+    futures = {era.name: merge_hists.submit_background(pool, wp_files(era, "background"), cache_dir=os.path.join(era.work_dir, "merge_cache"))
+               for era in selected_eras}
+
+    merged = {}
+    for era in selected_eras:
+        merged[era.name] = merge_hists.collect_background(futures[era.name])
+
+        for tagger, hists in merged[era.name].items():
+            titles = {name: merge_hists.hist_titles.get(name, merge_hists.hist_titles.get(name.rsplit("_", 1)[0], "")) for name in hists}
+            hist_cache.write_file(background_files(era)[tagger], hists, titles)
+            print(f"Output: {background_files(era)[tagger]}")
+
+    return merged
+
+def run_significance(era, isNew="False", background_hists=None):
+
+    files = [f for f in background_files(era).values() if os.path.exists(f)]
+    table = significance_batch.significance_table(wp_files(era, "signal"), files, isNew=isNew, background_hists=background_hists)
+
+    output_name = os.path.join(era.work_dir, "New_significance_table" if isNew == "True" else "significance_table")
+    table.to_csv(f"{output_name}.csv", index=False)
+    print(f"Output: {output_name}.csv")
+
+    return table
+
+def run_unc(era, isNew="False", significance=None):
+
+    files = [f for f in background_files(era).values() if os.path.exists(f)]
+    table = stat_unc_batch.uncertainty_table(files + wp_files(era, "signal"), isNew=isNew)
+
+    output_name = os.path.join(era.work_dir, "New_Stat_Unc_table" if isNew == "True" else "Stat_Unc_table")
+    table.to_csv(f"{output_name}.csv", index=False)
+    print(f"Output: {output_name}.csv")
+
+    if significance is not None and len(significance):
+        joined = stat_unc_batch.join_significance(significance, table, files)
+        joined.to_csv(f"{output_name}_significance.csv", index=False)
+        joined[joined["Highest"]].to_csv(f"{output_name}_highest.csv", index=False)
+        print(f"Output: {output_name}_significance.csv, {output_name}_highest.csv")
+
+    return table
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-eras", "--eras", nargs="+", default=sorted(eras.registry), help="eras (default: all registered)")
+    parser.add_argument("-stages", "--stages", nargs="+", default=stages, choices=stages, help="stages to run, in this order")
+    parser.add_argument("-New", "--New", default="False", help="New combinations definition (significance, unc)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="processes shared by all eras")
+    parser.add_argument("-force", "--force", action="store_true", help="remake the histograms which are already up to date")
+    parser.add_argument("-backend", "--backend", default="columnar", choices=["columnar", "root", "validate"], help="combine_hist.py backend")
+    parser.add_argument("-sidecar", "--sidecar", default="npz", choices=event_sidecar.formats, help="combine_hist.py per-event output")
+
+    args = parser.parse_args()
+
+    selected_eras = [eras.get_era(name) for name in args.eras]
+    time_start = time.perf_counter()
+
+    merged, failed = {}, []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+
+        if "combine" in args.stages:
+            failed = run_combine(pool, selected_eras, args.force, args.backend, args.sidecar)
+
+        if "merge" in args.stages:
+            merged = run_merge(pool, selected_eras)
+
+    for era in selected_eras:
+        table = None
+        if "significance" in args.stages:
+            table = run_significance(era, args.New, merged.get(era.name))
+        if "unc" in args.stages:
+            run_unc(era, args.New, table)
+
+    if failed:
+        print(f"{len(failed)} files failed, rerun the same command to retry them (up to date outputs are skipped):")
+        for input_file in failed:
+            print(f"  {input_file}")
+
+    print(f"Eras: {', '.join(era.name for era in selected_eras)}, time: {time.perf_counter() - time_start:.1f} s")
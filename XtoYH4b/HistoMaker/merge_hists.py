@@ -0,0 +1,235 @@
+#######################################################
+
+# This script merges the WP-combination histograms (hist_wp_combinations, hist_wp_combinations_new)
+# of the CombineHist.py background outputs into one background per tagger, in memory,
+# instead of hadd-ing the ROOT files.
+# The samples are grouped into TT, ST, Zto2Q, Wto2Q, Diboson and QCD, the groups are merged in parallel,
+# and each group keeps a cache (merge_cache/) of the scaled arrays of its samples,
+# so adding or changing one sample only reads that sample again.
+# The output has the total histograms (same names as before, for Significance.py and Stat_Unc.py)
+# and the histograms of each group: hist_wp_combinations_TT, ...
+
+# Normalization: Weight_nom in JetTree (CutOptimizer.C) already includes xsec_weight,
+# so by default the samples are only summed (same as hadd).
+# With -summary MC_Summary_<year>.txt each sample is scaled by its XsecWeight = XSec / SumofGENWeights
+# (as CalculateXsecWeights of CutOptimizer.C, for JetTrees filled without it), then -lumi scales everything
+# (with -summary: the luminosity in pb^-1, as the XSec).
+# MC_Summary format: one line per sample, "sample Entries SumofLHEWeights SumofGENWeights XSec",
+# a header line naming the columns (e.g. "Sample Entries SumofLHEWeights SumofGENWeights XSec") sets their order,
+# other lines which are not numbers after the sample name (comments) are skipped.
+
+# command to run this scripts:
+# python3 merge_hists.py -i background/WP_*.root -o background/combine_background
+# -> background/combine_background_PNetB.root, background/combine_background_RobustParTAK4B.root
+# optional: -summary MC_Summary_2023.txt -lumi [scale] -j [parallel groups] -cache [cache dir]
+
+# from python (e.g. straight to significance_batch.significance_table(..., background_hists=...)):
+# background_hists = merge_background(files)   # {tagger: {histogram name: Hist}}
+
+#######################################################
+
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import hist_cache
+import sample_catalogue
+
+
+merge_version = 1
+hist_names = ["hist_wp_combinations", "hist_wp_combinations_new"]
+hist_titles = {"hist_wp_combinations": "Combination WP of 4 Jets", "hist_wp_combinations_new": "New Combination WP of 4 Jets"}
+
+# taggers and sample name prefixes of each group (histjobmaker.C) are defined in sample_catalogue.py
+taggers = sample_catalogue.taggers
+groups = sample_catalogue.groups
+
+summary_fields = ["Entries", "SumofLHEWeights", "SumofGENWeights", "XSec"]
+
+
+def sample_name(path):
+
+    # background/WP_PNetB_Histogram_TTto4Q_TuneCP5_....root -> ("PNetB", "TTto4Q_TuneCP5_...")
+    sample = sample_catalogue.parse(path)
+    return sample.tagger, sample.sample
+
+sample_group = sample_catalogue.sample_group
+
+def read_summary(path):
+
+    # {sample: {Entries, SumofLHEWeights, SumofGENWeights, XSec, XsecWeight}}, XsecWeight = XSec / SumofGENWeights
+    summary, columns = {}, summary_fields
+    with open(path) as summary_file:
+        for line in summary_file:
+            tokens = line.lstrip("#").split()
+            if "XSec" in tokens and "SumofGENWeights" in tokens:
+                # with or without a name for the sample column
+                columns = tokens if tokens[0] in summary_fields else tokens[1:]
+                continue
+            if len(tokens) < 2 or line.startswith("#"):
+                continue
+            try:
+                values = [float(token) for token in tokens[1:]]
+            except ValueError:
+                continue
+
+            sample = dict(zip(columns, values))
+            if "XSec" not in sample or "SumofGENWeights" not in sample:
+                raise ValueError(f"{path}: {tokens[0]} has no XSec and SumofGENWeights, columns: {columns}")
+            if sample["SumofGENWeights"] == 0:
+                raise ValueError(f"{path}: {tokens[0]} has SumofGENWeights = 0")
+
+            sample["XsecWeight"] = sample["XSec"] / sample["SumofGENWeights"]
+            summary[tokens[0]] = sample
+
+    return summary
+
+def sample_scale(name, summary, lumi_scale):
+
+    if summary is None:
+        return lumi_scale
+
+    if name not in summary:
+        raise KeyError(f"{name} not found in the MC summary")
+
+    return lumi_scale * summary[name]["XsecWeight"]
+
+def _sample_key(path, scale):
+
+    stat = os.stat(path)
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "scale": scale, "version": merge_version}
+
+def _read_group_cache(cache_file):
+
+    # {path: (key, {histogram name: (sumw, sumw2)})}, edges
+    if not os.path.exists(cache_file):
+        return {}, {}
+
+    with np.load(cache_file, allow_pickle=False) as cached:
+        keys = json.loads(str(cached["__keys__"]))
+        samples = {key["path"]: (key, {name: (cached[f"{idx}/{name}/sumw"], cached[f"{idx}/{name}/sumw2"]) for name in hist_names})
+                   for idx, key in enumerate(keys)}
+        edges = {name: cached[f"edges/{name}"] for name in hist_names if f"edges/{name}" in cached.files}
+
+    return samples, edges
+
+def _write_group_cache(cache_file, samples, edges):
+
+    arrays = {"__keys__": np.array(json.dumps([key for key, _ in samples.values()]))}
+    for idx, (_, sums) in enumerate(samples.values()):
+        for name, (sumw, sumw2) in sums.items():
+            arrays[f"{idx}/{name}/sumw"] = sumw
+            arrays[f"{idx}/{name}/sumw2"] = sumw2
+    for name, edge in edges.items():
+        arrays[f"edges/{name}"] = edge
+
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+
+    tmp_file = cache_file + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp_file, **arrays)
+    os.replace(tmp_file, cache_file)
+
+def merge_group(tagger, group, files, summary=None, lumi_scale=1.0, cache_dir="merge_cache"):
+
+    cache_file = os.path.join(cache_dir, f"{tagger}_{group}.npz")
+    cached, edges = _read_group_cache(cache_file)
+
+    samples, n_read = {}, 0
+    for path in sorted(os.path.abspath(f) for f in files):
+
+        key = _sample_key(path, sample_scale(sample_name(path)[1], summary, lumi_scale))
+
+        if path in cached and cached[path][0] == key:
+            samples[path] = cached[path]
+            continue
+
+        # new or changed sample, only this one is read
+        sums = {}
+        for name in hist_names:
+            hist = hist_cache.load_hist(path, name)
+            sums[name] = (hist.contents * key["scale"], hist.errors**2 * key["scale"]**2)
+            edges.setdefault(name, hist.edges)
+
+        samples[path] = (key, sums)
+        n_read += 1
+
+    n_removed = len(set(cached) - set(samples))
+    if n_read or n_removed:
+        _write_group_cache(cache_file, samples, edges)
+
+    total = {}
+    for name in hist_names:
+        sumw = np.sum([sums[name][0] for _, sums in samples.values()], axis=0)
+        sumw2 = np.sum([sums[name][1] for _, sums in samples.values()], axis=0)
+        total[name] = hist_cache.Hist(sumw, np.sqrt(sumw2), edges[name])
+
+    return tagger, group, total, len(samples), n_read, n_removed
+
+def submit_background(pool, files, summary=None, lumi_scale=1.0, cache_dir="merge_cache"):
+
+    # submits the groups to an existing pool (e.g. shared by several eras in histomaker.py), returns the futures
+    grouped = {}
+    for path in files:
+        tagger, name = sample_name(path)
+        group = sample_group(name)
+        if tagger is None or group is None:
+            print(f"Unknown tagger or group, skipping: {path}")
+            continue
+        grouped.setdefault((tagger, group), []).append(path)
+
+    return [pool.submit(merge_group, tagger, group, group_files, summary, lumi_scale, cache_dir)
+            for (tagger, group), group_files in sorted(grouped.items())]
+
+def collect_background(futures):
+
+    results = [future.result() for future in futures]
+
+    merged, sums = {}, {}
+    for tagger, group, total, n_samples, n_read, n_removed in results:
+        print(f"{tagger} {group}: {n_samples} samples ({n_read} read, {n_samples - n_read} from cache, {n_removed} removed)")
+
+        for name, hist in total.items():
+            merged.setdefault(tagger, {})[f"{name}_{group}"] = hist
+
+            sumw, sumw2, _ = sums.get((tagger, name), (0, 0, None))
+            sums[(tagger, name)] = (sumw + hist.contents, sumw2 + hist.errors**2, hist.edges)
+
+    for (tagger, name), (sumw, sumw2, edges) in sums.items():
+        merged[tagger][name] = hist_cache.Hist(sumw, np.sqrt(sumw2), edges)
+
+    return merged
+
+def merge_background(files, summary=None, lumi_scale=1.0, cache_dir="merge_cache", jobs=None):
+
+    # returns {tagger: {histogram name: Hist}} with the total and the histograms of each group
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = submit_background(pool, files, summary, lumi_scale, cache_dir)
+        return collect_background(futures)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="CombineHist.py background outputs (.root)")
+    parser.add_argument("-o", "--output", default="background/combine_background", help="output name, _<tagger>.root is added")
+    parser.add_argument("-summary", "--summary", default=None, help="MC_Summary_<year>.txt, scale each sample by XSec / SumofGENWeights")
+    parser.add_argument("-lumi", "--lumi", type=float, default=1.0, help="scale of all samples (with -summary: luminosity in pb^-1)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of groups merged in parallel")
+    parser.add_argument("-cache", "--cache", default="merge_cache", help="cache directory of the groups")
+
+    args = parser.parse_args()
+
+    input_files = sorted(set(sum([glob.glob(pattern) or [pattern] for pattern in args.input], [])))
+    summary = read_summary(args.summary) if args.summary else None
+
+    merged = merge_background(input_files, summary, args.lumi, args.cache, args.jobs)
+
+    for tagger, hists in merged.items():
+        output_file = f"{args.output}_{tagger}.root"
+        titles = {name: hist_titles.get(name, hist_titles.get(name.rsplit("_", 1)[0], "")) for name in hists}
+
+        hist_cache.write_file(output_file, hists, titles)
+        print(f"Output: {output_file}")
@@ -0,0 +1,261 @@
+#######################################################
+
+# Sample catalogue: every file name of the analysis is parsed once, by one set of rules, into a typed record
+#   Sample(kind, process, sample, MX, MY, era, tagger, category, version, path)
+# kind     = ntuple (Histogram_<sample>, CutOptimizer), wp (WP_<tagger>_..., CombineHist.py), merged (combine_background_<tagger>),
+#            significance, uncertainty (Stat_Unc_...), datacard, workspace, limit (higgsCombine...)
+# process  = NMSSM, Data, or the background group of merge_hists.py (TT, ST, Zto2Q, Wto2Q, Diboson, QCD)
+# category = template of the datacards / workspaces / limits, or "New" for the New combinations outputs
+# version  = v<n> of the directory or file (datacards_v3, workspace_v6, combine_input_XYH4b_v3)
+# era      = from the name (Data_Run3_2022_..., datacards) or from a <year> directory in the path
+# Fields which do not apply are None.
+# The Catalogue indexes the records by every field, so lookups and joins are dictionary operations
+# instead of glob-and-split scans, and it can be saved (.json) and reloaded without parsing again.
+
+# usage:
+# parse("signal/WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60_TuneCP5_13p6TeV_madgraph-pythia8.root")
+# catalogue = Catalogue(); catalogue.scan(["2023/signal/*.root", "workspace_v6/higgsCombine*.root"])
+# catalogue.find(kind="wp", tagger="PNetB", MX=300, MY=60)
+# catalogue.save("catalogue.json"); catalogue = Catalogue.load("catalogue.json")
+
+# command to run this scripts (prints the catalogue of the files):
+# python3 sample_catalogue.py -i 2023/signal/*.root 2023/background/*.root -o catalogue.json
+
+#######################################################
+
+import argparse
+import collections
+import functools
+import glob
+import json
+import os
+import re
+import pandas as pd
+
+
+taggers = ["PNetB", "RobustParTAK4B"]
+
+# sample name prefixes of each background group (histjobmaker.C)
+groups = {
+    "TT": ["TTto"],
+    "ST": ["TbarW", "TW", "TbarBQ", "TBbarQ"],
+    "Zto2Q": ["Zto2Q"],
+    "Wto2Q": ["Wto2Q"],
+    "Diboson": ["WW", "WZ", "ZZ"],
+    "QCD": ["QCD"],
+}
+
+fields = ["kind", "process", "sample", "MX", "MY", "era", "tagger", "category", "version", "path"]
+Sample = collections.namedtuple("Sample", fields)
+
+# kind prefixes of the outputs, in the order they are removed (New_ first)
+output_prefixes = [("New_significance_", "significance", "New"), ("significance_", "significance", None),
+                   ("New_Stat_Unc_", "uncertainty", "New"), ("Stat_Unc_", "uncertainty", None)]
+
+extensions = (".root", ".csv", ".txt", ".pdf", ".png", ".json", ".npz", ".npy")
+
+signal_pattern = re.compile(r"MX-(\d+)_MY-(\d+)")
+data_pattern = re.compile(r"^Data_Run3_(\d{4})_")
+limit_pattern = re.compile(r"^higgsCombine(\d+)_(\d+)_(\d+)\.")
+card_pattern = re.compile(r"XYH_4b_(\d+)_13p6TeV_(\d{4})_.*MX-(\d+)_MY-(\d+)")
+version_pattern = re.compile(r"_(v\d+)(?:$|[_.])")
+era_pattern = re.compile(r"^20\d\d$")
+
+
+def sample_group(name):
+
+    if not name:
+        return None
+    return next((group for group, prefixes in groups.items() if any(name.startswith(prefix) for prefix in prefixes)), None)
+
+def _strip_extension(name):
+
+    for extension in extensions:
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+def _path_fields(path):
+
+    # era and version from the directories of the path
+    era, version = None, None
+    for part in os.path.normpath(os.path.dirname(path)).split(os.sep):
+        if era_pattern.match(part):
+            era = part
+        match = version_pattern.search(part)
+        if match:
+            version = match.group(1)
+
+    return era, version
+
+@functools.lru_cache(maxsize=None)
+def parse(path, era=None):
+
+    # path -> Sample, each name is parsed once per process
+    name = os.path.basename(path)
+    path_era, version = _path_fields(path)
+    record = dict.fromkeys(fields)
+    record.update({"path": path, "era": era or path_era, "version": version})
+
+    match = limit_pattern.match(name)
+    if match:
+        category, mx, my = (int(value) for value in match.groups())
+        record.update({"kind": "limit", "process": "NMSSM", "MX": mx, "MY": my, "category": category})
+        return Sample(**record)
+
+    match = card_pattern.search(name)
+    if match:
+        category, card_era, mx, my = match.groups()
+        kind = "workspace" if name.startswith("workspace") else "datacard"
+        record.update({"kind": kind, "process": "NMSSM", "MX": int(mx), "MY": int(my), "category": int(category),
+                       "era": record["era"] or card_era})
+        return Sample(**record)
+
+    name = _strip_extension(name)
+    match = version_pattern.search(name)
+    if match:
+        record["version"] = match.group(1)
+
+    for prefix, kind, category in output_prefixes:
+        if name.startswith(prefix):
+            record.update({"kind": kind, "category": category})
+            name = name[len(prefix):]
+            break
+
+    for tagger in taggers:
+        if name.startswith(f"WP_{tagger}_"):
+            record.update({"kind": record["kind"] or "wp", "tagger": tagger})
+            name = name[len(f"WP_{tagger}_"):]
+        elif name == f"combine_background_{tagger}":
+            record.update({"kind": record["kind"] or "merged", "tagger": tagger, "process": "Background"})
+            return Sample(**record)
+
+    if name.startswith("Histogram_"):
+        record["kind"] = record["kind"] or "ntuple"
+        name = name[len("Histogram_"):]
+
+    record["sample"] = name
+
+    match = signal_pattern.search(name)
+    data = data_pattern.match(name)
+    if name.startswith("NMSSM") or (match and not data):
+        record.update({"process": "NMSSM", "MX": int(match.group(1)) if match else None, "MY": int(match.group(2)) if match else None})
+    elif data:
+        record.update({"process": "Data", "era": record["era"] or data.group(1)})
+    else:
+        record["process"] = sample_group(name)
+
+    return Sample(**record)
+
+def mass_name(sample):
+
+    # "MX-300_MY-60", as the Mass column of highest_significance.py
+    return f"MX-{sample.MX}_MY-{sample.MY}"
+
+
+class Catalogue:
+
+    # keys of the index: every field except the path
+    keys = [field for field in fields if field != "path"]
+
+    def __init__(self, samples=()):
+
+        self.samples = {}
+        self.index = {key: collections.defaultdict(set) for key in self.keys}
+        for sample in samples:
+            self._add(sample)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def _add(self, sample):
+
+        if sample.path in self.samples:
+            self._remove(sample.path)
+        self.samples[sample.path] = sample
+        for key in self.keys:
+            self.index[key][getattr(sample, key)].add(sample.path)
+
+    def _remove(self, path):
+
+        sample = self.samples.pop(path)
+        for key in self.keys:
+            self.index[key][getattr(sample, key)].discard(path)
+
+    def add(self, path, era=None):
+
+        sample = parse(path, era)
+        self._add(sample)
+        return sample
+
+    def scan(self, patterns, era=None):
+
+        # one glob per pattern, each file is parsed once
+        for pattern in patterns:
+            for path in glob.glob(pattern) or ([pattern] if os.path.exists(pattern) else []):
+                self.add(path, era)
+        return self
+
+    def find(self, **keys):
+
+        # samples with all the given field values, e.g. find(kind="wp", tagger="PNetB", MX=300, MY=60)
+        unknown = set(keys) - set(self.keys)
+        if unknown:
+            raise KeyError(f"unknown fields {sorted(unknown)}, fields: {self.keys}")
+
+        if not keys:
+            return list(self.samples.values())
+
+        paths = set.intersection(*[self.index[key].get(value, set()) for key, value in keys.items()])
+        return [self.samples[path] for path in sorted(paths)]
+
+    def get(self, **keys):
+
+        # the single sample with the given field values
+        found = self.find(**keys)
+        if len(found) != 1:
+            raise KeyError(f"{len(found)} samples for {keys}")
+        return found[0]
+
+    def frame(self):
+
+        return pd.DataFrame(list(self.samples.values()), columns=fields)
+
+    def save(self, output_file):
+
+        with open(output_file + ".tmp", "w") as output_json:
+            json.dump([sample._asdict() for sample in self.samples.values()], output_json, indent=1)
+        os.replace(output_file + ".tmp", output_file)
+
+    @classmethod
+    def load(cls, input_file):
+
+        with open(input_file) as input_json:
+            return cls(Sample(**sample) for sample in json.load(input_json))
+
+
+def annotate(df, column, era=None):
+
+    # adds the parsed fields of the file names in df[column] (each distinct name parsed once), for keyed joins
+    parsed = pd.DataFrame([parse(name, era) for name in df[column].unique()], columns=fields)
+    parsed[column] = df[column].unique()
+
+    return df.merge(parsed.drop(columns="path"), on=column, how="left", suffixes=("", "_parsed"))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="files or glob patterns")
+    parser.add_argument("-era", "--era", default=None, help="era of all files (default: from the names and directories)")
+    parser.add_argument("-o", "--output", default=None, help="save the catalogue (.json)")
+
+    args = parser.parse_args()
+
+    catalogue = Catalogue().scan(args.input, args.era)
+    print(catalogue.frame().drop(columns="path").to_string(index=False))
+
+    if args.output:
+        catalogue.save(args.output)
+        print(f"Output: {args.output}")
@@ -0,0 +1,202 @@
+#######################################################
+
+# This script is the batch version of Significance.py + highest_significance.py.
+# All signal histograms (any number of mass points and both taggers) are stacked into
+# an (n_signals x n_bins) array and the significances are computed in one vectorized pass
+# against the background of the same tagger:
+# sqrt(2 * ((S + B)*log(1 + (S/B)) - S)) and S/sqrt(B), with B = 0 replaced by 1e-9 as in Significance.py.
+# The selected bins of the "New" mode and the highest S/sqrt(B) bin of each signal are flagged.
+# The output is one table (.csv) for all mass points and taggers, and the plots are made from that table.
+
+# command to run this scripts:
+# python3 significance_batch.py -s signal/WP_*.root -b background/combine_background_PNetB.root background/combine_background_RobustParTAK4B.root -New [True/False]
+# (with a single -b file, it is used for every tagger)
+# optional: -o [output name] -perSignal (also the significance plot of each signal, as Significance.py)
+
+#######################################################
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import mplhep as hep
+import hist_cache
+import sample_catalogue
+import wp_index
+
+
+taggers = ["PNetB", "RobustParTAK4B"]
+b_zero = 1e-9
+
+
+def parse_signal(filename):
+
+    # (tagger, MX, MY) from sample_catalogue.py, -1 for the files without mass point
+    sample = sample_catalogue.parse(filename)
+    name = os.path.splitext(os.path.basename(filename))[0]
+
+    tagger = sample.tagger or next((t for t in taggers if f"_{t}_" in f"_{name}_"), None)
+
+    return tagger, sample.MX if sample.MX is not None else -1, sample.MY if sample.MY is not None else -1
+
+def significance(s, b):
+
+    # s: (n_signals, n_bins), b: (n_bins,), returns (long, short, b_is_zero)
+    b_is_zero = b == 0
+    b = np.where(b_is_zero, b_zero, b)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        long_ = np.sqrt(2 * ((s + b) * np.log(1 + (s / b)) - s))
+        short = s / np.sqrt(b)
+
+    return long_, short, np.broadcast_to(b_is_zero, s.shape)
+
+def significance_table(signal_files, background_files, isNew="False", background_hists=None):
+
+    # background_hists: {tagger: {histogram name: Hist}} (e.g. from merge_hists.merge_background) instead of files
+    background_files = background_files or []
+    branch_name = "hist_wp_combinations_new" if isNew == "True" else "hist_wp_combinations"
+
+    index = wp_index.get_index(njets=4, nwp=6, rejected_wp=(0.0,))
+    combination = [str(l) for l in index.label_list()]
+
+    # combination selection for optimization, only use for New
+    selected = np.zeros(index.nbins, dtype=bool)
+    if isNew == "True":
+        selected[index.selected_bins() - 1] = True
+    else:
+        selected[:] = True
+
+    backgrounds = {}
+    for background_file in background_files:
+        tagger = parse_signal(background_file)[0]
+        backgrounds[tagger] = background_file
+
+    signals = {}
+    for signal_file in signal_files:
+        tagger, mx, my = parse_signal(signal_file)
+        signals.setdefault(tagger, []).append((signal_file, mx, my))
+
+    tables = []
+    for tagger, signal_list in signals.items():
+
+        if background_hists is not None and tagger in background_hists:
+            hist_bg = background_hists[tagger][branch_name]
+        else:
+            background_file = backgrounds.get(tagger, background_files[0] if len(background_files) == 1 else None)
+            if background_file is None:
+                print(f"No background for tagger {tagger}, skipping {len(signal_list)} signals")
+                continue
+            hist_bg = hist_cache.load_hist(background_file, branch_name)
+
+        b, centers = hist_bg.contents, hist_bg.centers
+        s = np.stack([hist_cache.load_hist(signal_file, branch_name).contents for signal_file, _, _ in signal_list])
+
+        long_, short, b_is_zero = significance(s, b)
+
+        # highest S/sqrt(B) of each signal among the selected bins
+        short_selected = np.where(selected, short, -np.inf)
+        short_selected = np.where(np.isnan(short_selected), -np.inf, short_selected)
+        is_max = np.zeros(s.shape, dtype=bool)
+        is_max[np.arange(len(s)), np.argmax(short_selected, axis=1)] = True
+
+        n_signals, n_bins = s.shape
+        tables.append(pd.DataFrame({
+            "Tagger": tagger or "",
+            "MX": np.repeat([mx for _, mx, _ in signal_list], n_bins),
+            "MY": np.repeat([my for _, _, my in signal_list], n_bins),
+            "Signal": np.repeat([os.path.basename(f) for f, _, _ in signal_list], n_bins),
+            "Bin_Center": np.tile(centers, n_signals),
+            "Combination": np.tile(combination, n_signals),
+            "S": s.ravel(),
+            "B": np.tile(b, n_signals),
+            "B_Zero": b_is_zero.ravel(),
+            "Long_Significance": long_.ravel(),
+            "Short_Significance": short.ravel(),
+            "Selected": np.tile(selected, n_signals),
+            "Highest": is_max.ravel(),
+        }))
+
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+def plot_highest(table, output_name):
+
+    for tagger, df in table[table["Highest"]].groupby("Tagger"):
+
+        df = df[np.isfinite(df["Short_Significance"])].sort_values(["MX", "MY"])
+
+        hep.style.use("CMS")
+        hep.cms.text("", loc=0)
+        plt.scatter(df["Bin_Center"], df["Long_Significance"], label="sqrt(2 * ((S + B)*log(1 + (S/B)) - S))")
+        plt.scatter(df["Bin_Center"], df["Short_Significance"], label="S/sqrt(B)")
+        plt.xticks(df["Bin_Center"], df["Combination"], fontsize=11, rotation=90)
+        plt.xlabel("bins")
+        plt.ylabel("Highest Significance")
+        plt.legend()
+        plt.savefig(f"{output_name}_{tagger}.pdf")
+        plt.clf()
+
+def plot_signal(df, output_name, isNew="False"):
+
+    # same plot as Significance.py for one signal
+    df = df[df["Selected"]]
+
+    if isNew != "True":
+        df = df[df["Bin_Center"] >= 1]
+
+    b_positive = ~df["B_Zero"]
+
+    hep.style.use("CMS")
+    hep.cms.text("", loc=0)
+
+    plt.scatter(df["Bin_Center"][b_positive], df["Long_Significance"][b_positive], label="sqrt(2 * ((S + B)*log(1 + (S/B)) - S))")
+    plt.scatter(df["Bin_Center"][b_positive], df["Short_Significance"][b_positive], label="S/sqrt(B)")
+    plt.scatter(df["Bin_Center"][~b_positive], df["Long_Significance"][~b_positive], label="sqrt(2 * ((S + B)*log(1 + (S/B)) - S)), B = 0")
+    plt.scatter(df["Bin_Center"][~b_positive], df["Short_Significance"][~b_positive], label="S/sqrt(B), B = 0")
+
+    if isNew == "True":
+        plt.xticks(df["Bin_Center"], df["Combination"], fontsize=12, rotation=90)
+    else:
+        # due to too many bins, so we show only even bins in x tick labels
+        plt.xticks(df["Bin_Center"][::2], df["Combination"][::2], fontsize=12, rotation=90)
+    plt.tick_params(axis='x', which='minor', bottom=False, top=False)
+
+    plt.xlabel("bins")
+    plt.ylabel("Signal Significance")
+    plt.savefig(output_name + ".pdf")
+    plt.clf()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-s", "--signal", nargs="+", required=True, help="signal files")
+    parser.add_argument("-b", "--background", nargs="+", required=True, help="background file(s), one per tagger")
+    parser.add_argument("-New", "--New", required=True, help="Is new combinations definition?")
+    parser.add_argument("-o", "--output", default=None, help="output name (default: [New_]significance_table)")
+    parser.add_argument("-perSignal", "--perSignal", action="store_true", help="also plot the significance of each signal")
+
+    args = parser.parse_args()
+
+    output_name = args.output or ("New_significance_table" if args.New == "True" else "significance_table")
+
+    table = significance_table(args.signal, args.background, isNew=args.New)
+    table.to_csv(f"{output_name}.csv", index=False)
+
+    highest = table[table["Highest"]]
+    highest.to_csv(f"{output_name}_highest.csv", index=False)
+
+    n_inf = int(np.sum(~np.isfinite(highest["Short_Significance"])))
+    if n_inf:
+        print(f"Max significance is infinity for {n_inf} signals, they are not plotted")
+
+    plot_highest(table, f"{output_name}_highest")
+
+    if args.perSignal:
+        prefix = "New_significance_" if args.New == "True" else "significance_"
+        for signal, df in table.groupby("Signal", sort=False):
+            plot_signal(df, prefix + os.path.splitext(signal)[0], isNew=args.New)
+
+    print(f"Signals: {table['Signal'].nunique() if len(table) else 0}, output: {output_name}.csv")
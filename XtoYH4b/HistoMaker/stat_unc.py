@@ -0,0 +1,121 @@
+#######################################################
+
+# This script computes and plots the statistical uncertainty of b-tagging working point (WP) combinations 
+# from a ROOT histogram. It supports both original and newly defined WP combinations. 
+# It reads histograms from ROOT files, calculates bin uncertainties, 
+# and generates a scatter plot with bin labels. 
+# It also saves the results in both .pdf and .csv formats. 
+
+# One implementation for all eras (era settings in eras.py), run through 2022/Stat_Unc.py or 2023/Stat_Unc.py:
+# command to run this scripts (in the year directory):
+# python3 Stat_Unc.py -i [input.root] -New [True/False]
+# for many files at once (one table, also with the effective entries), see stat_unc_batch.py
+
+# Created by Punnawich Chokeprasert, punnawich.chokeprasert@cern.ch
+# 27 Mar 2025
+
+#######################################################
+
+
+import argparse
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+import mplhep as hep
+import csv
+import eras
+import hist_cache
+import wp_index
+
+
+def Uncertainty_Hist(input_hist, isNew="False"):
+
+    if isNew == "True":
+        branch_name = "hist_wp_combinations_new"
+    else:
+        branch_name = "hist_wp_combinations"
+
+    print(f"Branch: {branch_name}")
+
+    hist = hist_cache.load_hist(f"{input_hist}.root", branch_name)
+
+    hist_center = hist.centers.tolist()
+    hist_content = hist.contents.tolist()
+    hist_err = hist.rel_errors().tolist()
+
+    index = wp_index.get_index(njets=4, nwp=6, rejected_wp=(0.0,))
+    label = index.label_list()
+
+    selected_bins = index.selected_bins()
+
+    hep.style.use("CMS")
+    hep.cms.text("", loc=0)
+
+    if isNew == "True":
+
+        hist_center = np.array(hist_center)
+        hist_err = np.array(hist_err)
+
+        hist_center_selected = hist_center[np.isin(hist_center, selected_bins)]
+        hist_err_selected = hist_err[np.isin(hist_center, selected_bins)]
+
+        plt.scatter(hist_center_selected, hist_err_selected)
+        plt.xlabel("bins")
+        plt.ylabel("Statistical Uncertainty")
+        plt.xticks(hist_center[np.isin(hist_center, selected_bins)], np.array(label)[selected_bins - 1], fontsize=12, rotation=90)
+        plt.tick_params(axis='x', which='minor', bottom=False, top=False)
+
+        directory, name = os.path.split(input_hist)
+        output_name = os.path.join(directory, f"New_Stat_Unc_{name}")
+
+        plt.savefig(output_name + ".pdf")
+        plt.clf()
+
+        with open(output_name + ".csv", "w", newline="") as output_csv:
+            writer = csv.writer(output_csv)
+            writer.writerow(["Bin_Center", "Uncertainty"])
+            for idx, value in enumerate(hist_err_selected):
+                writer.writerow([hist_center_selected[idx], value])
+
+    else:
+
+        plt.scatter(hist_center, hist_err)
+        plt.xlabel("bins")
+        plt.ylabel("Statistical Uncertainty")
+        plt.xticks(hist_center[::2], label[::2], fontsize=12, rotation=90)
+        plt.tick_params(axis='x', which='minor', bottom=False, top=False)
+
+        directory, name = os.path.split(input_hist)
+        output_name = os.path.join(directory, f"Stat_Unc_{name}")
+    
+        plt.savefig(output_name + ".pdf")
+        plt.clf()
+
+        with open(output_name + ".csv", "w", newline="") as output_csv:
+            writer = csv.writer(output_csv)
+            writer.writerow(["Bin_Center", "Uncertainty"])
+            for idx, value in enumerate(hist_err):
+                writer.writerow([hist_center[idx], value])
+
+    print(f"Output: {output_name}")
+
+def main(era_name, argv=None):
+
+    # no era setting is used by this stage, only checks that the era is registered
+    eras.get_era(era_name)
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="Input ROOT files")
+    parser.add_argument("-New", "--New", required=True, help="New combinations definition")
+
+    args = parser.parse_args(argv)
+
+    for input_file in args.input:
+        directory, filename = os.path.split(input_file)
+        name = os.path.splitext(filename)[0]
+        input_path = os.path.join(directory, name)
+
+        Uncertainty_Hist(input_path, isNew=args.New)
+
+
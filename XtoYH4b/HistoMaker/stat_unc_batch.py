@@ -0,0 +1,124 @@
+#######################################################
+
+# This script is the batch version of Stat_Unc.py: the sumw and sumw2 of the WP-combination histogram of
+# many files (signals and backgrounds, both taggers) are loaded once (hist_cache) and stacked into
+# (n_files x n_bins) arrays, and the uncertainties of all files and bins are computed in one pass:
+# Abs_Uncertainty = sqrt(sumw2), Uncertainty = sqrt(sumw2) / sumw (as Stat_Unc.py, 0 for empty bins),
+# Eff_Entries = sumw^2 / sumw2 (effective number of MC events).
+# The output is one table (.csv) with one row per file and bin.
+# With -sig (table of significance_batch.py), the significance is joined by (Tagger, Bin) with the uncertainty
+# of the background of the same tagger, instead of the positional pd.concat of highest_significance.py,
+# and the highest-significance rows are written with their uncertainty.
+
+# command to run this scripts:
+# python3 stat_unc_batch.py -i background/combine_background_*.root signal/WP_*.root -New [True/False]
+# python3 stat_unc_batch.py -i background/combine_background_*.root -sig significance_table.csv -New [True/False]
+# optional: -o [output name]
+
+#######################################################
+
+import argparse
+import glob
+import os
+import numpy as np
+import pandas as pd
+import hist_cache
+import wp_index
+from significance_batch import parse_signal
+
+
+unc_columns = ["Sumw", "Sumw2", "Abs_Uncertainty", "Uncertainty", "Eff_Entries"]
+
+
+def uncertainties(sumw, sumw2):
+
+    # arrays of any shape, 0 for empty bins
+    abs_unc = np.sqrt(sumw2)
+    rel_unc = np.divide(abs_unc, sumw, out=np.zeros_like(abs_unc), where=sumw != 0)
+    eff_entries = np.divide(sumw**2, sumw2, out=np.zeros_like(abs_unc), where=sumw2 != 0)
+
+    return abs_unc, rel_unc, eff_entries
+
+def uncertainty_table(input_files, isNew="False"):
+
+    branch_name = "hist_wp_combinations_new" if isNew == "True" else "hist_wp_combinations"
+
+    index = wp_index.get_index(njets=4, nwp=6, rejected_wp=(0.0,))
+    combination = [str(l) for l in index.label_list()]
+
+    hists = [hist_cache.load_hist(input_file, branch_name) for input_file in input_files]
+    sumw = np.stack([hist.contents for hist in hists])
+    sumw2 = np.stack([hist.errors**2 for hist in hists])
+    abs_unc, rel_unc, eff_entries = uncertainties(sumw, sumw2)
+
+    n_files, n_bins = sumw.shape
+
+    # selected combinations of the New optimization, bins start at 1
+    selected = np.ones(n_bins, dtype=bool)
+    if isNew == "True":
+        selected[:] = False
+        selected[index.selected_bins() - 1] = True
+
+    info = [parse_signal(input_file) for input_file in input_files]
+
+    return pd.DataFrame({
+        "File": np.repeat([os.path.basename(f) for f in input_files], n_bins),
+        "Tagger": np.repeat([tagger or "" for tagger, _, _ in info], n_bins),
+        "MX": np.repeat([mx for _, mx, _ in info], n_bins),
+        "MY": np.repeat([my for _, _, my in info], n_bins),
+        "Bin": np.tile(np.arange(1, n_bins + 1), n_files),
+        "Bin_Center": np.tile(hists[0].centers, n_files),
+        "Combination": np.tile(combination[:n_bins], n_files),
+        "Sumw": sumw.ravel(),
+        "Sumw2": sumw2.ravel(),
+        "Abs_Uncertainty": abs_unc.ravel(),
+        "Uncertainty": rel_unc.ravel(),
+        "Eff_Entries": eff_entries.ravel(),
+        "Selected": np.tile(selected, n_files),
+    })
+
+def join_significance(significance, uncertainty, background_files):
+
+    # significance_batch.py table + uncertainty of the background of the same tagger, joined by (Tagger, bin)
+    background = uncertainty[uncertainty["File"].isin([os.path.basename(f) for f in background_files])]
+    if len(background) and background.groupby("Tagger")["File"].nunique().max() > 1:
+        raise ValueError("more than one background file for the same tagger")
+
+    # a single background without tagger in its name is used for every tagger
+    if len(background) and (background["Tagger"] == "").all():
+        background = pd.concat([background.assign(Tagger=tagger) for tagger in significance["Tagger"].unique()], ignore_index=True)
+
+    background = background[["Tagger", "Bin_Center"] + unc_columns].rename(columns={name: f"B_{name}" for name in unc_columns})
+
+    return significance.merge(background, on=["Tagger", "Bin_Center"], how="left", validate="many_to_one")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="")
+
+    parser.add_argument("-i", "--input", nargs="+", required=True, help="input ROOT files (backgrounds and/or signals)")
+    parser.add_argument("-New", "--New", required=True, help="New combinations definition")
+    parser.add_argument("-sig", "--significance", default=None, help="significance table of significance_batch.py (.csv)")
+    parser.add_argument("-o", "--output", default=None, help="output name (default: [New_]Stat_Unc_table)")
+
+    args = parser.parse_args()
+
+    output_name = args.output or ("New_Stat_Unc_table" if args.New == "True" else "Stat_Unc_table")
+    input_files = sorted(set(sum([glob.glob(pattern) or [pattern] for pattern in args.input], [])))
+
+    table = uncertainty_table(input_files, isNew=args.New)
+    table.to_csv(f"{output_name}.csv", index=False)
+    print(f"Files: {len(input_files)}, output: {output_name}.csv")
+
+    if args.significance:
+        significance = pd.read_csv(args.significance, keep_default_na=False, na_values=[""])
+        significance["Tagger"] = significance["Tagger"].astype(str)
+
+        # the background files are the inputs which are not signals (no MX in the name)
+        background_files = [f for f in input_files if parse_signal(f)[1] < 0]
+        joined = join_significance(significance, table, background_files)
+
+        joined.to_csv(f"{output_name}_significance.csv", index=False)
+        joined[joined["Highest"]].to_csv(f"{output_name}_highest.csv", index=False)
+        print(f"Output: {output_name}_significance.csv, {output_name}_highest.csv")
@@ -0,0 +1,91 @@
+# checks the category search of category_optimizer.py against a brute force over the category boundaries
+# python3 -m pytest XtoYH4b/HistoMaker/tests
+
+import os
+import sys
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("mplhep")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import category_optimizer
+
+
+def asimov(s, b):
+
+    return np.sqrt(2 * ((s + b) * np.log(1 + s / b) - s))
+
+def segments(n, max_categories, first=0):
+
+    # all lists of up to max_categories non-overlapping ranges [i, j) of range(first, n), bins can be left out
+    yield []
+    if max_categories == 0:
+        return
+    for i in range(first, n):
+        for j in range(i + 1, n + 1):
+            for rest in segments(n, max_categories - 1, j):
+                yield [(i, j)] + rest
+
+def brute_force(s, b, max_categories, min_background):
+
+    order = np.argsort(-s / b, kind="stable")
+    s, b = s[order], b[order]
+
+    best = 0.0
+    for categories in segments(len(s), max_categories):
+        if all(b[i:j].sum() >= min_background for i, j in categories):
+            best = max(best, np.sqrt(sum(asimov(s[i:j].sum(), b[i:j].sum())**2 for i, j in categories)))
+
+    return best
+
+def total_z(categories):
+
+    return np.sqrt(sum(z**2 for _, _, _, z in categories))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_categories", [1, 2, 3])
+def test_exact_matches_brute_force(seed, max_categories):
+
+    rng = np.random.default_rng(seed)
+    s = rng.exponential(1.0, size=7)
+    b = rng.exponential(5.0, size=7)
+    bins = np.arange(1, 8)
+
+    categories = category_optimizer.optimize(s, b, bins, max_categories, min_background=2.0, method="exact")
+
+    assert len(categories) <= max_categories
+    assert total_z(categories) == pytest.approx(brute_force(s, b, max_categories, 2.0), rel=1e-9)
+
+    # mutually exclusive categories with at least min_background each, S and B of their bins
+    used = np.concatenate([category_bins for category_bins, _, _, _ in categories]) if categories else np.array([])
+    assert len(used) == len(set(used.tolist()))
+    for category_bins, s_cat, b_cat, z in categories:
+        assert b_cat >= 2.0
+        assert s_cat == pytest.approx(s[category_bins - 1].sum())
+        assert b_cat == pytest.approx(b[category_bins - 1].sum())
+        assert z == pytest.approx(asimov(s_cat, b_cat))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_is_not_better_than_exact(seed):
+
+    rng = np.random.default_rng(seed)
+    s = rng.exponential(1.0, size=12)
+    b = rng.exponential(5.0, size=12)
+    bins = np.arange(1, 13)
+
+    exact = category_optimizer.optimize(s, b, bins, 3, 1.0, "exact")
+    greedy = category_optimizer.optimize(s, b, bins, 3, 1.0, "greedy")
+
+    assert 0 < total_z(greedy) <= total_z(exact) + 1e-9
+
+def test_no_category_below_min_background():
+
+    s = np.array([1.0, 2.0])
+    b = np.array([0.1, 0.2])
+
+    assert category_optimizer.optimize(s, b, np.array([1, 2]), 3, min_background=1.0, method="exact") == []
+    assert category_optimizer.optimize(s, b, np.array([1, 2]), 3, min_background=1.0, method="greedy") == []
@@ -0,0 +1,63 @@
+# checks when the outputs of CombineHist.py are up to date (remade after a change of the input, -backend or -sidecar)
+# python3 -m pytest XtoYH4b/HistoMaker/tests
+
+import os
+import sys
+import pytest
+
+pytest.importorskip("ROOT")
+pytest.importorskip("matplotlib")
+pytest.importorskip("mplhep")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import combine_hist
+import event_sidecar
+import wp_index
+
+
+def make_outputs(tmp_path, backend="columnar", sidecar="npz"):
+
+    input_file = str(tmp_path / "Histogram_TTto4Q.root")
+    output_file = str(tmp_path / "background" / "WP_PNetB_Histogram_TTto4Q")
+    os.makedirs(os.path.dirname(output_file))
+
+    with open(input_file, "w") as f:
+        f.write("")
+    os.utime(input_file, ns=(10**18, 10**18))
+
+    with open(f"{output_file}.root", "w") as f:
+        f.write("")
+    event_sidecar.write_events(output_file, wp_index.get_index(), {}, [1, 2], [0.5, 0.5],
+                               {"input": input_file, "method": "PNetB", "backend": backend}, format=sidecar)
+
+    return input_file, output_file
+
+
+def test_up_to_date(tmp_path):
+
+    input_file, output_file = make_outputs(tmp_path)
+
+    assert combine_hist.Is_Up_To_Date(input_file, output_file)
+    assert not combine_hist.Is_Up_To_Date(input_file, output_file, backend="root")
+    assert not combine_hist.Is_Up_To_Date(input_file, output_file, sidecar="npy")
+
+def test_changed_input_or_missing_output(tmp_path):
+
+    input_file, output_file = make_outputs(tmp_path)
+
+    os.utime(input_file, ns=(2 * 10**18, 2 * 10**18))
+    assert not combine_hist.Is_Up_To_Date(input_file, output_file)
+
+    input_file, output_file = make_outputs(tmp_path / "other")
+    os.remove(f"{output_file}.root")
+    assert not combine_hist.Is_Up_To_Date(input_file, output_file)
+
+def test_output_files():
+
+    prefixes = {"PNetB": "WP_PNetB_", "RobustParTAK4B": "WP_RobustParTAK4B_"}
+
+    assert combine_hist.Output_Files("/input/Histogram_TTto4Q.root", False, prefixes) == \
+        {"PNetB": "background/WP_PNetB_Histogram_TTto4Q", "RobustParTAK4B": "background/WP_RobustParTAK4B_Histogram_TTto4Q"}
+    assert combine_hist.Output_Files("/input/Histogram_NMSSM.root", True, {"PNetB": "WP_PNetB_"}, "2023") == \
+        {"PNetB": "2023/signal/WP_PNetB_Histogram_NMSSM"}
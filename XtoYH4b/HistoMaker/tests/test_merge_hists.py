@@ -0,0 +1,46 @@
+# checks the MC_Summary weights of merge_hists.py -summary (XSec / SumofGENWeights, as CutOptimizer.C)
+# python3 -m pytest XtoYH4b/HistoMaker/tests
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import merge_hists
+
+
+summary_line = "TTto4Q_TuneCP5_13p6TeV_powheg-pythia8 \t 64428000 \t 1.86934e+10 \t 2.07843e+10 \t 419.69\n"
+
+
+def test_weight_from_summary_line(tmp_path):
+
+    path = tmp_path / "MC_Summary_2023.txt"
+    path.write_text("# MC summary\n" + summary_line)
+
+    summary = merge_hists.read_summary(str(path))
+    sample = summary["TTto4Q_TuneCP5_13p6TeV_powheg-pythia8"]
+
+    assert sample["Entries"] == 64428000
+    assert sample["XsecWeight"] == pytest.approx(419.69 / 2.07843e+10)
+
+    # -lumi is the luminosity (pb^-1) with -summary
+    assert merge_hists.sample_scale("TTto4Q_TuneCP5_13p6TeV_powheg-pythia8", summary, 17794.0) == pytest.approx(419.69 * 17794.0 / 2.07843e+10)
+    with pytest.raises(KeyError):
+        merge_hists.sample_scale("QCD-4Jets_HT-1000to1200", summary, 1.0)
+
+def test_header_sets_the_columns(tmp_path):
+
+    path = tmp_path / "MC_Summary_2023.txt"
+    path.write_text("Sample XSec SumofGENWeights\nZto2Q-4Jets_HT-200to400 1012.0 5.06e+06\n")
+
+    sample = merge_hists.read_summary(str(path))["Zto2Q-4Jets_HT-200to400"]
+    assert sample["XsecWeight"] == pytest.approx(1012.0 / 5.06e+06)
+
+def test_missing_columns_fail(tmp_path):
+
+    path = tmp_path / "MC_Summary_2023.txt"
+    path.write_text("Zto2Q-4Jets_HT-200to400 1000 2000\n")
+
+    with pytest.raises(ValueError, match="XSec"):
+        merge_hists.read_summary(str(path))
@@ -0,0 +1,98 @@
+# checks the file name rules of sample_catalogue.py and the lookups of the Catalogue
+# python3 -m pytest XtoYH4b/HistoMaker/tests
+
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import sample_catalogue
+from sample_catalogue import Catalogue, parse
+
+
+def fields(path, era=None):
+
+    sample = parse(path, era)
+    return {key: value for key, value in sample._asdict().items() if value is not None and key != "path"}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("2023/signal/WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60_TuneCP5_13p6TeV_madgraph-pythia8.root",
+     {"kind": "wp", "process": "NMSSM", "sample": "NMSSM_XtoYHto4B_MX-300_MY-60_TuneCP5_13p6TeV_madgraph-pythia8",
+      "MX": 300, "MY": 60, "era": "2023", "tagger": "PNetB"}),
+    ("background/WP_RobustParTAK4B_Histogram_TTto4Q_TuneCP5_13p6TeV_powheg-pythia8.json",
+     {"kind": "wp", "process": "TT", "sample": "TTto4Q_TuneCP5_13p6TeV_powheg-pythia8", "tagger": "RobustParTAK4B"}),
+    ("Histogram_QCD-4Jets_HT-1000to1200_TuneCP5_13p6TeV_madgraphMLM-pythia8.root",
+     {"kind": "ntuple", "process": "QCD", "sample": "QCD-4Jets_HT-1000to1200_TuneCP5_13p6TeV_madgraphMLM-pythia8"}),
+    ("Histogram_Data_Run3_2022_C_JetMET.root",
+     {"kind": "ntuple", "process": "Data", "sample": "Data_Run3_2022_C_JetMET", "era": "2022"}),
+    ("Histogram_TbarWplusto4Q_TuneCP5_13p6TeV_powheg-pythia8.root",
+     {"kind": "ntuple", "process": "ST", "sample": "TbarWplusto4Q_TuneCP5_13p6TeV_powheg-pythia8"}),
+    ("background/combine_background_PNetB.root",
+     {"kind": "merged", "process": "Background", "tagger": "PNetB"}),
+    ("New_significance_WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-500_MY-90.csv",
+     {"kind": "significance", "category": "New", "process": "NMSSM", "sample": "NMSSM_XtoYHto4B_MX-500_MY-90",
+      "MX": 500, "MY": 90, "tagger": "PNetB"}),
+    ("Stat_Unc_WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-500_MY-90.png",
+     {"kind": "uncertainty", "process": "NMSSM", "sample": "NMSSM_XtoYHto4B_MX-500_MY-90", "MX": 500, "MY": 90, "tagger": "PNetB"}),
+    ("datacards_v3/XYH_4b_2_13p6TeV_2023_NMSSM_XtoYHto4B_MX-300_MY-60.txt",
+     {"kind": "datacard", "process": "NMSSM", "MX": 300, "MY": 60, "category": 2, "era": "2023", "version": "v3"}),
+    ("workspace_v6/workspace_XYH_4b_5_13p6TeV_2022_NMSSM_XtoYHto4B_MX-1000_MY-125.root",
+     {"kind": "workspace", "process": "NMSSM", "MX": 1000, "MY": 125, "category": 5, "era": "2022", "version": "v6"}),
+    ("workspace_v6/higgsCombine5_1000_125.AsymptoticLimits.mH120.root",
+     {"kind": "limit", "process": "NMSSM", "MX": 1000, "MY": 125, "category": 5, "version": "v6"}),
+])
+def test_parse(path, expected):
+
+    assert fields(path) == expected
+
+def test_era_argument_and_directories():
+
+    # the era of the argument wins over the directory, the name of data files gives its own era
+    assert parse("2023/background/Histogram_Zto2Q-4Jets_HT-200to400.root").era == "2023"
+    assert parse("2023/background/Histogram_Zto2Q-4Jets_HT-200to400.root", "2022").era == "2022"
+    assert parse("Histogram_Data_Run3_2023_D_JetMET.root").era == "2023"
+
+    assert sample_catalogue.mass_name(parse("Histogram_NMSSM_XtoYHto4B_MX-300_MY-60.root")) == "MX-300_MY-60"
+    assert sample_catalogue.sample_group("WZto4Q") == "Diboson" and sample_catalogue.sample_group("Unknown") is None
+
+def test_catalogue_find_and_save(tmp_path):
+
+    paths = ["2023/signal/WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60.root",
+             "2023/signal/WP_RobustParTAK4B_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60.root",
+             "2023/signal/WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-500_MY-60.root",
+             "2023/background/WP_PNetB_Histogram_TTto4Q_TuneCP5.root"]
+    catalogue = Catalogue(parse(path) for path in paths)
+
+    assert len(catalogue) == 4
+    assert [sample.path for sample in catalogue.find(kind="wp", tagger="PNetB", MY=60, process="NMSSM")] == [paths[0], paths[2]]
+    assert catalogue.get(tagger="RobustParTAK4B").MX == 300
+    assert catalogue.find(process="QCD") == []
+    with pytest.raises(KeyError):
+        catalogue.get(MY=60)
+    with pytest.raises(KeyError):
+        catalogue.find(mass=300)
+
+    # a file added again replaces its old record in the index
+    catalogue.add(paths[3], era="2022")
+    assert len(catalogue) == 4 and catalogue.get(process="TT").era == "2022" and catalogue.find(process="TT", era="2023") == []
+
+    catalogue.save(str(tmp_path / "catalogue.json"))
+    loaded = Catalogue.load(str(tmp_path / "catalogue.json"))
+    assert sorted(loaded.samples.values()) == sorted(catalogue.samples.values())
+
+def test_scan_and_annotate(tmp_path):
+
+    (tmp_path / "2023").mkdir()
+    for name in ["WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60.root", "WP_PNetB_Histogram_WWto4Q.root"]:
+        (tmp_path / "2023" / name).write_text("")
+
+    catalogue = Catalogue().scan([str(tmp_path / "2023" / "*.root")])
+    assert sorted(catalogue.frame()["process"]) == ["Diboson", "NMSSM"]
+    assert set(catalogue.frame()["era"]) == {"2023"}
+
+    df = pd.DataFrame({"File": ["WP_PNetB_Histogram_NMSSM_XtoYHto4B_MX-300_MY-60.root"] * 2, "Z": [1.0, 2.0]})
+    annotated = sample_catalogue.annotate(df, "File")
+    assert annotated[["MX", "MY", "tagger"]].values.tolist() == [[300, 60, "PNetB"]] * 2
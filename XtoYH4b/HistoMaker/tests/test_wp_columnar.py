@@ -0,0 +1,83 @@
+# checks that the columnar backend (wp_columnar.py) gives the same histograms as the per-event loop of the ROOT backend
+# python3 -m pytest XtoYH4b/HistoMaker/tests
+
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import wp_columnar
+import wp_index
+
+
+def make_events(n_events, njets, seed):
+
+    # pass flags are nested (pass XXT -> pass XT -> ... -> pass L), the WP of a jet is the number of passed WPs
+    rng = np.random.default_rng(seed)
+    event_wp = np.sort(rng.integers(0, 6, size=(n_events, njets)), axis=1)[:, ::-1].astype(np.float64)
+    event_pass = np.stack([event_wp.T >= wp for wp in range(1, 6)])
+    event_weights = rng.normal(1.0, 0.3, size=n_events) * 1e-3
+
+    return event_wp, event_weights, event_pass
+
+def loop_inputs(event_wp, event_weights, event_pass):
+
+    # same nested lists as read event by event from JetTree
+    return (event_wp.tolist(), [[weight] * event_wp.shape[1] for weight in event_weights],
+            [event_pass[:, :, idx].astype(int).tolist() for idx in range(len(event_wp))])
+
+
+@pytest.mark.parametrize("njets", [2, 4])
+def test_columnar_matches_loop(njets):
+
+    event_wp, event_weights, event_pass = make_events(400, njets, seed=njets)
+
+    result = wp_columnar.WP_Combinations(event_wp, event_weights, event_pass, njets)
+    reference = wp_columnar.Loop_Combinations(*loop_inputs(event_wp, event_weights, event_pass), njets)
+
+    assert wp_columnar.compare_results(reference, result)
+
+    label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = result
+    for condition, sumw2 in zip(label, new_sumw2):
+        mask = np.all(event_wp >= np.asarray(condition), axis=1)
+        count, mean_weight, sum_weight = new_hist[tuple(condition)]
+        assert count == np.count_nonzero(mask)
+        assert sum_weight == pytest.approx(event_weights[mask].sum(), rel=1e-12)
+        assert sumw2 == pytest.approx(np.sum(event_weights[mask]**2), rel=1e-12)
+
+def test_compare_results_finds_differences():
+
+    event_wp, event_weights, event_pass = make_events(100, 4, seed=1)
+    result = wp_columnar.WP_Combinations(event_wp, event_weights, event_pass)
+
+    label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = result
+    changed = dict(new_hist)
+    key = next(iter(changed))
+    changed[key] = [changed[key][0], changed[key][1], changed[key][2] + 1e-6]
+
+    assert wp_columnar.compare_results(result, result)
+    assert not wp_columnar.compare_results(result, (label, changed, new_sumw2, event_wp_labeled, event_weights_labeled))
+    assert not wp_columnar.compare_results(result, (label, new_hist, new_sumw2, event_wp_labeled[1:], event_weights_labeled[1:]))
+
+def test_hist_arrays_match_event_filling():
+
+    event_wp, event_weights, event_pass = make_events(300, 4, seed=7)
+    result = wp_columnar.WP_Combinations(event_wp, event_weights, event_pass)
+    nbins = wp_index.get_index().nbins
+
+    sumw, sumw2, new_sumw, new_sumw2 = wp_columnar.hist_arrays(*result, nbins)
+
+    # filling a histogram event by event
+    fill_sumw, fill_sumw2 = np.zeros(nbins + 1), np.zeros(nbins + 1)
+    for wp, weight in zip(wp_index.get_index().bins(event_wp), event_weights):
+        fill_sumw[wp] += weight
+        fill_sumw2[wp] += weight**2
+
+    np.testing.assert_allclose(sumw, fill_sumw[1:], rtol=1e-12)
+    np.testing.assert_allclose(sumw2, fill_sumw2[1:], rtol=1e-12)
+
+    label, new_hist = result[0], result[1]
+    np.testing.assert_array_equal(new_sumw, [new_hist[tuple(condition)][2] for condition in label])
+    np.testing.assert_array_equal(new_sumw2, result[2])
@@ -0,0 +1,201 @@
+#######################################################
+
+# Columnar backend for the WP-combination histograms of CombineHist.py.
+# It reads the b-tagging branches of JetTree as NumPy arrays in one go (uproot)
+# and builds both the standard and the "new" combinations with vectorized masks
+# instead of looping over events in PyROOT.
+# The outputs are the same objects as the per-event loop (Loop_Combinations, used by the ROOT backend of CombineHist.py):
+# same labels, counts and events, and the same sums of weights up to the floating-point summation order
+# (compare_results is used by -backend validate).
+# new_hist = {combination: [count, mean weight, sum of weights]}, the sum of weights is kept so the
+# new histogram is filled with it directly instead of count x mean weight.
+# hist_arrays turns them into sum of weights and sum of weights^2 per bin,
+# which CombineHist.py writes to the ROOT histograms in one step.
+
+#######################################################
+
+import numpy as np
+import uproot
+import wp_index
+
+
+wp_suffixes = ["L", "M", "T", "XT", "XXT"]
+
+
+def get_branches(all_branches, method):
+
+    jet_branch    = [name for name in all_branches if name.startswith(f"jetAK4_btag_{method}")]
+    weight_branch = [name for name in all_branches if name.startswith("Weight")]
+
+    b_tag_pass = {suffix: [] for suffix in wp_suffixes}
+
+    for name in all_branches:
+        if name.startswith(f"b_tag_{method}_pass_"):
+            for suffix in b_tag_pass.keys():
+                if name.endswith(f"_{suffix}"):
+                    b_tag_pass[suffix].append(name)
+
+    return jet_branch, weight_branch, b_tag_pass
+
+
+def read_columns_taggers(input_file, methods, njets=4):
+
+    # the branches of all taggers are read together, so JetTree is decompressed only once per file
+    with uproot.open(input_file) as file:
+        tree = file["JetTree"]
+
+        tagger_branches = {method: get_branches(tree.keys(), method) for method in methods}
+
+        branches = set()
+        for jet_branch, weight_branch, b_tag_pass in tagger_branches.values():
+            branches.update(jet_branch[:njets] + weight_branch[:1] + sum([b_tag_pass[suffix][:njets] for suffix in wp_suffixes], []))
+
+        arrays = tree.arrays(list(branches), library="np")
+
+    columns = {}
+    for method, (jet_branch, weight_branch, b_tag_pass) in tagger_branches.items():
+
+        # (events, jets) WP of each jet
+        event_wp = np.column_stack([arrays[name] for name in jet_branch[:njets]]).astype(np.float64)
+
+        # only the first weight is used for filling
+        event_weights = arrays[weight_branch[0]].astype(np.float64)
+
+        # (wp, jets, events) pass flags, same ordering as [pass_L, pass_M, pass_T, pass_XT, pass_XXT]
+        event_pass = np.stack([np.stack([arrays[name] == 1 for name in b_tag_pass[suffix][:njets]]) for suffix in wp_suffixes])
+
+        columns[method] = (event_wp, event_weights, event_pass)
+
+    return columns
+
+
+def read_columns(input_file, method, njets=4):
+
+    return read_columns_taggers(input_file, [method], njets)[method]
+
+
+def new_combinations(event_pass, event_weights, label):
+
+    njets = event_pass.shape[1]
+    jets = np.arange(njets)
+
+    new_hist, new_sumw2 = {}, []
+    for condition in label:
+        # jet idx has to pass the WP given by condition[idx] (1 = L ... 5 = XXT)
+        mask = np.all(event_pass[np.asarray(condition) - 1, jets], axis=0)
+
+        count = int(np.count_nonzero(mask))
+        weights = event_weights[mask]
+
+        sum_weight = float(np.sum(weights))
+
+        mod_weight = sum_weight / count if count != 0 else 0
+        new_hist[tuple(condition)] = [count, mod_weight, sum_weight]
+
+        # sum of weights^2 for the errors of the new histogram
+        new_sumw2.append(float(np.sum(weights**2)))
+
+    return new_hist, new_sumw2
+
+
+def Loop_Combinations(event_wp, event_weights, event_pass, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    # reference per-event loop (ROOT backend of CombineHist.py), same inputs as read from JetTree event by event:
+    # event_wp = [[wp of each jet]], event_weights = [[weights]], event_pass = [[pass_L, pass_M, pass_T, pass_XT, pass_XXT]]
+
+    # this is bin label and also conditions for the new histogram
+    label = wp_index.get_index(njets, nwp, rejected_wp).label_list()
+
+    # adding a section for optimization histogram
+    new_hist, new_sumw2 = {}, []
+    for condition in label:
+        count = 0
+        sum_weight = 0
+        sum_weight2 = 0
+        for idx, matrix in enumerate(event_pass):
+            check = 0
+            for idxcond, cond in enumerate(condition):
+                if matrix[cond-1][idxcond] == 1:
+                    check += 1
+            if check == len(condition):
+                count += 1
+                sum_weight += event_weights[idx][0]
+                sum_weight2 += event_weights[idx][0]**2
+
+        mod_weight = sum_weight / count if count != 0 else 0
+        new_hist[tuple(condition)] = [count, mod_weight, sum_weight]
+        new_sumw2.append(sum_weight2)
+
+    label_idx = {tuple(l): idx + 1 for idx, l in enumerate(label)}
+
+    event_wp_labeled = [label_idx[tuple(wp)] for wp in event_wp if tuple(wp) in label_idx]
+
+    event_weights_labeled = [event_weights[i][0] for i, wp in enumerate(event_wp) if tuple(wp) in label_idx]
+
+    return label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled
+
+
+def compare_results(reference, result, rtol=1e-12):
+
+    # True if two (label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled) agree:
+    # labels, counts and events exactly, sums of weights up to the summation order
+    label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled = result
+    label_ref, new_hist_ref, new_sumw2_ref, event_wp_labeled_ref, event_weights_labeled_ref = reference
+
+    if [list(l) for l in label] != [list(l) for l in label_ref] or list(event_wp_labeled) != list(event_wp_labeled_ref):
+        return False
+    if list(new_hist) != list(new_hist_ref) or any(new_hist[key][0] != new_hist_ref[key][0] for key in new_hist):
+        return False
+
+    values = [(np.array([value[1:] for value in new_hist.values()], dtype=np.float64),
+               np.array([value[1:] for value in new_hist_ref.values()], dtype=np.float64)),
+              (np.asarray(new_sumw2, dtype=np.float64), np.asarray(new_sumw2_ref, dtype=np.float64)),
+              (np.asarray(event_weights_labeled, dtype=np.float64), np.asarray(event_weights_labeled_ref, dtype=np.float64))]
+
+    return all(a.shape == b.shape and np.allclose(a, b, rtol=rtol, atol=0) for a, b in values)
+
+
+def WP_Combinations(event_wp, event_weights, event_pass, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    index = wp_index.get_index(njets, nwp, rejected_wp)
+    label = index.label_list()
+
+    new_hist, new_sumw2 = new_combinations(event_pass, event_weights, label)
+
+    event_label = index.bins(event_wp)
+    selected = event_label > 0
+
+    event_wp_labeled = event_label[selected].tolist()
+    event_weights_labeled = event_weights[selected].tolist()
+
+    return label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled
+
+
+def Make_WP_Combinations(input_file, method, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    return WP_Combinations(*read_columns(input_file, method, njets), njets, nwp, rejected_wp)
+
+
+def Make_WP_Combinations_Taggers(input_file, methods, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    # {method: same output as Make_WP_Combinations}, from a single read of the file
+    columns = read_columns_taggers(input_file, methods, njets)
+
+    return {method: WP_Combinations(*columns[method], njets, nwp, rejected_wp) for method in methods}
+
+
+def hist_arrays(label, new_hist, new_sumw2, event_wp_labeled, event_weights_labeled, nbins):
+
+    # sum of weights and sum of weights^2 per bin (bins 1 ... nbins) of both histograms,
+    # same contents as filling TH1D event by event, without touching ROOT
+    event_wp_labeled = np.asarray(event_wp_labeled, dtype=np.int64)
+    event_weights_labeled = np.asarray(event_weights_labeled, dtype=np.float64)
+
+    sumw = np.bincount(event_wp_labeled, weights=event_weights_labeled, minlength=nbins + 1)[1:nbins + 1]
+    sumw2 = np.bincount(event_wp_labeled, weights=event_weights_labeled**2, minlength=nbins + 1)[1:nbins + 1]
+
+    # new histogram: sum of weights of the events passing the combination
+    new_sumw = np.array([new_hist[tuple(l)][2] for l in label], dtype=np.float64)
+    new_sumw2 = np.asarray(new_sumw2, dtype=np.float64)
+
+    return sumw, sumw2, new_sumw, new_sumw2
@@ -0,0 +1,109 @@
+#######################################################
+
+# Shared index of the WP combinations (histogram bins) for CombineHist.py, Significance.py and Stat_Unc.py.
+# A combination is the WP of each jet sorted from the leading jet, e.g. (5, 5, 4, 4),
+# with WP = 0 ... nwp-1 (rejected WPs removed) and non-increasing order, bins start at 1
+# in the same order as the original label list.
+# Each combination is packed into one integer code (mixed radix nwp), and dense tables
+# code -> bin and bin -> combination are precomputed once, so whole event arrays are mapped to bins
+# with one lookup. Works for any njets (up to njetmax = 6) and nwp.
+
+# usage:
+# index = get_index(njets=4, nwp=6, rejected_wp=(0.0,))
+# index.bins(event_wp)        # (events, njets) -> bin (0 = not a combination)
+# index.label_list()          # [[1, 1, 1, 1], [2, 1, 1, 1], ...] as before
+# index.selected_bins()       # bins used for the optimization of the New combinations
+
+#######################################################
+
+import functools
+import itertools
+import numpy as np
+
+
+njetmax = 6
+
+
+class WPIndex:
+
+    def __init__(self, njets=4, nwp=6, rejected_wp=(0.0,)):
+
+        if not 1 <= njets <= njetmax:
+            raise ValueError(f"njets must be between 1 and {njetmax}, got {njets}")
+
+        self.njets = njets
+        self.nwp = nwp
+        self.rejected_wp = tuple(rejected_wp)
+        self.shape = (nwp,) * njets
+
+        values = [wp for wp in range(nwp) if wp not in self.rejected_wp]
+
+        # non-increasing tuples in lexicographic order, same as the nested comprehension
+        combinations = sorted(tuple(reversed(c)) for c in itertools.combinations_with_replacement(values, njets))
+
+        # bin -> combination, row 0 (bin 0) is not a combination
+        self.labels = np.array(combinations, dtype=np.int64).reshape(-1, njets)
+        self.bin_to_label = np.vstack([np.full((1, njets), -1, dtype=np.int64), self.labels])
+
+        # code -> bin, 0 = not a combination
+        self.codes = self.encode(self.labels)
+        self.code_to_bin = np.zeros(nwp ** njets, dtype=np.int32)
+        self.code_to_bin[self.codes] = np.arange(1, len(self.labels) + 1, dtype=np.int32)
+
+    @property
+    def nbins(self):
+        return len(self.labels)
+
+    def encode(self, wp):
+
+        # (..., njets) integer WPs -> packed code
+        wp = np.asarray(wp, dtype=np.int64)
+        return np.ravel_multi_index(np.moveaxis(wp, -1, 0), self.shape)
+
+    def decode(self, code):
+
+        return np.stack(np.unravel_index(code, self.shape), axis=-1)
+
+    def bins(self, event_wp):
+
+        # (events, njets) WPs (float or int) -> bin of each event, 0 if it is not a combination
+        event_wp = np.asarray(event_wp)
+        if event_wp.ndim != 2 or event_wp.shape[1] != self.njets:
+            raise ValueError(f"expected (events, {self.njets}) WPs, got {event_wp.shape}")
+
+        valid = np.all((event_wp == np.floor(event_wp)) & (event_wp >= 0) & (event_wp < self.nwp), axis=1)
+
+        code = np.zeros(len(event_wp), dtype=np.int64)
+        code[valid] = self.encode(event_wp[valid].astype(np.int64))
+
+        return np.where(valid, self.code_to_bin[code], 0)
+
+    def bin(self, wp):
+
+        # single combination -> bin (0 if it is not a combination)
+        return int(self.bins(np.asarray([wp]))[0])
+
+    def label(self, bin_number):
+
+        return self.bin_to_label[bin_number]
+
+    def label_list(self):
+
+        return self.labels.tolist()
+
+    def selected_bins(self, max_spread=1):
+
+        # combination selection for optimization (New): no jet more than max_spread WPs below the leading jet
+        selected = np.all(self.labels[:, :1] - self.labels[:, 1:] <= max_spread, axis=1)
+        return np.flatnonzero(selected) + 1
+
+
+@functools.lru_cache(maxsize=None)
+def _get_index(njets, nwp, rejected_wp):
+
+    return WPIndex(njets, nwp, rejected_wp)
+
+def get_index(njets=4, nwp=6, rejected_wp=(0.0,)):
+
+    # one precomputed index per configuration
+    return _get_index(njets, nwp, tuple(rejected_wp))